@@ -2,131 +2,112 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt  # Añadido para soporte de background_gradient
 from .utils import (
-    cargar_datos,
     preparar_dataframe_basico,
     obtener_plantas,
-    datos_estado_plantas
+    datos_estado_plantas,
+    cacheado,
+    cargar_estado_plantas,
+    cargar_indice_periodos,
+    cargar_rollups,
+    cargar_tabla_caracteristicas,
 )
+from .muestreo import reducir_serie
 from . import mapping
+from storage import RangeAggregates, RollupTables
 
-def preparar_dataframe_deficit(entradas):
+def preparar_dataframe_deficit(tabla, df_plantas):
     """
-    Prepara un dataframe específicamente diseñado para análisis de déficit con datos
-    extraídos ÚNICAMENTE de la sección 'prediccion' del JSON
+    Prepara un dataframe específicamente diseñado para análisis de déficit a partir
+    de la tabla de características (métricas de la sección 'prediccion' del JSON,
+    porcentaje de déficit, medias móviles y columnas de calendario) y del estado
+    de las plantas
     
     Args:
-        entradas (list): Lista de registros de datos eléctricos
+        tabla (pd.DataFrame): Tabla de características indexada por fecha
+        df_plantas (pd.DataFrame): Estados de plantas (fecha, planta, estado)
     Returns:
         pd.DataFrame: DataFrame con datos procesados para análisis de déficit
     """
-    filas = []
-    for e in entradas:
-        # Extraer datos ÚNICAMENTE de la sección "prediccion" del JSON
-        pred = e["datos"].get("prediccion", {})
-        info_matutina = e["datos"].get("info_matutina", {})
-        
-        # IMPORTANTE: Extraer el déficit SOLO de pred["deficit"], sin cálculos alternativos
-        deficit = pred.get("deficit")  # Este es el único valor a usar para déficit
-          # IMPORTANTE: Si no hay datos de déficit en predicción, omitir este registro completamente
-        # Esto significa que los registros sin déficit no aparecerán en ningún análisis
-        if deficit is None:
-            continue
-            
-        demanda = pred.get("demanda_maxima")
-        disponibilidad = pred.get("disponibilidad")
-        afectacion = pred.get("afectacion")
-        
-        # Cálculo de porcentaje de déficit solo si tenemos todos los datos necesarios
-        porcentaje_deficit = None
-        if deficit is not None and demanda is not None and demanda > 0:
-            porcentaje_deficit = (deficit / demanda) * 100
-        
-        # Procesar plantas en avería usando el estandarizador
-        plantas_averia = e["datos"].get("plantas", {}).get("averia", [])
-        plantas_estandarizadas = set()
-        from .plant_standardizer import get_canonical_plant_name
-        
-        for p in plantas_averia:
-            planta_nombre = p.get("planta")
-            if planta_nombre:
-                nombre_canonico = get_canonical_plant_name(planta_nombre)
-                if nombre_canonico:  # Solo añadir si es un nombre válido
-                    plantas_estandarizadas.add(nombre_canonico)
-        
-        # Añadir registro completo, solo con los datos relevantes
-        filas.append({
-            "fecha": e["fecha"],
-            "afectacion": afectacion,
-            "disponibilidad": disponibilidad,
-            "demanda": demanda,
-            "deficit": deficit,  # Déficit directo del JSON, sin cálculos alternativos
-            "porcentaje_deficit": porcentaje_deficit,
-            "respaldo": pred.get("respaldo"),
-            "dia_semana": e["fecha"].strftime('%A'),
-            "mes": e["fecha"].strftime('%B'),
-            "año": e["fecha"].year,
-            "enlace": e.get("enlace", ""),
-            "plantas_averia": list(plantas_estandarizadas)  # Guardar plantas para análisis posterior
-        })
-    
-    # Crear DataFrame y establecer fecha como índice
-    df = pd.DataFrame(filas)
-    if not df.empty:
-        df = df.set_index("fecha").sort_index()
-        
-        # Reemplazar NaN con None para mejor manejo en las visualizaciones
-        df = df.replace({pd.NA: None})
-        
-        # Agregar columnas de tendencia usando ventanas móviles
-        df['deficit_7d_avg'] = df['deficit'].rolling(window=7, min_periods=1).mean()
-        df['deficit_30d_avg'] = df['deficit'].rolling(window=30, min_periods=1).mean()
+    # IMPORTANTE: Los días sin déficit en la predicción se omiten completamente,
+    # así que no aparecerán en ningún análisis
+    df = tabla.dropna(subset=["deficit"])[[
+        "afectacion", "disponibilidad", "demanda", "deficit", "porcentaje_deficit", "respaldo",
+        "dia_semana", "mes", "año", "enlace", "deficit_7d_avg", "deficit_30d_avg"
+    ]].copy()
+    
+    # Plantas en avería de cada día (nombres canónicos sin repetir)
+    if df_plantas.empty:
+        averias = pd.Series(dtype=object)
+    else:
+        averias = (
+            df_plantas[df_plantas["estado"] == "Avería"]
+            .groupby("fecha")["planta"]
+            .agg(lambda plantas: list(dict.fromkeys(plantas)))
+        )
+    averias = averias.reindex(df.index)
+    df["plantas_averia"] = [p if isinstance(p, list) else [] for p in averias]
     
     return df
 
-def mostrar_indicadores_deficit(df):
+@cacheado
+def cargar_dataframe_deficit():
+    """
+    Carga el dataframe de déficit a partir de la tabla de características,
+    que se construye una sola vez por versión de los datos
+    
+    Returns:
+        pd.DataFrame: DataFrame con datos procesados para análisis de déficit
+    """
+    return preparar_dataframe_deficit(cargar_tabla_caracteristicas(), cargar_estado_plantas())
+
+@cacheado
+def cargar_agregados_deficit():
+    """
+    Sumas prefijas y tablas dispersas del déficit, con las que los indicadores
+    de cualquier rango de fechas se calculan sin filtrar el dataframe
+    
+    Returns:
+        RangeAggregates: Agregados de las columnas deficit y deficit_positivo
+    """
+    df = cargar_dataframe_deficit()
+    return RangeAggregates.from_frame(pd.DataFrame({
+        "deficit": df["deficit"],
+        "deficit_positivo": df["deficit"].where(df["deficit"] > 0)
+    }))
+
+def mostrar_indicadores_deficit(agregados, desde, hasta):
     """
     Muestra un conjunto de indicadores KPI relacionados con el déficit
     Args:
-        df (pd.DataFrame): DataFrame con datos de déficit procesados
+        agregados (RangeAggregates): Agregados del déficit (cargar_agregados_deficit)
+        desde (datetime): Inicio del período seleccionado
+        hasta (datetime): Fin del período seleccionado
     """
     st.subheader("Indicadores Estadísticos del Período")
     
-    # Filtrar valores no nulos para cálculos
-    df_deficit_no_nulo = df[df["deficit"].notnull()]
+    # Agregados del período solo con datos válidos
+    resumen = agregados.resumen("deficit", desde, hasta)
+    positivos = agregados.resumen("deficit_positivo", desde, hasta)
     
-    if df_deficit_no_nulo.empty:
+    if resumen["count"] == 0:
         st.error("No hay datos suficientes para calcular indicadores de déficit.")
         return
     
-    # Calcular métricas para el período seleccionado solo con datos válidos
-    df_deficit_positivo = df_deficit_no_nulo[df_deficit_no_nulo["deficit"] > 0]
-    
-    deficit_promedio = df_deficit_no_nulo["deficit"].mean()
-    deficit_mediana = df_deficit_no_nulo["deficit"].median()
-    deficit_maximo = df_deficit_no_nulo["deficit"].max()
-    deficit_minimo = df_deficit_positivo["deficit"].min() if not df_deficit_positivo.empty else 0
-    desviacion_std = df_deficit_no_nulo["deficit"].std()
+    deficit_promedio = resumen["mean"]
+    deficit_mediana = agregados.median("deficit", desde, hasta)
+    deficit_maximo = resumen["max"]
+    deficit_minimo = positivos["min"] if positivos["count"] else 0
+    desviacion_std = resumen["std"]
     
-    # Obtener fechas de valores máximos y mínimos
-    fecha_max = None
-    if not pd.isna(deficit_maximo):
-        max_indices = df_deficit_no_nulo[df_deficit_no_nulo["deficit"] == deficit_maximo].index
-        if not max_indices.empty:
-            fecha_max = max_indices[0].strftime("%d/%m/%Y")
-    
-    fecha_min = None
-    if not pd.isna(deficit_minimo) and deficit_minimo > 0:
-        min_indices = df_deficit_positivo[df_deficit_positivo["deficit"] == deficit_minimo].index
-        if not min_indices.empty:
-            fecha_min = min_indices[0].strftime("%d/%m/%Y")
+    # Fechas de los valores máximos y mínimos
+    fecha_max = resumen["fecha_max"].strftime("%d/%m/%Y") if resumen["fecha_max"] is not None else None
+    fecha_min = positivos["fecha_min"].strftime("%d/%m/%Y") if positivos["fecha_min"] is not None else None
     
     # Días con déficit
-    dias_totales = len(df_deficit_no_nulo)
-    dias_con_deficit = len(df_deficit_positivo)
+    dias_totales = resumen["count"]
+    dias_con_deficit = positivos["count"]
     porcentaje_dias_deficit = (dias_con_deficit / dias_totales * 100) if dias_totales > 0 else 0
     
     # Mostrar KPIs en columnas
@@ -179,13 +160,12 @@ def mostrar_indicadores_deficit(df):
             help=f"{dias_con_deficit} días de {dias_totales} analizados"
         )
 
-def analizar_plantas_deficit(entradas, df):
+def analizar_plantas_deficit(df):
     """
     Realiza un análisis detallado de las plantas y su relación con el déficit energético,
     mostrando únicamente las métricas específicas de la planta seleccionada (no promedios nacionales)
     
     Args:
-        entradas (list): Lista de registros de datos eléctricos originales
         df (pd.DataFrame): DataFrame con datos de déficit procesados
     """
     st.subheader("Análisis de Plantas en Avería y su Impacto en el Déficit")
@@ -217,7 +197,7 @@ def analizar_plantas_deficit(entradas, df):
     # Calcular frecuencia por planta
     if not df_plantas.empty:
         # Contar días en avería por planta
-        from .plant_standardizer import get_valid_plant_names
+        from storage.plant_names import get_valid_plant_names
         frecuencia = df_plantas["planta"].value_counts()
         df_freq = pd.DataFrame({
             "planta": frecuencia.index,
@@ -290,6 +270,30 @@ def analizar_plantas_deficit(entradas, df):
                             value=f"{int(desviacion_std)} MW" if not pd.isna(desviacion_std) else "N/D"
                         )
                     
+                    # Periodos de avería de la planta que se solapan con el rango analizado,
+                    # consultados en el índice de periodos
+                    periodos = cargar_indice_periodos().overlapping(
+                        df.index.min(), df.index.max(), planta=planta_seleccionada, estado="Avería"
+                    )
+                    if not periodos.empty:
+                        st.write(f"### Periodos de avería de {planta_seleccionada}")
+                        dias_df = df.index.normalize()
+                        deficit_periodo = [
+                            df.loc[(dias_df >= inicio) & (dias_df <= fin), "deficit"].mean()
+                            for inicio, fin in zip(periodos["inicio"], periodos["fin"])
+                        ]
+                        tabla_periodos = pd.DataFrame({
+                            "Inicio": periodos["inicio"].dt.strftime("%d/%m/%Y"),
+                            "Fin": periodos["fin"].dt.strftime("%d/%m/%Y"),
+                            "Duración (días)": periodos["duracion"],
+                            "Días con reporte": periodos["dias"],
+                            "Déficit promedio (MW)": [None if pd.isna(d) else int(d) for d in deficit_periodo]
+                        })
+                        st.caption(
+                            f"{len(periodos)} periodos; el más largo duró {periodos['duracion'].max()} días"
+                        )
+                        st.dataframe(tabla_periodos, use_container_width=True, hide_index=True)
+                    
                     # Preparar datos para visualizaciones, ordenados por fecha
                     df_plot = df_planta.sort_values("fecha").copy()
                     
@@ -301,8 +305,13 @@ def analizar_plantas_deficit(entradas, df):
                         if not df_plot_clean.empty:
                             st.write(f"### Evolución del déficit durante averías de {planta_seleccionada}")
                             
+                            # Serie reducida en rangos largos, conservando los picos
+                            df_grafico = reducir_serie(
+                                df_plot_clean.set_index("fecha"), ["deficit"], picos=True
+                            ).reset_index()
+                            
                             fig = px.line(
-                                df_plot_clean,
+                                df_grafico,
                                 x="fecha",
                                 y="deficit",
                                 markers=False,  # Sin marcadores (puntos)
@@ -400,18 +409,16 @@ def analizar_plantas_deficit(entradas, df):
                 )
                 st.plotly_chart(fig, use_container_width=True)
 
-def analizar_distribucion_temporal_deficit(df):
+def analizar_distribucion_temporal_deficit(df, rollups):
     """
     Analiza la distribución temporal del déficit por meses y estacionalidad
     Args:
         df (pd.DataFrame): DataFrame con datos de déficit procesados
+        rollups (RollupTables): Agregados del período analizado
     """
     st.subheader("Distribución Temporal del Déficit")
     
-    # Filtrar datos no nulos para análisis
-    df_analisis = df.dropna(subset=["deficit"]).copy()
-    
-    if df_analisis.empty:
+    if df["deficit"].dropna().empty:
         st.warning("No hay datos suficientes para el análisis de distribución temporal.")
         return
     
@@ -434,22 +441,12 @@ def analizar_distribucion_temporal_deficit(df):
         'December': 'Diciembre'
     }
     
-    # Crear columna de mes numérico y nombre
-    if "mes_num" not in df_analisis.columns:
-        df_analisis.loc[:, "mes_num"] = df_analisis.index.month
-        df_analisis.loc[:, "mes_nombre"] = df_analisis.index.strftime('%B').map(meses)
-    
-    # Calcular déficit promedio por mes
-    deficit_por_mes = df_analisis.groupby('mes_num').agg({
-        'deficit': ['mean', 'count']  # Media y conteo de registros por mes
-    })
-    
-    # Aplanar MultiIndex
+    # Déficit promedio y conteo de registros por mes del año
+    deficit_por_mes = rollups.stats("mes_del_año", "deficit")[['mean', 'count']]
     deficit_por_mes.columns = ['deficit_promedio', 'conteo']
-    deficit_por_mes = deficit_por_mes.reset_index()
+    deficit_por_mes = deficit_por_mes.rename_axis('mes_num').reset_index()
     
     # Crear nombres de meses y añadir a dataframe
-    meses_orden = list(range(1, 13))
     deficit_por_mes['mes_nombre'] = deficit_por_mes['mes_num'].apply(
         lambda m: meses[datetime(2022, m, 1).strftime('%B')]
     )
@@ -508,22 +505,11 @@ def analizar_distribucion_temporal_deficit(df):
     st.write("#### Tendencia anual del déficit")
     
     try:
-        # Agrupar por año y mes
-        df_analisis.loc[:, "año_mes"] = df_analisis.index.strftime('%Y-%m')
-        
-        # Calcular déficit promedio y conteo por año-mes
-        deficit_por_año_mes = df_analisis.groupby('año_mes').agg({
-            'deficit': ['mean', 'count', 'max']  # Media, conteo y máximo
-        }).reset_index()
-        
-        # Aplanar columnas
-        deficit_por_año_mes.columns = ['año_mes', 'deficit_promedio', 'conteo', 'deficit_max']
-        
-        # Convertir a formato de fecha
-        deficit_por_año_mes['año_mes'] = pd.to_datetime(deficit_por_año_mes['año_mes'] + '-01')
-        
-        # Ordenar cronológicamente
-        deficit_por_año_mes = deficit_por_año_mes.sort_values('año_mes')
+        # Déficit promedio, conteo y máximo por año-mes, en orden cronológico
+        deficit_por_año_mes = rollups.stats("mes", "deficit")[['mean', 'count', 'max']]
+        deficit_por_año_mes.columns = ['deficit_promedio', 'conteo', 'deficit_max']
+        deficit_por_año_mes = deficit_por_año_mes[deficit_por_año_mes['conteo'] > 0]
+        deficit_por_año_mes = deficit_por_año_mes.rename_axis('año_mes').reset_index()
         
         # Verificar valores máximos para asegurar que están siendo considerados        st.info(f"Déficit máximo en el período analizado por año-mes: {int(deficit_por_año_mes['deficit_max'].max())} MW")
         
@@ -761,25 +747,13 @@ def app():
     st.header("Análisis Histórico del Déficit Energético")
     st.markdown("---")
     
-    # Cargar datos
+    # Cargar y preparar dataframe específico para análisis de déficit
     try:
-        entradas = cargar_datos()
+        df_completo = cargar_dataframe_deficit()
     except Exception as e:
         st.error(f"Error al cargar datos: {str(e)}")
         return
     
-    # Verificar que se cargaron los datos correctamente
-    if not entradas:
-        st.error("No se pudieron cargar los datos. Verifique la ruta de los archivos.")
-        return
-    
-    # Preparar dataframe específico para análisis de déficit
-    try:
-        df_completo = preparar_dataframe_deficit(entradas)
-    except Exception as e:
-        st.error(f"Error al procesar los datos: {str(e)}")
-        return
-    
     if df_completo.empty:
         st.error("No hay datos disponibles para analizar.")
         return
@@ -823,21 +797,29 @@ def app():
     inicio_dt = datetime.combine(fecha_inicio, datetime.min.time())
     fin_dt = datetime.combine(fecha_fin, datetime.max.time())
     
-    # Filtrar el dataframe para el rango seleccionado
-    df = df_completo[(df_completo.index >= inicio_dt) & (df_completo.index <= fin_dt)].copy()
+    # Filas del rango seleccionado por búsqueda binaria sobre el índice ordenado
+    df = df_completo.loc[inicio_dt:fin_dt]
+    agregados = cargar_agregados_deficit()
     
     if df.empty:
         st.warning("No hay datos disponibles para el rango de fechas seleccionado.")
         return
     
+    # Agregados por mes y mes del año: los que mantiene el pipeline si el rango
+    # abarca todo el histórico y, si no, los del rango seleccionado
+    if fecha_inicio <= fecha_min and fecha_fin >= fecha_max:
+        rollups = cargar_rollups()
+    else:
+        rollups = RollupTables.from_daily(df)
+    
     # Mostrar gráfico principal de déficit con línea de media
     st.write("### Déficit energético en el período seleccionado")
       # Filtrar valores nulos para cálculos
     df_deficit_no_nulo = df.dropna(subset=["deficit"])
     
-    # Calcular la media del déficit solo de valores presentes
-    deficit_medio = df_deficit_no_nulo['deficit'].mean() if not df_deficit_no_nulo.empty else 0
-    deficit_max = df_deficit_no_nulo['deficit'].max() if not df_deficit_no_nulo.empty else 0
+    # Media y máximo del déficit solo de valores presentes
+    deficit_medio = agregados.mean("deficit", inicio_dt, fin_dt) if not df_deficit_no_nulo.empty else 0
+    deficit_max = agregados.max("deficit", inicio_dt, fin_dt) if not df_deficit_no_nulo.empty else 0
     
     # Mostrar estadísticas antes del gráfico
     st.info(f"Déficit máximo en el período seleccionado: {int(deficit_max)} MW")
@@ -845,10 +827,13 @@ def app():
     # Crear gráfico
     fig = go.Figure()
     
+    # En rangos largos se envía una serie reducida que conserva los picos
+    df_grafico = reducir_serie(df_deficit_no_nulo, ["deficit"], picos=True)
+    
     # Añadir línea de déficit (solo líneas, sin marcadores/puntos)
     fig.add_trace(go.Scatter(
-        x=df_deficit_no_nulo.index,  # Solo usar valores no nulos
-        y=df_deficit_no_nulo['deficit'],
+        x=df_grafico.index,  # Solo usar valores no nulos
+        y=df_grafico['deficit'],
         mode='lines',  # Solo líneas, sin marcadores
         name='Déficit (MW)',
         line=dict(color='red', width=2.5)  # Línea más gruesa para mejor visualización
@@ -887,7 +872,7 @@ def app():
     
     with tab1:
         # Mostrar estadísticas del período seleccionado
-        mostrar_indicadores_deficit(df)
+        mostrar_indicadores_deficit(agregados, inicio_dt, fin_dt)
         
         # Análisis por días de la semana
         st.subheader("Déficit por día de la semana")
@@ -911,11 +896,6 @@ def app():
         # Análisis por mes
         st.subheader("Déficit por mes")
         
-        # Añadir columna de mes si no existe
-        if "mes_num" not in df.columns:
-            df.loc[:, "mes_num"] = df.index.month
-            df.loc[:, "mes_nombre"] = df.index.strftime('%B')  # Nombre del mes
-        
         # Definir nombres de meses en español
         meses_es = {
             "January": "Enero",
@@ -932,8 +912,8 @@ def app():
             "December": "Diciembre"
         }
         
-        # Calcular promedio de déficit por mes (solo con valores no nulos)
-        deficit_por_mes = df.dropna(subset=["deficit"]).groupby('mes_num')['deficit'].mean()
+        # Promedio de déficit por mes (solo con valores no nulos)
+        deficit_por_mes = rollups.read("mes_del_año", "mean", ["deficit"])["deficit"]
         
         # Crear lista de meses en orden
         meses_orden = list(range(1, 13))
@@ -987,11 +967,11 @@ def app():
     
     with tab2:
         # Análisis de plantas y relación con déficit
-        analizar_plantas_deficit(entradas, df)
+        analizar_plantas_deficit(df)
     
     with tab3:
         # Análisis de distribución temporal del déficit
-        analizar_distribucion_temporal_deficit(df)
+        analizar_distribucion_temporal_deficit(df, rollups)
     
     with tab4:
         # Tabla detallada de datos
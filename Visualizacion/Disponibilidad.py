@@ -2,66 +2,26 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 from datetime import datetime, date
-from .utils import cargar_datos
+from .utils import (
+    cargar_dataframe_basico,
+    cargar_datos_solares,
+    cargar_matriz_plantas,
+)
+from .muestreo import PUNTOS_GRAFICO, reducir_serie
 
-def preparar_dataframe(entradas):
-    filas = []
-    for e in entradas:
-        pred = e["datos"].get("prediccion", {})
-        filas.append({
-            "fecha": e["fecha"],
-            "disponibilidad": pred.get("disponibilidad"),
-            "demanda": pred.get("demanda_maxima")
-        })
-    return pd.DataFrame(filas).set_index("fecha").sort_index()
-
-def preparar_datos_solares(entradas):
-    filas_gen = []
-    filas_cnt = []
-    for e in entradas:
-        d = e["fecha"]
-        sol = e["datos"].get("paneles_solares", {})
-        filas_gen.append({"fecha": d, "produccion_mwh": sol.get("produccion_mwh")})
-        filas_cnt.append({"fecha": d, "parques": sol.get("cantidad_parques")})
-    df_gen = pd.DataFrame(filas_gen).set_index("fecha").sort_index()
-    df_cnt = pd.DataFrame(filas_cnt).set_index("fecha").sort_index()
-    return df_gen, df_cnt
-
-def obtener_plantas(entradas):
-    plantas = set()
-    for e in entradas:
-        pls = e["datos"].get("plantas", {})
-        for clave in ("averia","mantenimiento"):
-            for p in pls.get(clave, []):
-                nombre = p.get("planta")
-                if nombre:
-                    plantas.add(nombre)
-    return sorted(plantas)
-
-def contar_dias_operativos(entradas, plantas, sel_anos, inicio, fin):
-    cont = {p:0 for p in plantas}
-    for e in entradas:
-        d = e["fecha"].date()
-        for a in sel_anos:
-            y = int(a)
-            start_dt = date(y, inicio.month, inicio.day)
-            end_dt   = date(y, fin.month,    fin.day)
-            if start_dt <= d <= end_dt:
-                pls = e["datos"].get("plantas",{})
-                aver = set(p["planta"] for p in pls.get("averia",[]) if p.get("planta"))
-                mant = set(p["planta"] for p in pls.get("mantenimiento",[]) if p.get("planta"))
-                for p in plantas:
-                    if p not in aver and p not in mant:
-                        cont[p] += 1
-    return cont
+# Días operativos de cada planta en el rango mes-día de los años seleccionados,
+# contados sobre la matriz de estado de las plantas por nombre tal como aparece
+# en los reportes
+def contar_dias_operativos(matriz, sel_anos, inicio, fin):
+    return matriz.dias_operativos(matriz.periodo([int(a) for a in sel_anos], inicio, fin))
 
 def app():
     st.header("Datos Históricos de Disponibilidad")
     st.markdown("---")
-    entradas = cargar_datos()
-    df = preparar_dataframe(entradas)
-    df_solar_gen, df_solar_cnt = preparar_datos_solares(entradas)
-    plantas = obtener_plantas(entradas)
+    df = cargar_dataframe_basico()[["disponibilidad", "demanda"]]
+    df_solar = cargar_datos_solares()
+    df_solar_gen, df_solar_cnt = df_solar[["produccion_mwh"]], df_solar[["parques"]]
+    matriz = cargar_matriz_plantas(canonica=False)
 
     with st.expander("Comparativa y Análisis", expanded=True):
         anos = sorted(df.index.year.unique())
@@ -75,13 +35,16 @@ def app():
         )
         mostrar_media = st.checkbox("Mostrar media")
 
-        # armar comparativa de disponibilidad y demanda
+        # armar comparativa de disponibilidad y demanda; los años comparten el
+        # ancho del grafico, asi que cada uno se reduce a su parte de los puntos
         filas = []
+        puntos = max(PUNTOS_GRAFICO // max(len(sel_anos), 1), 3)
         for a in sel_anos:
             y = int(a)
             sd = date(y, inicio.month, inicio.day)
             ed = date(y, fin.month,    fin.day)
             sub = df[(df.index.date>=sd)&(df.index.date<=ed)&(df.index.year==y)]
+            sub = reducir_serie(sub, ["disponibilidad", "demanda"], max_puntos=puntos)
             for idx, row in sub.iterrows():
                 filas.append({"fecha": idx, "anio": a, "disponibilidad": row["disponibilidad"], "demanda": row["demanda"]})
         if filas:
@@ -156,6 +119,7 @@ def app():
             (gen["mesdia"]<=fin.strftime("%m-%d")) &
             (gen["fecha"].dt.year.astype(str).isin(sel_anos))
         ]
+        gen = reducir_serie(gen.set_index("fecha"), ["produccion_mwh"]).reset_index()
         line_solar = (
             alt.Chart(gen)
             .mark_line()
@@ -165,6 +129,6 @@ def app():
         st.altair_chart(line_solar, use_container_width=True)
 
         st.write("### Dias operativos por planta")
-        cont = contar_dias_operativos(entradas, plantas, sel_anos, inicio, fin)
-        df_pl = pd.DataFrame([{"planta":p,"dias_operativos":cont[p]} for p in plantas])
+        cont = contar_dias_operativos(matriz, sel_anos, inicio, fin)
+        df_pl = cont.rename_axis("planta").reset_index()
         st.table(df_pl.sort_values("dias_operativos", ascending=False))
@@ -1,3 +1,3 @@
 # Este archivo indica que Visualizacion es un paquete de Python
 # También definimos aquí los módulos que forman parte del paquete
-__all__ = ['app', 'Inicio', 'Deficit', 'Disponibilidad', 'comparativas', 'utils', 'mapping', 'plant_standardizer']
+__all__ = ['app', 'Inicio', 'Deficit', 'Disponibilidad', 'comparativas', 'utils', 'muestreo', 'mapping']
@@ -1,9 +1,4 @@
 import streamlit as st
-# Usar importaciones relativas desde el mismo directorio
-from .Inicio import app as inicio_app
-from .Deficit import app as deficit_app
-from .Disponibilidad import app as disponibilidad_app
-from .comparativas import app as comparativas_app
 
 # Configuración de la página
 st.set_page_config(
@@ -20,14 +15,19 @@ def main():
     st.sidebar.markdown("---")
     # Opciones de navegación
     menu = st.sidebar.radio("Menu:", ["Inicio", "Déficit", "Disponibilidad", "Comparativas"])
-      # Mostrar la página seleccionada
+    # Mostrar la página seleccionada; cada página (y sus librerías de gráficos)
+    # se importa sólo al seleccionarla
     if menu == "Inicio":
+        from .inicio import app as inicio_app
         inicio_app()
     elif menu == "Déficit":
+        from .Deficit import app as deficit_app
         deficit_app()
     elif menu == "Disponibilidad":
+        from .Disponibilidad import app as disponibilidad_app
         disponibilidad_app()
     elif menu == "Comparativas":
+        from .comparativas import app as comparativas_app
         comparativas_app()
 
 # Ejecutar la aplicación
@@ -1,17 +1,21 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import altair as alt
 from datetime import datetime, date
+from storage.plant_status import AVERIA, OPERATIVA, PlantStatusMatrix
 from .utils import (
-    cargar_datos, 
-    preparar_dataframe_basico, 
-    obtener_plantas,
-    datos_estado_plantas
+    cargar_dataframe_basico,
+    cargar_plantas,
+    cargar_estado_plantas,
+    cargar_matriz_plantas,
+    cargar_rollups,
 )
+from .muestreo import reducir_serie
 
 def crear_grafico_comparativo(df, col1, col2, titulo1, titulo2):
     """Crea un gráfico comparativo entre dos variables."""
-    base = alt.Chart(df.reset_index())
+    base = alt.Chart(reducir_serie(df, [col1, col2]).reset_index())
     
     linea1 = base.mark_line(color='#5276A7').encode(
         x=alt.X('fecha:T', title='Fecha'),
@@ -37,6 +41,30 @@ def crear_grafico_comparativo(df, col1, col2, titulo1, titulo2):
         height=400
     ).interactive()
 
+def periodos_mas_largos(matriz):
+    """
+    Período más largo de cada planta en avería y en mantenimiento.
+
+    Sólo cuentan los días en que alguna planta tuvo problemas, y un día con
+    unidades en avería y en mantenimiento cuenta como avería. Un período dura
+    los días naturales desde su inicio hasta el siguiente de esos días con otro
+    estado; los períodos que siguen abiertos el último día no se cuentan.
+    """
+    afectados = (matriz.estados != OPERATIVA).any(axis=0)
+    fechas = matriz.fechas[afectados]
+    estados = matriz.estados[:, afectados]
+    principal = PlantStatusMatrix(
+        matriz.plantas, fechas, np.where(estados & AVERIA, AVERIA, estados).astype(np.int8)
+    )
+    intervalos = principal.intervalos()
+    siguiente = np.searchsorted(fechas, intervalos["fin"].to_numpy().astype("datetime64[D]"), side="right")
+    cerrados = siguiente < len(fechas)
+    intervalos = intervalos[cerrados].copy()
+    intervalos["duracion"] = (
+        fechas[siguiente[cerrados]] - intervalos["inicio"].to_numpy().astype("datetime64[D]")
+    ).astype("int64")
+    return principal.rachas(intervalos)["racha_maxima"]
+
 def crear_heatmap_anual(df, columna, titulo):
     """Crea un heatmap anual para visualizar patrones temporales."""
     # Añadir columnas de mes y día
@@ -68,8 +96,7 @@ def app():
     st.header("Comparativas")
     st.markdown("---")
     
-    entradas = cargar_datos()
-    df = preparar_dataframe_basico(entradas)
+    df = cargar_dataframe_basico()
     
     # Tabs para diferentes tipos de comparativas
     tab1, tab2, tab3, tab4 = st.tabs(["Déficit vs Disponibilidad", "Análisis Temporal", "Correlaciones", "Plantas Termoeléctricas"])
@@ -93,12 +120,14 @@ def app():
             df_filtered = df[mask]
             
             if not df_filtered.empty:
-                # Resampling según granularidad
+                # Medias mensuales de los agregados que mantiene el pipeline
                 if granularidad == "Mensual":
-                    df_resampled = df_filtered.resample('M').mean()
+                    df_resampled = cargar_rollups().read("mes", "mean", ["deficit", "disponibilidad"])
+                    df_resampled = df_resampled[df_resampled.index.year.isin([int(a) for a in sel_anos])]
                     fecha_format = '%b %Y'
                 else:
-                    df_resampled = df_filtered
+                    # Serie diaria reducida en rangos largos, conservando los picos de déficit
+                    df_resampled = reducir_serie(df_filtered, ['deficit', 'disponibilidad'], picos=True)
                     fecha_format = '%d/%m/%Y'
                 
                 # Preparar datos para la visualización
@@ -217,8 +246,8 @@ def app():
                 st.info(f"No hay datos suficientes para el año {ano}")
         
         elif tipo_vis == "Evolución Mensual":
-            # Agrupar datos por mes
-            df_monthly = df.resample('M').mean()
+            # Medias mensuales de los agregados que mantiene el pipeline
+            df_monthly = cargar_rollups().read("mes", "mean", [metrica])
             
             if not df_monthly.empty and not df_monthly[metrica].isna().all():
                 # Crear dataframe para la visualización
@@ -376,8 +405,8 @@ def app():
         """)
         
         # Obtener plantas estandarizadas
-        plantas = obtener_plantas(entradas)
-        df_plantas = datos_estado_plantas(entradas)
+        plantas = cargar_plantas()
+        df_plantas = cargar_estado_plantas()
         
         # No mostrar si no hay datos
         if df_plantas.empty:
@@ -402,11 +431,13 @@ def app():
                 st.info("Seleccione al menos una planta para visualizar datos")
                 return
                 
-            # Filtrar datos por plantas seleccionadas
-            df_filtered = df_plantas[df_plantas['planta'].isin(plantas_seleccionadas)]
-            
-            # Contar frecuencia de estados por planta
-            conteo = df_filtered.groupby(['planta', 'estado']).size().reset_index(name='frecuencia')
+            # Días de cada planta seleccionada en cada estado, desde la matriz de estados
+            matriz = cargar_matriz_plantas()
+            dias_estado = matriz.dias_en_estado().loc[plantas_seleccionadas]
+            conteo = dias_estado.reset_index().melt(
+                id_vars="planta", value_vars=["Avería", "Mantenimiento"], var_name="estado", value_name="frecuencia"
+            )
+            conteo = conteo[conteo["frecuencia"] > 0]
             
             # Crear gráfico de barras agrupadas
             chart = alt.Chart(conteo).mark_bar().encode(
@@ -423,28 +454,24 @@ def app():
             
             st.altair_chart(chart, use_container_width=True)
             
-            # Análisis adicional
-            total_dias = len(df_filtered['fecha'].unique())
+            # Análisis adicional: días en que alguna de las plantas seleccionadas tuvo problemas
+            total_dias = matriz.dias_afectados(plantas_seleccionadas)
             st.write(f"**Período de análisis:** {total_dias} días")
             
-            # Tabla de estadísticas
-            stats = []
-            for planta in plantas_seleccionadas:
-                planta_df = df_filtered[df_filtered['planta'] == planta]
-                dias_averia = len(planta_df[planta_df['estado'] == 'Avería'])
-                dias_mant = len(planta_df[planta_df['estado'] == 'Mantenimiento'])
-                total = dias_averia + dias_mant
-                
-                stats.append({
-                    "Planta": planta,
-                    "Días en avería": dias_averia,
-                    "Días en mantenimiento": dias_mant,
-                    "Total días con problemas": total,
-                    "% del período analizado": f"{(total / total_dias * 100):.1f}%" if total_dias > 0 else "N/A"
-                })
+            # Tabla de estadísticas; un día con avería y mantenimiento cuenta en ambos
+            problemas = (dias_estado["Avería"] + dias_estado["Mantenimiento"]).to_numpy()
+            stats = pd.DataFrame({
+                "Planta": plantas_seleccionadas,
+                "Días en avería": dias_estado["Avería"].to_numpy(),
+                "Días en mantenimiento": dias_estado["Mantenimiento"].to_numpy(),
+                "Total días con problemas": problemas,
+                "% del período analizado": [
+                    f"{(total / total_dias * 100):.1f}%" if total_dias > 0 else "N/A" for total in problemas
+                ]
+            })
             
             st.write("#### Estadísticas por planta")
-            st.table(pd.DataFrame(stats))
+            st.table(stats)
             
         elif visualizacion == "Línea de tiempo":
             # Selección de planta
@@ -502,85 +529,39 @@ def app():
                 st.metric("% tiempo en mantenimiento", f"{mant_count/total_registros*100:.1f}%" if total_registros > 0 else "N/A")
             
         elif visualizacion == "Estadísticas por planta":
-            # Calcular estadísticas para todas las plantas
-            stats_all = []
-            
-            # Fechas únicas en todo el conjunto de datos
-            all_dates = df_plantas['fecha'].unique()
-            total_days = len(all_dates)
-            
-            for planta in plantas:
-                df_planta = df_plantas[df_plantas['planta'] == planta]
-                
-                if df_planta.empty:
-                    continue
-                    
-                dias_averia = len(df_planta[df_planta['estado'] == 'Avería'])
-                dias_mant = len(df_planta[df_planta['estado'] == 'Mantenimiento'])
-                total_problemas = dias_averia + dias_mant
-                
-                # Calcular el período más largo en cada estado
-                periodos = []
-                current_state = None
-                current_start = None
-                
-                for date in sorted(all_dates):
-                    # Buscar si hay registro para esta fecha
-                    registros = df_planta[df_planta['fecha'] == date]
-                    
-                    if len(registros) > 0:
-                        estado = registros.iloc[0]['estado']
-                        
-                        if current_state is None:
-                            # Inicio de un nuevo período
-                            current_state = estado
-                            current_start = date
-                        elif estado != current_state:
-                            # Cambio de estado
-                            periodos.append({
-                                'estado': current_state,
-                                'inicio': current_start,
-                                'fin': date,
-                                'duracion': (date - current_start).days
-                            })
-                            current_state = estado
-                            current_start = date
-                    else:
-                        # No hay registro para esta fecha, terminar período actual si existe
-                        if current_state is not None:
-                            periodos.append({
-                                'estado': current_state,
-                                'inicio': current_start,
-                                'fin': date,
-                                'duracion': (date - current_start).days
-                            })
-                            current_state = None
-                            current_start = None
-                
-                # Calcular períodos más largos
-                if periodos:
-                    periodo_averia = max([p['duracion'] for p in periodos if p['estado'] == 'Avería'], default=0)
-                    periodo_mant = max([p['duracion'] for p in periodos if p['estado'] == 'Mantenimiento'], default=0)
-                else:
-                    periodo_averia = 0
-                    periodo_mant = 0
-                
-                stats_all.append({
-                    "Planta": planta,
-                    "Días en avería": dias_averia,
-                    "Días en mantenimiento": dias_mant,
-                    "Total días con problemas": total_problemas,
-                    "% del período analizado": f"{(total_problemas / total_days * 100):.1f}%" if total_days > 0 else "N/A",
-                    "Período más largo en avería (días)": periodo_averia,
-                    "Período más largo en mantenimiento (días)": periodo_mant
-                })
+            # Días en cada estado y periodos continuos de todas las plantas, calculados
+            # sobre la matriz de estados con una sola codificación run-length.
+            # El período de análisis son los días en que alguna planta tuvo problemas
+            matriz = cargar_matriz_plantas()
+            total_days = matriz.dias_afectados(matriz.plantas)
+            dias_estado = matriz.dias_en_estado()
+            rachas = periodos_mas_largos(matriz)
+            
+            stats_df = pd.DataFrame({
+                "Planta": matriz.plantas,
+                "Días en avería": dias_estado["Avería"].to_numpy(),
+                "Días en mantenimiento": dias_estado["Mantenimiento"].to_numpy(),
+                "Total días con problemas": (dias_estado["Avería"] + dias_estado["Mantenimiento"]).to_numpy(),
+                "Período más largo en avería (días)": rachas["Avería"].to_numpy(),
+                "Período más largo en mantenimiento (días)": rachas["Mantenimiento"].to_numpy()
+            })
+            stats_df = stats_df[stats_df["Total días con problemas"] > 0]
+            stats_df.insert(
+                4,
+                "% del período analizado",
+                [f"{(total / total_days * 100):.1f}%" if total_days > 0 else "N/A" for total in stats_df["Total días con problemas"]]
+            )
             
             # Ordenar por total de días con problemas (descendente)
-            stats_df = pd.DataFrame(stats_all).sort_values("Total días con problemas", ascending=False)
+            stats_df = stats_df.sort_values("Total días con problemas", ascending=False)
             
             # Mostrar tabla general
             st.write("#### Estadísticas generales por planta")
             st.write(f"Período de análisis: {total_days} días")
+            st.caption(
+                "Los períodos más largos se miden en días naturales desde su inicio hasta el siguiente día "
+                "con otro estado; los que siguen abiertos el último día no se cuentan."
+            )
             st.dataframe(stats_df)
             
             # Visualización gráfica de las plantas con más problemas
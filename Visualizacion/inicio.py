@@ -1,14 +1,23 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from .utils import cargar_datos, preparar_dataframe_basico
+from .utils import cargar_datos, cargar_indice_periodos
+from storage.plant_names import get_canonical_plant_name
+
+# Añadir a la tabla de plantas de un día el inicio del periodo en curso en ese estado
+# y los días que lleva, consultando el índice de periodos de las plantas
+def agregar_periodo_en_curso(df, fecha, estado, columna):
+    en_curso = cargar_indice_periodos().at(fecha, estado=estado).set_index("planta")["inicio"]
+    inicios = pd.to_datetime(df["Central Termoeléctrica"].map(get_canonical_plant_name).map(en_curso))
+    df[columna] = inicios.dt.strftime("%d/%m/%Y").fillna("N/D")
+    df["Días consecutivos"] = ((pd.Timestamp(fecha).normalize() - inicios).dt.days + 1).astype("Int64")
+    return df
 
 def app():
     st.header("Reporte Diario")
     st.markdown("---")
     
     entradas = cargar_datos()
-    df = preparar_dataframe_basico(entradas)
     
     # Obtener el último día disponible y ordenar por fecha
     entradas_ordenadas = sorted(entradas, key=lambda x: x["fecha"], reverse=True)
@@ -205,7 +214,10 @@ def app():
             
             # Mostrar tabla de plantas en avería con mejor estilo
             if plantas_data:
-                st.dataframe(pd.DataFrame(plantas_data), use_container_width=True)
+                df_averia = agregar_periodo_en_curso(
+                    pd.DataFrame(plantas_data), fecha_seleccionada_dt, "Avería", "En avería desde"
+                )
+                st.dataframe(df_averia, use_container_width=True)
             else:
                 st.info("No hay detalles específicos de las unidades afectadas")
         else:
@@ -238,7 +250,10 @@ def app():
                 })
             
             # Mostrar tabla de plantas en mantenimiento con mejor estilo
-            st.dataframe(pd.DataFrame(mantenimiento_data), use_container_width=True)
+            df_mantenimiento = agregar_periodo_en_curso(
+                pd.DataFrame(mantenimiento_data), fecha_seleccionada_dt, "Mantenimiento", "En mantenimiento desde"
+            )
+            st.dataframe(df_mantenimiento, use_container_width=True)
         else:
             st.success("No hay plantas reportadas en mantenimiento programado")
     
@@ -307,6 +322,8 @@ def app():
             
             patanas_data = []
             for patana in patanas_con_problemas:
+                if not isinstance(patana, dict):
+                    continue
                 patanas_data.append({
                     "Nombre": patana.get("nombre", "No especificado"),
                     "Ubicación": patana.get("ubicacion", "No especificada"),
@@ -61,7 +61,7 @@ def format_info_matutina(info):
         lines.append("- Proyección mediodía: No se reportaron datos")
     return lines
 
-from .plant_standardizer import get_canonical_plant_name
+from storage.plant_names import get_canonical_plant_name
 
 def format_plantas(plantas):
     lines = []
@@ -112,6 +112,8 @@ def format_distribuida(dist):
     if patanas:
         lines.append("Patana(s) con problemas:")
         for p in patanas:
+            if not isinstance(p, dict):
+                continue
             nombre = p.get('patana_nombre') or "Nombre no disponible"
             m_aff = p.get('motores_afectados')
             mw_aff = p.get('mw_afectados')
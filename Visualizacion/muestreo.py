@@ -0,0 +1,68 @@
+"""
+Reducción de series diarias para los gráficos de líneas.
+
+No depende de streamlit, así que se puede usar y probar fuera de la
+visualización; utils reexporta estas funciones para las páginas.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# Puntos por serie que se envían al navegador en los gráficos de líneas, más o
+# menos uno por píxel de un gráfico a todo el ancho. Las series de un rango con
+# más días se reducen en el servidor antes de pasarlas a plotly o altair
+PUNTOS_GRAFICO = int(os.environ.get("PUNTOS_GRAFICO", "1000"))
+
+# Largest-Triangle-Three-Buckets: conserva el primer y el último punto y, de cada
+# uno de los umbral - 2 tramos intermedios, el que forma el triángulo de mayor
+# área con el punto elegido en el tramo anterior y la media del siguiente
+def indices_lttb(x, y, umbral):
+    n = len(y)
+    if umbral >= n or umbral < 3:
+        return np.arange(n)
+    bordes = np.linspace(1, n - 1, umbral - 1).astype(np.int64)
+    indices = np.empty(umbral, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(umbral - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        siguiente = slice(fin, bordes[i + 2] if i + 2 < len(bordes) else n)
+        cx, cy = x[siguiente].mean(), y[siguiente].mean()
+        areas = np.abs((x[a] - cx) * (y[inicio:fin] - y[a]) - (x[a] - x[inicio:fin]) * (cy - y[a]))
+        a = inicio + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
+
+# Mínimo y máximo de cada uno de umbral / 2 tramos, además del primer y el último
+# punto: todos los picos a la resolución del gráfico quedan en la serie reducida
+def indices_min_max(y, umbral):
+    n = len(y)
+    if umbral >= n or umbral < 2:
+        return np.arange(n)
+    bordes = np.linspace(0, n, umbral // 2 + 1).astype(np.int64)
+    inicios = bordes[:-1]
+    maximos = [inicio + int(np.argmax(y[inicio:fin])) for inicio, fin in zip(inicios, bordes[1:])]
+    minimos = [inicio + int(np.argmin(y[inicio:fin])) for inicio, fin in zip(inicios, bordes[1:])]
+    return np.unique(np.concatenate([[0, n - 1], maximos, minimos]).astype(np.int64))
+
+# Reducir las filas de un DataFrame indexado por fecha para un gráfico de líneas.
+# Cada columna se reduce por separado (sin sus NaN) y se conservan las filas
+# elegidas para alguna de ellas. Con picos=True se usa mínimo/máximo por tramo,
+# que nunca pierde un máximo (p. ej. del déficit); si no, LTTB. Los rangos cortos,
+# con menos días que max_puntos, se devuelven completos
+def reducir_serie(df, columnas=None, max_puntos=None, picos=False):
+    max_puntos = max_puntos or PUNTOS_GRAFICO
+    if len(df) <= max_puntos:
+        return df
+    x = pd.DatetimeIndex(df.index).asi8 / 8.64e13  # días
+    seleccion = np.zeros(len(df), dtype=bool)
+    for columna in columnas or list(df.select_dtypes("number").columns):
+        valores = df[columna].to_numpy(dtype="float64", na_value=np.nan)
+        presentes = np.flatnonzero(~np.isnan(valores))
+        if picos:
+            indices = indices_min_max(valores[presentes], max_puntos)
+        else:
+            indices = indices_lttb(x[presentes], valores[presentes], max_puntos)
+        seleccion[presentes[indices]] = True
+    return df[seleccion]
@@ -1,21 +1,200 @@
 import os
 import json
+import time
+import threading
+import functools
 import pandas as pd
 import numpy as np
 import streamlit as st
 from datetime import datetime, date
-import altair as alt
+
+from storage import (
+    DailyMetricsFile,
+    MetricsTable,
+    OutageIndex,
+    PartitionedStore,
+    PlantStatusMatrix,
+    RollupTables,
+    SnapshotStore,
+    SQLiteStore,
+)
+from storage.migrations import migrate_record
+from storage.outage_index import HUECO_MAXIMO_DIAS
+from storage.metrics_table import CAMPOS, COLUMNAS_METRICAS
+
+from .muestreo import reducir_serie
+
+DIR_PROCESADOS = os.path.join(os.path.dirname(__file__), os.pardir, "data", "processed")
+
+# Snapshot fijado con la variable de entorno SNAPSHOT_DATOS (un id o "latest"); mientras
+# esté fijado, la visualización lee sólo ese snapshot y no los archivos derivados
+SNAPSHOT_FIJADO = os.environ.get("SNAPSHOT_DATOS")
+
+# Almacén particionado, o la vista de sólo lectura del snapshot fijado
+def abrir_almacen():
+    store = PartitionedStore(os.path.join(DIR_PROCESADOS, "store"))
+    if SNAPSHOT_FIJADO:
+        return SnapshotStore(store).view(SNAPSHOT_FIJADO)
+    return store
+
+# Base de datos SQLite con consultas indexadas por fecha (None si no se ha creado)
+def abrir_base_datos():
+    if SNAPSHOT_FIJADO:
+        return None
+    db = SQLiteStore(os.path.join(DIR_PROCESADOS, "datos_electricos.db"))
+    return db if db.exists() else None
+
+# Tabla Parquet de métricas aplanadas (None si no se ha creado)
+def abrir_tabla_metricas():
+    if SNAPSHOT_FIJADO:
+        return None
+    tabla = MetricsTable(os.path.join(DIR_PROCESADOS, "metricas.parquet"))
+    return tabla if tabla.exists() else None
+
+# Serie diaria de métricas en un archivo binario mapeado en memoria (None si no se ha creado)
+def abrir_metricas_diarias():
+    if SNAPSHOT_FIJADO:
+        return None
+    metricas = DailyMetricsFile(os.path.join(DIR_PROCESADOS, "metricas_diarias.npy"))
+    return metricas if metricas.exists() else None
+
+# Archivos derivados cuya fecha de modificación forma parte de la versión de los datos
+ARCHIVOS_DERIVADOS = (
+    "datos_electricos.db",
+    "metricas.parquet",
+    "metricas_diarias.npy",
+    "intervalos_plantas.npz",
+    "rollups.parquet",
+    "datos_electricos_organizados.json",
+)
+
+# Segundos durante los que se reutiliza la versión de los datos sin consultar el disco
+INTERVALO_VERIFICACION = float(os.environ.get("CACHE_DATOS_INTERVALO", "30"))
+
+# Versión de los datos: la del almacén (o el id del snapshot fijado) y las fechas de
+# modificación de los archivos derivados. Sólo consulta metadatos, no lee los archivos
+def version_datos():
+    marcas = [abrir_almacen().version()]
+    if not SNAPSHOT_FIJADO:
+        for nombre in ARCHIVOS_DERIVADOS:
+            try:
+                marcas.append(os.stat(os.path.join(DIR_PROCESADOS, nombre)).st_mtime_ns)
+            except OSError:
+                marcas.append(0)
+    return tuple(marcas)
+
+class CacheDatos:
+    """
+    Caché de los datos cargados y de los DataFrames derivados, compartida por
+    todas las sesiones del proceso. Todas las entradas se descartan cuando
+    cambia la versión de los datos, que se consulta como mucho una vez cada
+    INTERVALO_VERIFICACION segundos: las interacciones con los widgets no
+    acceden al disco.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas = {}
+        self._version = None
+        self._verificada = 0.0
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def version(self):
+        ahora = time.monotonic()
+        with self._lock:
+            if self._version is not None and ahora - self._verificada < INTERVALO_VERIFICACION:
+                return self._version
+        version = version_datos()
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self.invalidaciones += 1
+                self._entradas.clear()
+                self._version = version
+            self._verificada = ahora
+        return version
+
+    def obtener(self, clave, cargar):
+        version = self.version()
+        with self._lock:
+            if clave in self._entradas:
+                self.aciertos += 1
+                return self._entradas[clave]
+            self.fallos += 1
+        valor = cargar()
+        with self._lock:
+            # Si los datos cambiaron mientras se cargaban, el valor no se guarda
+            if version == self._version:
+                self._entradas[clave] = valor
+        return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._version = None
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "invalidaciones": self.invalidaciones,
+                "entradas": len(self._entradas),
+                "version": self._version,
+            }
+
+# Una sola caché por proceso, compartida entre sesiones
+@st.cache_resource
+def cache_datos():
+    return CacheDatos()
+
+# Las páginas reciben una copia de los DataFrames y listas de la caché para que
+# modificarlos no altere lo que ven las demás sesiones
+def _copia(valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return valor.copy()
+    if isinstance(valor, list):
+        return list(valor)
+    return valor
+
+# Decorador para las funciones de carga: el resultado se guarda en la caché del
+# proceso con la función y sus argumentos como clave
+def cacheado(funcion):
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        clave = (funcion.__module__, funcion.__qualname__, args, tuple(sorted(kwargs.items())))
+        return _copia(cache_datos().obtener(clave, lambda: funcion(*args, **kwargs)))
+    envoltura.sin_cache = funcion
+    return envoltura
+
+# Aciertos, fallos y entradas de la caché de datos
+def estadisticas_cache():
+    return cache_datos().estadisticas()
 
 # Función para cargar todos los datos
-def cargar_datos():
-    base_dir = os.path.dirname(__file__)
-    ruta = os.path.join(base_dir, os.pardir, "data", "processed", "datos_electricos_organizados.json")
-    with open(ruta, "r", encoding="utf-8") as f:
-        raw = json.load(f)
+# desde/hasta (YYYY-MM) permiten cargar sólo el rango de fechas necesario
+@cacheado
+def cargar_datos(desde=None, hasta=None):
+    db = abrir_base_datos()
+    if db is not None:
+        return db.reportes(desde, hasta)
+    store = abrir_almacen()
+    if store.exists():
+        raw = store.load(desde, hasta)
+    else:
+        ruta = os.path.join(DIR_PROCESADOS, "datos_electricos_organizados.json")
+        with open(ruta, "r", encoding="utf-8") as f:
+            raw = json.load(f)
     entradas = []
     for anio in raw:
         for mes in raw[anio]:
-            for rec in raw[anio][mes]:                
+            for rec in raw[anio][mes]:
+                # El JSON original no está migrado; el almacén y la base de datos sí
+                migrate_record(rec)
                 dt = datetime.fromisoformat(rec["fecha"])
                 enlace = rec.get("enlace", "")
                 entradas.append({"fecha": dt, "datos": rec["datos"], "enlace": enlace})
@@ -32,46 +211,91 @@ def eliminar_dias_repetidos(entradas):
             unicas.append(e)
     return unicas
 
-# Función para preparar dataframe básico
+# Columnas del dataframe básico y de los datos solares en la tabla de características
+COLUMNAS_BASICAS = ["afectacion", "disponibilidad", "demanda", "deficit", "respaldo"]
+COLUMNAS_SOLARES = ["produccion_mwh", "parques", "capacidad_instalada"]
+
+# Aplanar los reportes con json_normalize: una fila por reporte con las métricas
+# de storage.metrics_table.CAMPOS y el enlace, indexada por fecha
+def aplanar_entradas(entradas):
+    rutas = {f"{seccion}.{campo}": columna for columna, (seccion, campo) in CAMPOS.items()}
+    df = pd.json_normalize([e["datos"] for e in entradas]).reindex(columns=list(rutas)).rename(columns=rutas)
+    df.index = pd.DatetimeIndex([e["fecha"] for e in entradas], name="fecha")
+    df["enlace"] = [e["enlace"] for e in entradas]
+    return df
+
+# Tabla de características: métricas en float64 (los valores no numéricos quedan
+# como NaN) y las columnas calculadas que usan las páginas, una fila por día
+def preparar_tabla_caracteristicas(df):
+    df = df.sort_index()
+    tabla = pd.DataFrame(index=df.index)
+    for columna in COLUMNAS_METRICAS:
+        valores = df[columna] if columna in df else np.nan
+        tabla[columna] = pd.to_numeric(valores, errors="coerce").astype("float64")
+    tabla["porcentaje_deficit"] = tabla["deficit"] / tabla["demanda"].where(tabla["demanda"] > 0) * 100
+    # Las medias móviles sólo cuentan los días con déficit, como el análisis de déficit
+    deficit = tabla["deficit"].dropna()
+    tabla["deficit_7d_avg"] = deficit.rolling(window=7, min_periods=1).mean().reindex(tabla.index)
+    tabla["deficit_30d_avg"] = deficit.rolling(window=30, min_periods=1).mean().reindex(tabla.index)
+    tabla["dia_semana"] = tabla.index.day_name()
+    tabla["mes"] = tabla.index.month_name()
+    tabla["año"] = tabla.index.year
+    enlaces = df["enlace"] if "enlace" in df else pd.Series("", index=df.index)
+    tabla["enlace"] = enlaces.fillna("").astype(str)
+    return tabla
+
+# Filas de la tabla en un rango de fechas YYYY[-MM[-DD]] (inclusive)
+def filtrar_fechas(tabla, desde=None, hasta=None):
+    return tabla.loc[desde:hasta]
+
+# Cargar la tabla de características completa, una vez por versión de los datos, desde
+# el archivo de métricas diarias mapeado en memoria, la tabla de métricas, la base de
+# datos o los reportes, en ese orden
+@cacheado
+def cargar_tabla_caracteristicas():
+    metricas = abrir_metricas_diarias()
+    tabla = abrir_tabla_metricas()
+    db = abrir_base_datos()
+    if metricas is not None:
+        df = metricas.read(COLUMNAS_METRICAS)
+        if tabla is not None:
+            enlaces = tabla.read(["enlace"])["enlace"]
+            df["enlace"] = enlaces[~enlaces.index.duplicated()].reindex(df.index)
+    elif tabla is not None:
+        df = tabla.read(["enlace"] + COLUMNAS_METRICAS)
+    elif db is not None:
+        df = db.prediccion().join(db.solar(), how="left")
+    else:
+        df = aplanar_entradas(cargar_datos())
+    return preparar_tabla_caracteristicas(df)
+
+# Dataframe básico de un conjunto de reportes
 def preparar_dataframe_basico(entradas):
-    filas = []
-    for e in entradas:
-        pred = e["datos"].get("prediccion", {})
-        filas.append({
-            "fecha": e["fecha"],
-            "afectacion": pred.get("afectacion"),
-            "disponibilidad": pred.get("disponibilidad"),
-            "demanda": pred.get("demanda_maxima"),
-            "deficit": pred.get("deficit"),
-            "respaldo": pred.get("respaldo")
-        })
-    return pd.DataFrame(filas).set_index("fecha").sort_index()
+    return preparar_tabla_caracteristicas(aplanar_entradas(entradas))[COLUMNAS_BASICAS]
+
+# Cargar el dataframe básico (columnas de la tabla de características)
+def cargar_dataframe_basico(desde=None, hasta=None):
+    return filtrar_fechas(cargar_tabla_caracteristicas(), desde, hasta)[COLUMNAS_BASICAS]
 
 # Preparar datos para energía solar
 def preparar_datos_solares(entradas):
-    filas = []
-    for e in entradas:
-        d = e["fecha"]
-        sol = e["datos"].get("paneles_solares", {})
-        filas.append({
-            "fecha": d, 
-            "produccion_mwh": sol.get("produccion_mwh"),
-            "parques": sol.get("cantidad_parques"),
-            "capacidad_instalada": sol.get("capacidad_instalada")
-        })
-    return pd.DataFrame(filas).set_index("fecha").sort_index()
+    return preparar_tabla_caracteristicas(aplanar_entradas(entradas))[COLUMNAS_SOLARES]
+
+# Cargar datos solares (columnas de la tabla de características)
+def cargar_datos_solares(desde=None, hasta=None):
+    return filtrar_fechas(cargar_tabla_caracteristicas(), desde, hasta)[COLUMNAS_SOLARES]
 
 # Importar el estandarizador de nombres de plantas
-from .plant_standardizer import get_canonical_plant_name
+from storage.plant_names import get_canonical_plant_name
 
 # Obtener lista de plantas
 def obtener_plantas(entradas):
     plantas = set()
     for e in entradas:
-        pls = e["datos"].get("plantas", {})
+        pls = e["datos"]["plantas"]
         for clave in ("averia", "mantenimiento"):
-            for p in pls.get(clave, []):
-                nombre = p.get("planta")
+            for p in pls[clave]:
+                nombre = p["planta"]
                 if nombre:
                     # Estandarizar el nombre de la planta
                     nombre_canonico = get_canonical_plant_name(nombre)
@@ -80,58 +304,102 @@ def obtener_plantas(entradas):
                         plantas.add(nombre_canonico)
     return sorted(plantas)
 
-# Función para obtener datos de estado de plantas
-def datos_estado_plantas(entradas):
+# Función para obtener datos de estado de plantas, con los nombres canónicos o
+# con los nombres tal como aparecen en los reportes
+def datos_estado_plantas(entradas, canonica=True):
     filas = []
     for e in entradas:
-        pls = e["datos"].get("plantas", {})
+        pls = e["datos"]["plantas"]
         fecha = e["fecha"]
-          # Plantas en avería
-        for p in pls.get("averia", []):
-            nombre = p.get("planta")
-            if nombre:
-                # Estandarizar el nombre de la planta
-                nombre_canonico = get_canonical_plant_name(nombre)
-                # Solo añadir nombres válidos (no None)
-                if nombre_canonico is not None:
-                    filas.append({
-                        "fecha": fecha,
-                        "planta": nombre_canonico,
-                        "estado": "Avería"
-                    })
-          # Plantas en mantenimiento
-        for p in pls.get("mantenimiento", []):
-            nombre = p.get("planta")
-            if nombre:
-                # Estandarizar el nombre de la planta
-                nombre_canonico = get_canonical_plant_name(nombre)
-                # Solo añadir nombres válidos (no None)
-                if nombre_canonico is not None:
-                    filas.append({
-                        "fecha": fecha,
-                        "planta": nombre_canonico,
-                        "estado": "Mantenimiento"
-                    })
+        for clave, estado in (("averia", "Avería"), ("mantenimiento", "Mantenimiento")):
+            for p in pls[clave]:
+                nombre = p["planta"]
+                if nombre:
+                    # Estandarizar el nombre de la planta
+                    if canonica:
+                        nombre = get_canonical_plant_name(nombre)
+                    # Solo añadir nombres válidos (no None)
+                    if nombre is not None:
+                        filas.append({
+                            "fecha": fecha,
+                            "planta": nombre,
+                            "estado": estado
+                        })
     
     return pd.DataFrame(filas)
 
-# Función para extraer métricas clave
-def obtener_metricas_clave(entradas):
-    ultimo_registro = max(entradas, key=lambda x: x["fecha"])
-    datos = ultimo_registro["datos"]
-    pred = datos.get("prediccion", {})
-    
-    return {
-        "fecha": ultimo_registro["fecha"],
-        "afectacion": pred.get("afectacion"),
-        "disponibilidad": pred.get("disponibilidad"),
-        "demanda_maxima": pred.get("demanda_maxima"),
-        "deficit": pred.get("deficit"),
-        "respaldo": pred.get("respaldo")
-    }
-
-# Función para crear gráficos interactivos con altair
+# Cargar plantas y sus estados usando el índice por planta canónica de la base de datos
+@cacheado
+def cargar_plantas():
+    db = abrir_base_datos()
+    if db is not None:
+        return db.plantas()
+    return obtener_plantas(cargar_datos())
+
+@cacheado
+def cargar_estado_plantas(desde=None, hasta=None, planta=None, canonica=True):
+    db = abrir_base_datos()
+    if db is not None:
+        return db.estado_plantas(desde, hasta, planta, canonica)
+    df = datos_estado_plantas(cargar_datos(desde, hasta), canonica)
+    if planta is not None and not df.empty:
+        df = df[df["planta"] == planta]
+    return df
+
+# Matriz plantas × días con el estado de cada planta (ver storage.plant_status),
+# construida una vez por versión de los datos. Con canonica=False las filas son
+# los nombres tal como aparecen en los reportes
+@cacheado
+def cargar_matriz_plantas(canonica=True):
+    return PlantStatusMatrix.from_states(
+        cargar_estado_plantas(canonica=canonica),
+        fechas=cargar_tabla_caracteristicas().index,
+        plantas=cargar_plantas() if canonica else None,
+    )
+
+# Índice de periodos de avería y mantenimiento de las plantas: el que escribe el
+# pipeline o, si no existe, uno construido a partir de la matriz de estados
+@cacheado
+def cargar_indice_periodos():
+    ruta = os.path.join(DIR_PROCESADOS, "intervalos_plantas.npz")
+    if not SNAPSHOT_FIJADO and os.path.exists(ruta):
+        return OutageIndex.open(ruta)
+    return OutageIndex(cargar_matriz_plantas().intervalos(max_hueco=HUECO_MAXIMO_DIAS))
+
+# Agregados por semana, mes, día de la semana y mes del año: los que mantiene el
+# pipeline o, si no existen o son de un formato anterior, los calculados a partir
+# de la tabla de características
+@cacheado
+def cargar_rollups():
+    ruta = os.path.join(DIR_PROCESADOS, "rollups.parquet")
+    if not SNAPSHOT_FIJADO and os.path.exists(ruta):
+        rollups = RollupTables(ruta)
+        if rollups.vigente():
+            return rollups
+    return RollupTables.from_daily(cargar_tabla_caracteristicas())
+
+# Función para extraer métricas clave del último día de la tabla de características
+def obtener_metricas_clave(tabla):
+    ultimo = tabla.sort_index().iloc[-1]
+    metricas = {"fecha": ultimo.name}
+    for clave, columna in (
+        ("afectacion", "afectacion"),
+        ("disponibilidad", "disponibilidad"),
+        ("demanda_maxima", "demanda"),
+        ("deficit", "deficit"),
+        ("respaldo", "respaldo"),
+    ):
+        metricas[clave] = None if pd.isna(ultimo[columna]) else ultimo[columna]
+    return metricas
+
+# Función para crear gráficos interactivos con altair. Altair se importa al crear
+# el gráfico: utils lo importan todas las páginas y no todas dibujan con altair
 def crear_grafico_temporal(df, y_column, color_column=None, title=None):
+    import altair as alt
+    
+    if not color_column:
+        df = reducir_serie(df, [y_column])
+    
     if color_column:
         chart = alt.Chart(df.reset_index()).mark_line().encode(
             x=alt.X('fecha:T', title='Fecha'),
@@ -153,6 +421,8 @@ def crear_grafico_temporal(df, y_column, color_column=None, title=None):
 
 # Función para crear gráficos de heatmap
 def crear_heatmap(df, x_column, y_column, color_column, title=None):
+    import altair as alt
+    
     chart = alt.Chart(df).mark_rect().encode(
         x=alt.X(f'{x_column}:O', title=x_column.capitalize()),
         y=alt.Y(f'{y_column}:O', title=y_column.capitalize()),
@@ -230,6 +500,8 @@ def analizar_tendencia(df, columna):
 
 # Función para crear paletas de colores personalizadas
 def get_color_palette(n_colors=3, palette_type="sequential"):
+    import altair as alt
+    
     if palette_type == "sequential":
         return alt.Scale(scheme='blues')
     elif palette_type == "diverging":
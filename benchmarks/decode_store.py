@@ -0,0 +1,121 @@
+"""
+Benchmark de carga del almacén particionado con distintos decodificadores.
+
+Construye un almacén sintético replicando los registros reales `--scale` veces
+(cada copia desplazada a otros años para conservar particiones mensuales) y
+mide el tiempo de cargar todos los registros:
+
+- json: json.load + datetime.fromisoformat por registro (como cargar_datos)
+- orjson: PartitionedStore.iter_records (orjson si está instalado) + fromisoformat
+- msgspec: PartitionedStore.iter_typed con los structs de template.json
+- msgspec (prediccion): iter_typed decodificando sólo la sección prediccion
+
+Uso:
+    python benchmarks/decode_store.py --scale 20
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import PartitionedStore
+from storage.records import orjson, typed_available
+
+
+def crear_almacen_sintetico(origen: PartitionedStore, destino: str, escala: int) -> int:
+    """
+    Replica los registros de origen `escala` veces en un almacén nuevo.
+
+    Returns:
+        int: Número total de registros escritos
+    """
+    datos = origen.load()
+    años = sorted(int(a) for a in datos)
+    desplazamiento = años[-1] - años[0] + 1
+
+    sintetico = {}
+    for copia in range(escala):
+        for año, meses in datos.items():
+            nuevo_año = str(int(año) + copia * desplazamiento)
+            for mes, registros in meses.items():
+                sintetico.setdefault(nuevo_año, {})[mes] = [
+                    {
+                        **r,
+                        "enlace": f"{r['enlace']}#{copia}",
+                        "fecha": nuevo_año + r["fecha"][4:],
+                    }
+                    for r in registros
+                ]
+    return PartitionedStore(destino).import_nested(sintetico)
+
+
+def cargar_json(store: PartitionedStore) -> int:
+    total = 0
+    for año, mes in store.partitions():
+        with open(store._partition_path(año, mes), "r", encoding="utf-8") as f:
+            for rec in json.load(f):
+                datetime.fromisoformat(rec["fecha"])
+                total += 1
+    return total
+
+
+def cargar_rapido(store: PartitionedStore) -> int:
+    total = 0
+    for rec in store.iter_records():
+        datetime.fromisoformat(rec["fecha"])
+        total += 1
+    return total
+
+
+def cargar_tipado(store: PartitionedStore, solo_prediccion: bool = False) -> int:
+    return sum(1 for _ in store.iter_typed(solo_prediccion=solo_prediccion))
+
+
+def medir(funcion, *args, repeticiones: int = 3) -> float:
+    """Mejor tiempo (en segundos) de varias ejecuciones."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark store decoding.")
+    parser.add_argument(
+        "--store",
+        default=os.path.join("data", "processed", "store"),
+        help="Partitioned store used as the source of real records",
+    )
+    parser.add_argument("--scale", type=int, default=20, help="Copies of the real records")
+    args = parser.parse_args()
+
+    origen = PartitionedStore(args.store)
+    if not origen.exists():
+        sys.exit(f"No existe el almacén {args.store}; ejecute python -m storage.partitioned")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        total = crear_almacen_sintetico(origen, tmp, args.scale)
+        store = PartitionedStore(tmp)
+        tamaño = sum(info["bytes"] for info in store.load_manifest()["particiones"].values())
+        print(f"Almacén sintético: {total} registros, {tamaño / 1e6:.1f} MB, escala x{args.scale}")
+
+        casos = [("json", cargar_json, ())]
+        casos.append(("orjson" if orjson is not None else "json (sin orjson)", cargar_rapido, ()))
+        if typed_available():
+            casos.append(("msgspec", cargar_tipado, (False,)))
+            casos.append(("msgspec (prediccion)", cargar_tipado, (True,)))
+        else:
+            print("msgspec no está instalado; se omiten los structs tipados")
+
+        base = None
+        for nombre, funcion, extra in casos:
+            segundos = medir(funcion, store, *extra)
+            base = base or segundos
+            print(f"{nombre:<22} {segundos * 1000:9.1f} ms  x{base / segundos:5.1f}")
@@ -0,0 +1,155 @@
+"""
+Benchmark del arranque en frío de la visualización.
+
+streamlit_app importa sólo la página seleccionada, así que el tiempo hasta la
+primera vista es, sobre todo, el de importar esa página. Este benchmark
+importa cada página en un intérprete nuevo con `python -X importtime`, resta
+los módulos que el intérprete ya carga al arrancar y muestra:
+
+- el tiempo total de importación de la página,
+- los módulos con mayor tiempo acumulado,
+- las librerías pesadas (plotly, altair, matplotlib, scipy) que se cargaron.
+
+Cada página debe cargar sólo las librerías de gráficos que usa: utils e
+inicio ninguna, Disponibilidad y comparativas altair, y Deficit plotly (scipy
+se importa al calcular la tendencia). El benchmark termina con error si una
+página carga una librería de más o supera el presupuesto indicado.
+
+Uso:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --presupuesto 1500 --top 15
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PESADAS = ["plotly", "altair", "matplotlib", "scipy"]
+
+# Página -> librerías pesadas que puede cargar al importarse
+PERMITIDAS = {
+    "Visualizacion.utils": [],
+    "Visualizacion.inicio": [],
+    "Visualizacion.Deficit": ["plotly"],
+    "Visualizacion.Disponibilidad": ["altair"],
+    "Visualizacion.comparativas": ["altair"],
+}
+
+LINEA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def _importtime(codigo: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Ejecuta código en un intérprete nuevo con -X importtime.
+
+    Returns:
+        List[Tuple[str, int, int, int]]: (módulo, propio µs, acumulado µs, nivel)
+        en el orden del informe
+    """
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ,
+        capture_output=True,
+        text=True,
+    )
+    if resultado.returncode != 0:
+        error = resultado.stderr.strip().splitlines()
+        raise RuntimeError(error[-1] if error else f"código de salida {resultado.returncode}")
+    filas = []
+    for linea in resultado.stderr.splitlines():
+        coincidencia = LINEA.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, modulo = coincidencia.groups()
+            filas.append((modulo, int(propio), int(acumulado), len(sangria) // 2))
+    return filas
+
+
+def informe_importacion(modulo: str, repeticiones: int = 3) -> Dict:
+    """
+    Mejor informe de importación de un módulo en varios intérpretes nuevos.
+
+    Args:
+        modulo: Módulo a importar
+        repeticiones: Intérpretes a lanzar
+
+    Returns:
+        Dict: total_ms (sin los módulos del arranque del intérprete), modulos
+        ({nombre: ms acumulados}) y pesadas (librerías pesadas cargadas)
+    """
+    arranque = {nombre for nombre, _, _, _ in _importtime("pass")}
+    mejor = None
+    for _ in range(repeticiones):
+        filas = [fila for fila in _importtime(f"import {modulo}") if fila[0] not in arranque]
+        total = sum(acumulado for _, _, acumulado, nivel in filas if nivel == 0) / 1000
+        if mejor is None or total < mejor["total_ms"]:
+            mejor = {
+                "total_ms": total,
+                "modulos": {nombre: acumulado / 1000 for nombre, _, acumulado, _ in filas},
+            }
+    mejor["pesadas"] = sorted(
+        {nombre.split(".")[0] for nombre in mejor["modulos"]} & set(PESADAS)
+    )
+    return mejor
+
+
+def verificar(modulo: str, informe: Dict, presupuesto: Optional[float]) -> List[str]:
+    """
+    Problemas del informe de una página frente a PERMITIDAS y al presupuesto.
+
+    Returns:
+        List[str]: Descripción de cada problema (vacía si no hay ninguno)
+    """
+    problemas = []
+    for libreria in informe["pesadas"]:
+        if libreria not in PERMITIDAS.get(modulo, PESADAS):
+            problemas.append(f"{modulo} importa {libreria} al cargarse")
+    if presupuesto is not None and informe["total_ms"] > presupuesto:
+        problemas.append(
+            f"{modulo} tarda {informe['total_ms']:.0f} ms en importarse (presupuesto {presupuesto:.0f} ms)"
+        )
+    return problemas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cold-start import time of the dashboard pages.")
+    parser.add_argument(
+        "--modulos",
+        nargs="+",
+        default=list(PERMITIDAS),
+        help="Modules to import (default: the dashboard pages)",
+    )
+    parser.add_argument("--repeticiones", type=int, default=3, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list per page")
+    parser.add_argument(
+        "--presupuesto",
+        type=float,
+        default=None,
+        help="Maximum import time per page in milliseconds",
+    )
+    args = parser.parse_args()
+
+    problemas = []
+    for modulo in args.modulos:
+        try:
+            informe = informe_importacion(modulo, args.repeticiones)
+        except RuntimeError as e:
+            problemas.append(f"{modulo} no se puede importar: {e}")
+            print(f"{modulo:<30} error: {e}")
+            continue
+
+        pesadas = ", ".join(informe["pesadas"]) or "-"
+        print(f"{modulo:<30} {informe['total_ms']:8.1f} ms  librerías pesadas: {pesadas}")
+        lentos = sorted(informe["modulos"].items(), key=lambda item: item[1], reverse=True)
+        for nombre, ms in lentos[: args.top]:
+            print(f"    {nombre:<40} {ms:8.1f} ms")
+        problemas.extend(verificar(modulo, informe, args.presupuesto))
+
+    if problemas:
+        print()
+        for problema in problemas:
+            print(f"ERROR: {problema}")
+        sys.exit(1)
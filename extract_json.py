@@ -3,8 +3,171 @@ import os
 import pandas as pd
 import json
 import time
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from extraction_ledger import ExtractionLedger
+from storage.partitioned import content_hash
+
+
+# Campos numéricos (MW) de la predicción y límites para validar la extracción
+CAMPOS_NUMERICOS_PREDICCION = ("disponibilidad", "demanda_maxima", "afectacion", "deficit")
+MAXIMO_MW = 10000
+TOLERANCIA_DEFICIT_MW = 60
+
+# Instrucciones del prompt por sección del template. Se mantienen separadas para
+# poder construir prompts parciales cuando sólo cambian algunas secciones.
+INSTRUCCIONES_SECCIONES = {
+    "zonas_con_problemas": """En "zonas_con_problemas": Lista de zonas con problemas eléctricos (array de strings)""",
+    "fecha_reporte": """En "fecha_reporte": Fecha mencionada en el texto""",
+    "prediccion": """En "prediccion": 
+   - "disponibilidad": Disponibilidad estimada en MW
+   - "demanda_maxima": Demanda máxima estimada en MW
+   - "afectacion": Afectación pronosticada en MW
+   - "deficit": Déficit estimado en MW
+   - "respaldo": Información de respaldo si existe
+   - "horario_pico": Hora o periodo del pico de demanda mencionado""",
+    "info_matutina": """En "info_matutina":
+   - "hora": Hora de la información matutina (ej. "7:00 a.m.")
+   - "disponibilidad": Disponibilidad del SEN en MW
+   - "demanda": Demanda en ese momento en MW
+   - "deficit": Déficit en ese momento en MW
+   - "proyeccion_mediodia": Información sobre proyección al mediodía (afectación estimada y hora)""",
+    "plantas": """En "plantas":
+   - "averia": Array de objetos con datos de plantas en avería (planta, unidad/es, tipo)
+   - "mantenimiento": Array de objetos con datos de plantas en mantenimiento (planta, unidad/es, tipo)
+   - "limitacion_termica": Limitaciones térmicas en MW y tipo""",
+    "distribuida": """En "distribuida":
+   - "motores_con_problemas": Objeto con total de centrales/motores con problemas, impacto en MW y causa
+   - "problemas_lubricantes": Información sobre problemas de lubricantes (MW afectados, unidades)
+   - "patanas_con_problemas": Array de objetos con datos sobre patanas con problemas, incluyendo nombre, motores afectados, MW afectados y recuperación estimada""",
+    "paneles_solares": """En "paneles_solares":
+   - "cantidad_parques": Número de parques solares mencionados
+   - "produccion_mwh": Producción en MWh de los parques solares
+   - "nuevos_parques": Información sobre nuevos parques solares
+   - "capacidad_instalada": Capacidad instalada en MW
+   - "periodo_produccion": Período de tiempo al que se refiere la producción""",
+    "impacto": """En "impacto":
+   - "horas_totales": Horas totales de afectación
+   - "continuidad_afectacion": Si la afectación ha sido continua o intermitente
+   - "maximo": Objeto con datos de afectación máxima (MW, hora, fecha y nota adicional)
+   - "tendencia": Tendencia mencionada en la afectación""",
+}
+
+
+# Versión de la extracción; incrementarla al cambiar el prompt o el modelo para
+# que los registros re-extraídos reemplacen a los de versiones anteriores
+EXTRACTION_VERSION = 1
+
+
+@lru_cache(maxsize=8)
+def _read_template(path: str, mtime: float) -> Dict:
+    with open(path, "r", encoding="utf-8") as template_file:
+        return json.load(template_file)
+
+
+def load_template(path: str) -> Dict:
+    """
+    Carga el template JSON, reutilizando la versión ya parseada mientras el
+    archivo no se modifique.
+
+    Args:
+        path: Ruta al archivo de plantilla JSON
+
+    Returns:
+        Dict: Contenido del template (no debe modificarse)
+    """
+    return _read_template(os.path.abspath(path), os.path.getmtime(path))
+
+
+def _forma_compatible(template, valor) -> bool:
+    """
+    Compara la estructura de un valor extraído con la de su sección del template.
+    Se usa para registros antiguos que no tienen hashes de template guardados.
+
+    Args:
+        template: Sección del template
+        valor: Valor correspondiente del registro
+
+    Returns:
+        bool: True si el valor tiene las mismas claves que el template
+    """
+    if valor is None:
+        return True
+    if isinstance(template, dict):
+        if not isinstance(valor, dict) or set(template) != set(valor):
+            return False
+        return all(_forma_compatible(template[k], valor[k]) for k in template)
+    if isinstance(template, list):
+        if not isinstance(valor, list):
+            return False
+        if not template or not valor:
+            return True
+        return all(_forma_compatible(template[0], v) for v in valor)
+    return not isinstance(valor, (dict, list))
+
+
+class JsonStreamScanner:
+    """
+    Analizador incremental que detecta cuándo un objeto JSON recibido por
+    fragmentos está completo o claramente mal formado.
+    """
+
+    def __init__(self) -> None:
+        self.prefijo = ""
+        self.iniciado = False
+        self.completo = False
+        self.malformado = False
+        self._partes: List[str] = []
+        self._profundidad = 0
+        self._en_cadena = False
+        self._escape = False
+
+    @property
+    def texto(self) -> str:
+        """Texto del objeto JSON recibido hasta el momento."""
+        return "".join(self._partes)
+
+    def feed(self, fragmento: str) -> None:
+        """
+        Procesa un nuevo fragmento de la respuesta.
+
+        Args:
+            fragmento: Texto recibido del modelo
+        """
+        for i, ch in enumerate(fragmento):
+            if self.completo or self.malformado:
+                return
+
+            if not self.iniciado:
+                if ch == "{":
+                    self.iniciado = True
+                    self._profundidad = 1
+                    self._partes.append(ch)
+                    continue
+                self.prefijo += ch
+                # Sólo se admiten espacios y una cerca de código ```json antes del objeto
+                if not "```json".startswith(self.prefijo.strip()):
+                    self.malformado = True
+                continue
+
+            self._partes.append(ch)
+            if self._en_cadena:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._en_cadena = False
+            elif ch == '"':
+                self._en_cadena = True
+            elif ch == "{":
+                self._profundidad += 1
+            elif ch == "}":
+                self._profundidad -= 1
+                if self._profundidad == 0:
+                    self.completo = True
 
 
 class CreateJson:
@@ -15,25 +178,34 @@ class CreateJson:
 
     def __init__(
         self,
-        path_df: str,
-        path_template: str,
+        path_df: Union[str, Iterable[Dict]],
+        path_template: Union[str, Dict],
         url_llm: str,
         apikey: str,
         model: str,
         a: int,
         b: int,
+        stream: bool = False,
+        ledger_path: Optional[str] = None,
+        escalation_model: Optional[str] = None,
     ) -> None:
         """
         Inicializa el extractor de datos para informes de afectaciones eléctricas.
 
         Args:
-            path_df: Ruta al archivo CSV
-            path_template: Ruta al archivo de plantilla JSON
+            path_df: Ruta al archivo CSV o iterable (lista o generador) de artículos
+                con las claves "Contenido", "Enlace" y "Fecha"
+            path_template: Ruta al archivo de plantilla JSON o template ya cargado
             url_llm: URL del API LLM
             apikey: API key para autenticación
-            model: ID del modelo a utilizar
+            model: ID del modelo a utilizar. Con escalation_model es el modelo
+                pequeño que se prueba primero
             a: Año inicial para guardar la data organizada
             b: Año final para guardar la data organizada
+            stream: Si se deben pedir las respuestas al LLM en modo streaming
+            ledger_path: Ruta del ledger donde registrar cada llamada al LLM
+            escalation_model: ID del modelo grande al que se escala cuando la
+                respuesta de model no supera la validación
 
         Raises:
             ValueError: Si a es mayor que b
@@ -43,16 +215,22 @@ class CreateJson:
         if a > b:
             raise ValueError("a tiene que ser menor que b")
 
-        self.df = pd.read_csv(path_df)
+        if isinstance(path_df, str):
+            self.articulos = pd.read_csv(path_df).to_dict("records")
+        else:
+            self.articulos = path_df
 
         try:
-            with open(path_template, "r", encoding="utf-8") as template_file:
-                template_data = json.load(template_file)
-                self.json_template = json.dumps(
-                    template_data["2025"]["enero"][0]["datos"],
-                    ensure_ascii=False,
-                    indent=4,
-                )
+            if isinstance(path_template, dict):
+                template_data = path_template
+            else:
+                template_data = load_template(path_template)
+            self.template_datos = template_data["2025"]["enero"][0]["datos"]
+            self.json_template = json.dumps(
+                self.template_datos,
+                ensure_ascii=False,
+                indent=4,
+            )
         except FileNotFoundError as e:
             raise FileNotFoundError(e)
         except KeyError as e:
@@ -64,10 +242,24 @@ class CreateJson:
             "Content-Type": "application/json",
         }
         self.model = model
+        self.escalation_model = escalation_model
+        self.stream = stream
+        self.ledger = ExtractionLedger(ledger_path) if ledger_path else None
 
+        self.template_hashes = {
+            seccion: content_hash(valor)
+            for seccion, valor in self.template_datos.items()
+        }
         self.system_prompt = self._create_system_prompt()
 
         self.results = []
+        self.routing_stats = {
+            "articulos": 0,
+            "escalados": 0,
+            "invalidos": 0,
+            "latencia_total_s": 0.0,
+        }
+        self.validation_errors = []
 
         self.meses = {
             1: "enero",
@@ -90,125 +282,417 @@ class CreateJson:
             for año in range(a, b + 1)
         }
 
-    def _create_system_prompt(self) -> str:
+    def _create_system_prompt(self, secciones: Optional[List[str]] = None) -> str:
         """
         Crea el prompt del sistema con instrucciones detalladas.
 
+        Args:
+            secciones: Secciones del template a extraer. Si es None se usan todas
+
         Returns:
             str: Prompt del sistema configurado
         """
+        if secciones is None:
+            json_template = self.json_template
+            secciones = list(self.template_datos)
+        else:
+            json_template = json.dumps(
+                {s: self.template_datos[s] for s in secciones},
+                ensure_ascii=False,
+                indent=4,
+            )
+
+        instrucciones = "\n".join(
+            f"{i}. {INSTRUCCIONES_SECCIONES[seccion]}"
+            for i, seccion in enumerate(
+                (s for s in secciones if s in INSTRUCCIONES_SECCIONES), start=1
+            )
+        )
+
         return f"""Extrae información de afectaciones eléctricas y devuelve SÓLO UN OBJETO JSON con esta estructura:
-{self.json_template}
+{json_template}
 
 Instrucciones específicas:
-1. En "zonas_con_problemas": Lista de zonas con problemas eléctricos (array de strings)
-2. En "fecha_reporte": Fecha mencionada en el texto
-3. En "prediccion": 
-   - "disponibilidad": Disponibilidad estimada en MW
-   - "demanda_maxima": Demanda máxima estimada en MW
-   - "afectacion": Afectación pronosticada en MW
-   - "deficit": Déficit estimado en MW
-   - "respaldo": Información de respaldo si existe
-   - "horario_pico": Hora o periodo del pico de demanda mencionado
-4. En "info_matutina":
-   - "hora": Hora de la información matutina (ej. "7:00 a.m.")
-   - "disponibilidad": Disponibilidad del SEN en MW
-   - "demanda": Demanda en ese momento en MW
-   - "deficit": Déficit en ese momento en MW
-   - "proyeccion_mediodia": Información sobre proyección al mediodía (afectación estimada y hora)
-5. En "plantas":
-   - "averia": Array de objetos con datos de plantas en avería (planta, unidad/es, tipo)
-   - "mantenimiento": Array de objetos con datos de plantas en mantenimiento (planta, unidad/es, tipo)
-   - "limitacion_termica": Limitaciones térmicas en MW y tipo
-6. En "distribuida":
-   - "motores_con_problemas": Objeto con total de centrales/motores con problemas, impacto en MW y causa
-   - "problemas_lubricantes": Información sobre problemas de lubricantes (MW afectados, unidades)
-   - "patanas_con_problemas": Array de objetos con datos sobre patanas con problemas, incluyendo nombre, motores afectados, MW afectados y recuperación estimada
-7. En "paneles_solares":
-   - "cantidad_parques": Número de parques solares mencionados
-   - "produccion_mwh": Producción en MWh de los parques solares
-   - "nuevos_parques": Información sobre nuevos parques solares
-   - "capacidad_instalada": Capacidad instalada en MW
-   - "periodo_produccion": Período de tiempo al que se refiere la producción
-8. En "impacto":
-   - "horas_totales": Horas totales de afectación
-   - "continuidad_afectacion": Si la afectación ha sido continua o intermitente
-   - "maximo": Objeto con datos de afectación máxima (MW, hora, fecha y nota adicional)
-   - "tendencia": Tendencia mencionada en la afectación
+{instrucciones}
 
 Para campos desconocidos usa null, no inventes datos. No añadas campos adicionales al JSON."""
 
-    def extract_json_from_text(self, text: str) -> Optional[Dict]:
+    def _request_completion(self, payload: Dict) -> Tuple[Optional[str], Dict]:
         """
-        Extrae datos estructurados de un texto utilizando LLM.
+        Solicita la respuesta completa del LLM en una sola petición.
 
         Args:
-            text: Texto del informe de afectación eléctrica
+            payload: Cuerpo de la petición al API
 
         Returns:
-            Optional[Dict]: Datos estructurados en formato JSON o None si hay error
+            Tuple[Optional[str], Dict]: Contenido devuelto por el modelo (None si
+            hay error) y metadatos de la llamada ("uso" y "estado")
         """
-        try:
+        response = requests.post(self.url_llm, headers=self.headers, json=payload)
 
-            response = requests.post(
-                self.url_llm,
-                headers=self.headers,
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": self.system_prompt},
-                        {"role": "user", "content": text},
-                    ],
-                    "temperature": 0.1,
-                    "max_tokens": 2500,
-                    "response_format": {"type": "json_object"},
-                },
-            )
+        if response.status_code != 200:
+            print(f"Error en la API (código {response.status_code}): {response.text}")
+            return None, {"estado": "error_api"}
 
+        data = response.json()
+        meta = {"uso": data.get("usage") or {}}
+        if "choices" not in data or not data["choices"]:
+            print("La API no devolvió 'choices' válidas:", data)
+            return None, {**meta, "estado": "error_api"}
+
+        return data["choices"][0]["message"]["content"], meta
+
+    def _request_streaming(self, payload: Dict) -> Tuple[Optional[str], Dict]:
+        """
+        Solicita la respuesta del LLM en modo streaming (SSE) y analiza el JSON
+        de forma incremental. La conexión se cierra, abortando la generación,
+        en cuanto el objeto JSON está completo o se detecta que está mal formado.
+
+        Args:
+            payload: Cuerpo de la petición al API
+
+        Returns:
+            Tuple[Optional[str], Dict]: Texto del objeto JSON (None si hay error) y
+            metadatos de la llamada. El uso de tokens sólo está disponible si el
+            API lo envía antes de cerrar la conexión
+        """
+        scanner = JsonStreamScanner()
+        meta = {"uso": {}}
+
+        with requests.post(
+            self.url_llm,
+            headers=self.headers,
+            json={**payload, "stream": True},
+            stream=True,
+        ) as response:
             if response.status_code != 200:
                 print(
                     f"Error en la API (código {response.status_code}): {response.text}"
                 )
-                return None
+                return None, {"estado": "error_api"}
+
+            for linea in response.iter_lines(decode_unicode=True):
+                if not linea or not linea.startswith("data:"):
+                    continue
+                evento = linea[5:].strip()
+                if evento == "[DONE]":
+                    break
+
+                chunk = json.loads(evento)
+                if chunk.get("usage"):
+                    meta["uso"] = chunk["usage"]
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                scanner.feed(choices[0].get("delta", {}).get("content") or "")
+
+                if scanner.malformado:
+                    print(
+                        f"Respuesta mal formada, abortando generación: {scanner.prefijo[:100]!r}"
+                    )
+                    return None, {**meta, "estado": "abortado"}
+                if scanner.completo:
+                    break
+
+        if not scanner.iniciado:
+            return None, {**meta, "estado": "sin_json"}
+        return scanner.texto, meta
+
+    def _parse_json(self, json_str: str) -> Tuple[Optional[Dict], str]:
+        """
+        Decodifica el JSON devuelto por el modelo, intentando arreglar comillas simples.
+
+        Args:
+            json_str: Texto devuelto por el modelo
 
-            data = response.json()
-            if "choices" not in data or not data["choices"]:
-                print("La API no devolvió 'choices' válidas:", data)
-                return None
+        Returns:
+            Tuple[Optional[Dict], str]: Datos decodificados (None si no se pudo
+            decodificar) y resultado de la validación ("ok", "reparado" o
+            "json_invalido")
+        """
+        json_str = json_str.strip()
 
-            json_str = data["choices"][0]["message"]["content"]
-            json_str = json_str.strip()
+        if json_str.startswith("```json"):
+            json_str = json_str[7:]
+        if json_str.endswith("```"):
+            json_str = json_str[:-3]
+        json_str = json_str.strip()
 
-            if json_str.startswith("```json"):
-                json_str = json_str[7:]
-            if json_str.endswith("```"):
-                json_str = json_str[:-3]
-            json_str = json_str.strip()
+        try:
+            json_data = json.loads(json_str)
+            return json_data, "ok"
+        except json.JSONDecodeError as e:
+            print(f"Error decodificando JSON: {e}")
+            print(f"Texto JSON problemático: {json_str[:100]}...")
 
             try:
-                json_data = json.loads(json_str)
-                return json_data
-            except json.JSONDecodeError as e:
-                print(f"Error decodificando JSON: {e}")
-                print(f"Texto JSON problemático: {json_str[:100]}...")
-
-                try:
-                    fixed_str = json_str.replace("'", '"')
-                    json_data = json.loads(fixed_str)
-                    print("JSON arreglado exitosamente")
-                    return json_data
-                except:
-                    print("No se pudo arreglar el JSON")
-                    return None
+                fixed_str = json_str.replace("'", '"')
+                json_data = json.loads(fixed_str)
+                print("JSON arreglado exitosamente")
+                return json_data, "reparado"
+            except:
+                print("No se pudo arreglar el JSON")
+                return None, "json_invalido"
+
+    def validate_extraction(
+        self, json_data: Optional[Dict], secciones: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Valida una extracción contra el template y comprueba la consistencia
+        entre campos de la predicción.
+
+        Args:
+            json_data: Datos devueltos por el modelo
+            secciones: Secciones solicitadas. Si es None se esperan todas
+
+        Returns:
+            List[str]: Errores encontrados (vacía si la extracción es válida)
+        """
+        if not isinstance(json_data, dict):
+            return ["la respuesta no es un objeto JSON"]
+
+        esperadas = list(self.template_datos) if secciones is None else secciones
+        errores = [f"falta la sección {s}" for s in esperadas if s not in json_data]
+        errores += [f"sección no esperada {s}" for s in json_data if s not in esperadas]
+        errores += [
+            f"estructura distinta al template en {s}"
+            for s in esperadas
+            if s in json_data
+            and not _forma_compatible(self.template_datos[s], json_data[s])
+        ]
+
+        pred = json_data.get("prediccion")
+        if isinstance(pred, dict):
+            for campo in CAMPOS_NUMERICOS_PREDICCION:
+                valor = pred.get(campo)
+                if valor is None:
+                    continue
+                if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                    errores.append(f"prediccion.{campo} no es numérico: {valor!r}")
+                elif not 0 <= valor <= MAXIMO_MW:
+                    errores.append(f"prediccion.{campo} fuera de rango: {valor}")
+
+            disponibilidad = pred.get("disponibilidad")
+            demanda = pred.get("demanda_maxima")
+            deficit = pred.get("deficit")
+            if all(
+                isinstance(v, (int, float)) and not isinstance(v, bool)
+                for v in (disponibilidad, demanda, deficit)
+            ):
+                if abs(deficit - (demanda - disponibilidad)) > TOLERANCIA_DEFICIT_MW:
+                    errores.append(
+                        f"déficit {deficit} inconsistente con demanda {demanda} "
+                        f"y disponibilidad {disponibilidad}"
+                    )
+
+        return errores
+
+    def extract_json_from_text(
+        self,
+        text: str,
+        secciones: Optional[List[str]] = None,
+        enlace: str = "",
+    ) -> Optional[Dict]:
+        """
+        Extrae datos estructurados de un texto utilizando LLM.
+
+        Si hay un modelo de escalado configurado, primero se usa el modelo
+        principal (más pequeño y rápido) y sólo se recurre al modelo de escalado
+        cuando la respuesta no supera la validación contra el template. Si
+        ninguna respuesta la supera se devuelve la que tiene menos errores (la
+        del primer modelo en caso de empate), y los errores quedan en
+        self.validation_errors para marcar el registro.
+
+        Args:
+            text: Texto del informe de afectación eléctrica
+            secciones: Secciones del template a extraer. Si es None se extraen todas
+            enlace: Enlace del artículo, usado en el ledger
+
+        Returns:
+            Optional[Dict]: Datos estructurados en formato JSON o None si hay error
+        """
+        modelos = [self.model]
+        if self.escalation_model and self.escalation_model != self.model:
+            modelos.append(self.escalation_model)
+
+        inicio = time.perf_counter()
+        mejor, mejores_errores = None, []
+        for intento, modelo in enumerate(modelos):
+            json_data, errores = self._extract_with_model(
+                text, secciones, enlace, modelo, intento
+            )
+            if json_data is not None and (
+                mejor is None or len(errores) < len(mejores_errores)
+            ):
+                mejor, mejores_errores = json_data, errores
+            if not errores:
+                break
+            print(f"Validación fallida con {modelo}: {'; '.join(errores)}")
+
+        self.validation_errors = mejores_errores
+        self.routing_stats["articulos"] += 1
+        self.routing_stats["escalados"] += int(intento > 0)
+        self.routing_stats["invalidos"] += int(mejor is not None and bool(mejores_errores))
+        self.routing_stats["latencia_total_s"] += time.perf_counter() - inicio
+
+        return mejor
+
+    def _extract_with_model(
+        self,
+        text: str,
+        secciones: Optional[List[str]],
+        enlace: str,
+        modelo: str,
+        reintentos: int,
+    ) -> Tuple[Optional[Dict], List[str]]:
+        """
+        Realiza una llamada al LLM con un modelo concreto y valida la respuesta.
+
+        Args:
+            text: Texto del informe de afectación eléctrica
+            secciones: Secciones del template a extraer. Si es None se extraen todas
+            enlace: Enlace del artículo, usado en el ledger
+            modelo: ID del modelo a utilizar
+            reintentos: Número de intentos previos para este artículo
+
+        Returns:
+            Tuple[Optional[Dict], List[str]]: Datos extraídos (None si hay error) y
+            errores de validación
+        """
+        system_prompt = (
+            self.system_prompt
+            if secciones is None
+            else self._create_system_prompt(secciones)
+        )
+        payload = {
+            "model": modelo,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": text},
+            ],
+            "temperature": 0.1,
+            "max_tokens": 2500,
+            "response_format": {"type": "json_object"},
+        }
+
+        inicio = time.perf_counter()
+        meta = {}
+        json_data = None
+        validacion = "excepcion"
+        try:
+            if self.stream:
+                json_str, meta = self._request_streaming(payload)
+            else:
+                json_str, meta = self._request_completion(payload)
+
+            if json_str is None:
+                validacion = meta.get("estado", "error_api")
+            else:
+                json_data, validacion = self._parse_json(json_str)
         except Exception as e:
             print(f"Error procesando texto: {e}")
-            return None
+
+        errores = self.validate_extraction(json_data, secciones)
+        if json_data is not None and errores:
+            validacion = "plantilla_invalida"
+
+        if self.ledger is not None:
+            self._record_call(
+                enlace=enlace,
+                modelo=modelo,
+                secciones=secciones,
+                latencia_s=time.perf_counter() - inicio,
+                uso=meta.get("uso") or {},
+                reintentos=reintentos,
+                validacion=validacion,
+            )
+
+        return json_data, errores
+
+    def _record_call(
+        self,
+        enlace: str,
+        modelo: str,
+        secciones: Optional[List[str]],
+        latencia_s: float,
+        uso: Dict,
+        reintentos: int,
+        validacion: str,
+    ) -> None:
+        """
+        Registra una llamada al LLM en el ledger.
+
+        Args:
+            enlace: Enlace del artículo procesado
+            modelo: ID del modelo utilizado
+            secciones: Secciones solicitadas (None si se pidió el template completo)
+            latencia_s: Duración de la llamada en segundos
+            uso: Bloque "usage" devuelto por el API
+            reintentos: Número de intentos previos para este artículo
+            validacion: Resultado de la validación de la respuesta
+        """
+        detalles = uso.get("prompt_tokens_details") or {}
+        try:
+            self.ledger.record(
+                enlace=enlace,
+                modelo=modelo,
+                secciones=secciones,
+                stream=self.stream,
+                latencia_s=round(latencia_s, 3),
+                tokens_entrada=uso.get("prompt_tokens"),
+                tokens_salida=uso.get("completion_tokens"),
+                reintentos=reintentos,
+                validacion=validacion,
+                cache_hit=bool(detalles.get("cached_tokens")),
+            )
+        except OSError as e:
+            print(f"No se pudo escribir en el ledger: {e}")
+
+    def iter_reports(self, delay: int = 2) -> Iterator[Dict]:
+        """
+        Procesa los artículos uno a uno y devuelve cada resultado en cuanto
+        está disponible.
+
+        Args:
+            delay: Tiempo de espera entre llamadas a la API (segundos)
+
+        Yields:
+            Dict: Resultado con las claves "enlace", "fecha", "datos",
+            "template_hashes" y "extraction_version", y "validation_errors"
+            si la extracción no superó la validación
+        """
+        total_informes = (
+            len(self.articulos) if hasattr(self.articulos, "__len__") else "?"
+        )
+
+        for i, row in enumerate(self.articulos):
+            print(f"Procesando informe {i+1}/{total_informes}...")
+
+            json_data = self.extract_json_from_text(
+                row["Contenido"], enlace=row["Enlace"]
+            )
+
+            if json_data is not None:
+                resultado = {
+                    "enlace": row["Enlace"],
+                    "fecha": row.get("Fecha", ""),
+                    "datos": json_data,
+                    "template_hashes": dict(self.template_hashes),
+                    "extraction_version": EXTRACTION_VERSION,
+                }
+                if self.validation_errors:
+                    resultado["validation_errors"] = list(self.validation_errors)
+                yield resultado
+
+            time.sleep(delay)
+
+        self.print_routing_summary()
 
     def process_all_reports(
         self, delay: int = 2, output_dir: str = "data", save_individual: bool = False
     ) -> None:
         """
-        Procesa todos los informes en el DataFrame.
+        Procesa todos los informes.
 
         Args:
             delay: Tiempo de espera entre llamadas a la API (segundos)
@@ -218,28 +702,122 @@ Para campos desconocidos usa null, no inventes datos. No añadas campos adiciona
         Path(output_dir).mkdir(parents=True, exist_ok=True)
 
         self.results = []
-        total_informes = len(self.df)
 
-        for i, row in self.df.iterrows():
-            print(f"Procesando informe {i+1}/{total_informes}...")
+        for result in self.iter_reports(delay):
+            self.results.append(result)
 
-            json_data = self.extract_json_from_text(row["Contenido"])
+            if save_individual:
+                individual_file = f'{output_dir}/extracted_row_{result["fecha"]}.json'
+                with open(individual_file, "w", encoding="utf-8") as f:
+                    json.dump(result, f, ensure_ascii=False, indent=2)
 
-            if json_data is not None:
+    def print_routing_summary(self) -> None:
+        """
+        Muestra la tasa de escalado al modelo grande y la latencia de extremo a
+        extremo por artículo.
+        """
+        articulos = self.routing_stats["articulos"]
+        if not articulos:
+            return
+
+        latencia_media = self.routing_stats["latencia_total_s"] / articulos
+        resumen = f"Artículos procesados: {articulos}. "
+        if self.escalation_model:
+            escalados = self.routing_stats["escalados"]
+            resumen += (
+                f"Escalados a {self.escalation_model}: "
+                f"{escalados} ({escalados / articulos:.1%}). "
+            )
+        invalidos = self.routing_stats["invalidos"]
+        if invalidos:
+            resumen += f"Sin superar la validación: {invalidos}. "
+        print(resumen + f"Latencia media por artículo: {latencia_media:.2f}s")
 
-                result = {
-                    "enlace": row["Enlace"],
-                    "fecha": row.get("Fecha", ""),
-                    "datos": json_data,
-                }
-                self.results.append(result)
+    def outdated_sections(self, record: Dict) -> List[str]:
+        """
+        Determina qué secciones del template cambiaron desde que se extrajo un registro.
 
-                if save_individual:
-                    individual_file = f'{output_dir}/extracted_row_{row["Fecha"]}.json'
-                    with open(individual_file, "w", encoding="utf-8") as f:
-                        json.dump(result, f, ensure_ascii=False, indent=2)
+        Los registros con hashes guardados se comparan por hash. Los registros
+        antiguos sin hashes se comparan por la estructura de cada sección.
 
-            time.sleep(delay)
+        Args:
+            record: Registro con las claves "datos" y opcionalmente "template_hashes"
+
+        Returns:
+            List[str]: Secciones que deben volver a extraerse
+        """
+        datos = record.get("datos") or {}
+        hashes = record.get("template_hashes")
+
+        if hashes:
+            return [
+                seccion
+                for seccion, hash_actual in self.template_hashes.items()
+                if hashes.get(seccion) != hash_actual
+            ]
+
+        return [
+            seccion
+            for seccion, valor in self.template_datos.items()
+            if seccion not in datos or not _forma_compatible(valor, datos[seccion])
+        ]
+
+    def reextract_changed_sections(
+        self, organized_data: Dict, delay: int = 2
+    ) -> int:
+        """
+        Re-extrae sólo las secciones del template que cambiaron en cada registro
+        y las combina con los datos existentes. Modifica organized_data in situ.
+
+        Args:
+            organized_data: Datos organizados por año y mes
+            delay: Tiempo de espera entre llamadas a la API (segundos)
+
+        Returns:
+            int: Número de registros actualizados
+        """
+        contenidos = {a["Enlace"]: a["Contenido"] for a in self.articulos}
+        actualizados = 0
+
+        for año, meses in organized_data.items():
+            for mes, registros in meses.items():
+                for record in registros:
+                    secciones = self.outdated_sections(record)
+                    if not secciones:
+                        continue
+
+                    enlace = record.get("enlace", "")
+                    contenido = contenidos.get(enlace)
+                    if not isinstance(contenido, str):
+                        print(f"No se encontró el contenido del artículo {enlace}")
+                        continue
+
+                    print(
+                        f"Re-extrayendo {', '.join(secciones)} para {enlace} ({mes} {año})"
+                    )
+                    json_data = self.extract_json_from_text(
+                        contenido, secciones, enlace=enlace
+                    )
+
+                    if json_data is not None:
+                        datos = record.setdefault("datos", {})
+                        for seccion in secciones:
+                            datos[seccion] = json_data.get(seccion)
+                        for seccion in list(datos):
+                            if seccion not in self.template_datos:
+                                del datos[seccion]
+                        record["template_hashes"] = dict(self.template_hashes)
+                        record["extraction_version"] = EXTRACTION_VERSION
+                        if self.validation_errors:
+                            record["validation_errors"] = list(self.validation_errors)
+                        else:
+                            record.pop("validation_errors", None)
+                        actualizados += 1
+
+                    time.sleep(delay)
+
+        self.print_routing_summary()
+        return actualizados
 
     def organize_by_date(self) -> None:
         """
@@ -0,0 +1,149 @@
+"""
+Registro (ledger) de llamadas al LLM durante la extracción de artículos.
+
+Cada llamada de CreateJson añade una fila en formato JSON Lines con el enlace
+del artículo, el modelo, la latencia, los tokens consumidos, los reintentos,
+el resultado de la validación y si hubo acierto en la caché de prompts.
+"""
+import os
+import json
+import argparse
+from datetime import datetime
+from typing import Dict, Optional
+
+import pandas as pd
+
+
+# Precio en USD por millón de tokens (entrada, salida) de cada modelo
+PRECIOS_POR_MILLON = {
+    "accounts/fireworks/models/llama-v3p3-70b-instruct": (0.90, 0.90),
+    "accounts/fireworks/models/llama-v3p1-8b-instruct": (0.20, 0.20),
+}
+PRECIO_POR_DEFECTO = (0.90, 0.90)
+
+# Resultados de validación que se consideran extracciones exitosas
+VALIDACIONES_EXITOSAS = ("ok", "reparado")
+
+
+class ExtractionLedger:
+    """
+    Ledger append-only de las llamadas al LLM.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path: Ruta al archivo JSON Lines del ledger
+        """
+        self.path = path
+
+    def record(self, **fila) -> None:
+        """
+        Añade una fila al ledger.
+
+        Args:
+            **fila: Campos de la llamada (enlace, modelo, latencia_s, ...)
+        """
+        directorio = os.path.dirname(self.path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        fila = {"timestamp": datetime.now().isoformat(timespec="seconds"), **fila}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(fila, ensure_ascii=False) + "\n")
+
+    def load(self) -> pd.DataFrame:
+        """
+        Carga el ledger completo.
+
+        Returns:
+            pd.DataFrame: Una fila por llamada al LLM
+        """
+        if not os.path.exists(self.path):
+            return pd.DataFrame()
+
+        df = pd.read_json(self.path, lines=True, convert_dates=False)
+        if not df.empty:
+            df["timestamp"] = pd.to_datetime(df["timestamp"])
+        return df
+
+    def summary(self, desde: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Resume latencias, costes y tasas de fallo del ledger.
+
+        Args:
+            desde: Fecha mínima (YYYY-MM-DD) de las llamadas a considerar
+
+        Returns:
+            Dict[str, pd.DataFrame]: Resumen global ("total") y por día ("por_dia")
+        """
+        df = self.load()
+        if df.empty:
+            return {"total": pd.DataFrame(), "por_dia": pd.DataFrame()}
+
+        if desde:
+            df = df[df["timestamp"] >= pd.Timestamp(desde)]
+
+        precios = df["modelo"].map(lambda m: PRECIOS_POR_MILLON.get(m, PRECIO_POR_DEFECTO))
+        df = df.assign(
+            dia=df["timestamp"].dt.date,
+            fallo=~df["validacion"].isin(VALIDACIONES_EXITOSAS),
+            coste_usd=(
+                df["tokens_entrada"].fillna(0) * precios.str[0]
+                + df["tokens_salida"].fillna(0) * precios.str[1]
+            )
+            / 1_000_000,
+        )
+
+        def _resumir(grupo: pd.DataFrame) -> pd.Series:
+            # Un artículo puede requerir varias llamadas si se escala de modelo
+            articulos = grupo.groupby("enlace").agg(
+                latencia_s=("latencia_s", "sum"), reintentos=("reintentos", "max")
+            )
+            return pd.Series(
+                {
+                    "llamadas": len(grupo),
+                    "articulos": len(articulos),
+                    "tasa_escalado": (articulos["reintentos"] > 0).mean(),
+                    "latencia_articulo_p50_s": articulos["latencia_s"].quantile(0.5),
+                    "latencia_articulo_p95_s": articulos["latencia_s"].quantile(0.95),
+                    "latencia_p50_s": grupo["latencia_s"].quantile(0.5),
+                    "latencia_p95_s": grupo["latencia_s"].quantile(0.95),
+                    "tokens_entrada": grupo["tokens_entrada"].sum(),
+                    "tokens_salida": grupo["tokens_salida"].sum(),
+                    "coste_usd": grupo["coste_usd"].sum(),
+                    "tasa_fallos": grupo["fallo"].mean(),
+                    "tasa_reparados": (grupo["validacion"] == "reparado").mean(),
+                    "tasa_cache": grupo["cache_hit"].fillna(False).astype(bool).mean(),
+                }
+            )
+
+        total = _resumir(df).to_frame("total").T
+        por_dia = pd.DataFrame(
+            {dia: _resumir(grupo) for dia, grupo in df.groupby("dia")}
+        ).T
+        por_dia.index.name = "dia"
+
+        return {"total": total, "por_dia": por_dia}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the LLM extraction ledger.")
+    parser.add_argument(
+        "--ledger",
+        default=os.path.join("data", "ledger", "llm_calls.jsonl"),
+        help="Path to the ledger file",
+    )
+    parser.add_argument("--desde", default=None, help="Only calls since YYYY-MM-DD")
+    args = parser.parse_args()
+
+    resumen = ExtractionLedger(args.ledger).summary(desde=args.desde)
+    if resumen["total"].empty:
+        print(f"No hay llamadas registradas en {args.ledger}")
+    else:
+        with pd.option_context("display.width", 200, "display.max_columns", None):
+            print("=== Resumen global ===")
+            print(resumen["total"].to_string(float_format="{:.3f}".format))
+            print()
+            print("=== Resumen por día ===")
+            print(resumen["por_dia"].to_string(float_format="{:.3f}".format))
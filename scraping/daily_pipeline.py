@@ -11,6 +11,9 @@ import logging
 from datetime import datetime
 from bs4 import BeautifulSoup
 import argparse
+import shutil
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -19,6 +22,18 @@ sys.path.append(project_dir)
 
 from scraping import scrape_article_content
 from extract_json import CreateJson
+from storage import (
+    ArticleArchive,
+    DailyMetricsFile,
+    MetricsTable,
+    OutageIndex,
+    PartitionedStore,
+    RollupTables,
+    SnapshotStore,
+    SQLiteStore,
+    atomic_write,
+)
+from storage.partitioned import DELTAS_ANTES_DE_COMPACTAR, partition_of
 
 log_dir = os.path.join(project_dir, "logs")
 os.makedirs(log_dir, exist_ok=True)
@@ -33,6 +48,54 @@ logging.basicConfig(
 )
 logger = logging.getLogger("daily_pipeline")
 
+# Modelos de extracción: el pequeño se prueba primero y se escala al grande
+# cuando su respuesta no supera la validación; sin escalado se usa el grande
+MODELO_PEQUEÑO = "accounts/fireworks/models/llama-v3p1-8b-instruct"
+MODELO_GRANDE = "accounts/fireworks/models/llama-v3p3-70b-instruct"
+
+
+def read_daily_output(path):
+    """
+    Lee la salida de un día (data/daily/<fecha>/*.json y data/daily/articulos_<fecha>.csv)
+
+    Args:
+        path (str): Directorio del día
+
+    Returns:
+        dict: Fecha, registros válidos, artículos y errores encontrados
+    """
+    fecha = os.path.basename(path)
+    salida = {"fecha": fecha, "records": [], "articles": [], "errors": []}
+    for nombre in sorted(os.listdir(path)) if os.path.isdir(path) else []:
+        if not nombre.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(path, nombre), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            salida["errors"].append(f"{nombre}: {e}")
+            continue
+        for months in data.values() if isinstance(data, dict) else []:
+            for month_items in months.values():
+                for item in month_items:
+                    if (
+                        isinstance(item, dict)
+                        and item.get("enlace")
+                        and isinstance(item.get("datos"), dict)
+                        and partition_of(item) is not None
+                    ):
+                        salida["records"].append(item)
+                    else:
+                        salida["errors"].append(f"{nombre}: registro sin enlace, fecha o datos válidos")
+
+    csv_path = os.path.join(os.path.dirname(path), f"articulos_{fecha}.csv")
+    if os.path.exists(csv_path):
+        try:
+            salida["articles"] = pd.read_csv(csv_path, encoding="utf-8-sig").to_dict("records")
+        except (OSError, ValueError) as e:
+            salida["errors"].append(f"{os.path.basename(csv_path)}: {e}")
+    return salida
+
 
 class DailyPipeline:
 
@@ -45,6 +108,8 @@ class DailyPipeline:
         template_path=None,
         data_dir="data",
         days_lookback=1,
+        stream=False,
+        escalation_model=None,
     ):
         """
         Inicialización del pipeline
@@ -55,16 +120,23 @@ class DailyPipeline:
             template_path (str): Ruta al archivo de plantilla para la extracción
             data_dir (str): Directorio para guardar los datos
             days_lookback (int): Número de días hacia atrás para buscar artículos
+            stream (bool): Si se deben pedir las respuestas al LLM en modo streaming
+            escalation_model (str): Modelo grande al que se escala cuando la
+                extracción del modelo principal no supera la validación
         """
         if a > b:
             raise ValueError("a tiene que ser menor que b")
         self.api_key = api_key
         self.model = model
+        self.escalation_model = escalation_model
         self.template_path = template_path or os.path.join(
             os.path.dirname(__file__), "template.txt"
         )
         self.data_dir = data_dir
         self.days_lookback = days_lookback
+        self.stream = stream
+        self.ledger_path = os.path.join(data_dir, "ledger", "llm_calls.jsonl")
+        self.articles = ArticleArchive(os.path.join(data_dir, "raw", "articulos.jsonl.zst"))
         self.today = datetime.now()
         self.date_str = self.today.strftime("%Y-%m-%d")
         os.makedirs(os.path.join(data_dir, "daily", self.date_str), exist_ok=True)
@@ -80,21 +152,25 @@ class DailyPipeline:
 
     def load_existing_data(self):
         """
-        Carga los datos de afectaciones ya procesados
+        Carga los enlaces de los artículos ya descargados. La primera vez crea
+        el archivo comprimido de artículos a partir del CSV original
 
         Returns:
-            DataFrame con los datos existentes
+            DataFrame con la columna Enlace de los artículos existentes
         """
         logger.info("Cargando datos existentes...")
         try:
-            df = pd.read_csv(
-                os.path.join(
-                    self.data_dir,
-                    "raw",
-                    "afectaciones_electricas_cubadebate_filter_2025.csv",
-                ),
-                encoding="utf-8-sig",
+            csv_path = os.path.join(
+                self.data_dir,
+                "raw",
+                "afectaciones_electricas_cubadebate_filter_2025.csv",
             )
+            if not self.articles.exists() and os.path.exists(csv_path):
+                total = self.articles.train_dictionary(
+                    pd.read_csv(csv_path, encoding="utf-8-sig").to_dict("records")
+                )
+                logger.info(f"Importados {total} artículos de {csv_path} a {self.articles.path}")
+            df = pd.DataFrame(self.articles.iter_rows(["Enlace"]), columns=["Enlace"])
             logger.info(f"Datos existentes cargados: {len(df)} registros")
             return df
         except Exception as e:
@@ -475,19 +551,8 @@ class DailyPipeline:
                 f"Se encontraron {len(new_articles_df)} artículos nuevos. Guardados en {daily_file}"
             )
 
-            updated_df = pd.concat([new_articles_df, existing_df], ignore_index=True)
-            updated_df.to_csv(
-                os.path.join(
-                    self.data_dir,
-                    "raw",
-                    "afectaciones_electricas_cubadebate_filter_2025.csv",
-                ),
-                index=False,
-                encoding="utf-8-sig",
-            )
-            logger.info(
-                f"raw/afectaciones_electricas_cubadebate_filter_2025.csv actualizado"
-            )
+            added = self.articles.append(new_articles_df.to_dict("records"))
+            logger.info(f"Se agregaron {added} artículos a {self.articles.path}")
         else:
             logger.info("No se encontraron artículos nuevos hoy.")
 
@@ -501,7 +566,8 @@ class DailyPipeline:
             articles_df (pandas.DataFrame): DataFrame con los artículos a procesar
 
         Returns:
-            bool: True si se procesaron artículos, False si no
+            bool: True si se procesaron y guardaron los artículos, False si
+            falló la actualización de los datos procesados (2 si no hay artículos)
         """
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
@@ -512,24 +578,222 @@ class DailyPipeline:
 
         self._process_and_save_day(articles_df)
 
-        self.update_main_json()
-        return True
+        return self.update_main_json()
 
-    def update_main_json(self):
+    def load_store(self):
+        """
+        Devuelve el almacén particionado de datos procesados. La primera vez
+        importa el JSON monolítico existente
+
+        Returns:
+            PartitionedStore: Almacén con una partición por mes
+        """
+        store = PartitionedStore(os.path.join(self.data_dir, "processed", "store"))
+        if not store.exists():
+            legacy_path = os.path.join(
+                self.data_dir, "processed", "datos_electricos_organizados.json"
+            )
+            if os.path.exists(legacy_path):
+                with open(legacy_path, "r", encoding="utf-8") as f:
+                    total = store.import_nested(json.load(f))
+                logger.info(
+                    f"Importados {total} registros de {legacy_path} al almacén particionado"
+                )
+        # Los lectores migran sólo en memoria; el pipeline guarda la migración
+        migrated = store.migrate()
+        if migrated:
+            logger.info(f"Migrados {len(migrated)} registros a la versión actual del esquema")
+        return store
+
+    def load_database(self, store):
+        """
+        Devuelve la base de datos SQLite normalizada. La primera vez la
+        construye a partir del almacén particionado
+
+        Args:
+            store (PartitionedStore): Almacén con los registros procesados
+
+        Returns:
+            SQLiteStore: Base de datos con consultas indexadas por fecha
+        """
+        db = SQLiteStore(
+            os.path.join(self.data_dir, "processed", "datos_electricos.db")
+        )
+        if not db.exists() and store.exists():
+            total = db.append(store.iter_records())
+            logger.info(f"Importados {total} registros a la base de datos {db.path}")
+        elif db.exists():
+            # Crea las tablas nuevas y migra los reportes de versiones anteriores
+            db.initialize()
+        return db
+
+    def load_metrics_table(self, store):
+        """
+        Devuelve la tabla Parquet de métricas aplanadas. La primera vez la
+        construye a partir del almacén particionado
+
+        Args:
+            store (PartitionedStore): Almacén con los registros procesados
+
+        Returns:
+            MetricsTable: Tabla columnar con las métricas de cada reporte
         """
-        Actualiza el archivo JSON principal con los nuevos datos extraídos
-        de todos los días dentro del rango de days_lookback
+        table = MetricsTable(os.path.join(self.data_dir, "processed", "metricas.parquet"))
+        if not table.exists() and store.exists():
+            total = table.rebuild(store.iter_records())
+            logger.info(f"Escritas {total} filas en la tabla de métricas {table.path}")
+        return table
+
+    def update_derived_stores(self, table, rebuild=False):
         """
-        main_json_path = os.path.join(
-            self.data_dir, "processed", "datos_electricos_organizados.json"
+        Regenera el archivo binario de métricas diarias, actualiza los
+        agregados por periodo con los días que cambiaron y regenera el índice
+        de periodos de avería y mantenimiento de las plantas
+
+        Args:
+            table (MetricsTable): Tabla de métricas actualizada
+            rebuild (bool): Recalcular los agregados sin partir de la serie
+                diaria anterior
+        """
+        daily = DailyMetricsFile(
+            os.path.join(self.data_dir, "processed", "metricas_diarias.npy")
         )
+        previous = daily.read() if daily.exists() and not rebuild else None
+        metrics = table.read()
+        self.write_daily_metrics(daily, metrics)
+        self.update_rollups(previous, daily.read())
+        self.write_outage_index(metrics.index)
+
+    def write_daily_metrics(self, daily, metrics):
+        """
+        Regenera el archivo binario de métricas diarias que la visualización
+        abre con np.memmap
+
+        Args:
+            daily (DailyMetricsFile): Archivo de métricas diarias
+            metrics (pd.DataFrame): Métricas por reporte (MetricsTable.read)
+        """
+        total = daily.write(metrics)
+        logger.info(f"Escritas {total} filas en {daily.path}")
+
+    def update_rollups(self, previous, current):
+        """
+        Actualiza los agregados por semana, mes, día de la semana y mes del año
+        con los días que cambiaron respecto de la serie diaria anterior
+
+        Args:
+            previous (pd.DataFrame): Serie diaria anterior (None para recalcularlos)
+            current (pd.DataFrame): Serie diaria actual
+        """
+        rollups = RollupTables(os.path.join(self.data_dir, "processed", "rollups.parquet"))
+        total = rollups.update(previous, current)
+        logger.info(f"Actualizados {total} grupos de agregados en {rollups.path}")
+
+    def write_outage_index(self, report_dates):
+        """
+        Regenera el índice de periodos de avería y mantenimiento de las plantas
+
+        Args:
+            report_dates (pd.Index): Fechas de los reportes
+        """
+        db = SQLiteStore(os.path.join(self.data_dir, "processed", "datos_electricos.db"))
+        if db.exists():
+            index_path = os.path.join(self.data_dir, "processed", "intervalos_plantas.npz")
+            total = OutageIndex.from_states(db.estado_plantas(), fechas=report_dates).write(index_path)
+            logger.info(f"Escritos {total} periodos de plantas en {index_path}")
+
+    def create_snapshot(self, store):
+        """
+        Guarda una versión del almacén que sólo ocupa lo que cambió desde la anterior
+        """
+        snapshot = SnapshotStore(store).create(etiqueta=self.date_str)
+        logger.info(
+            f"Creado el snapshot {snapshot['id']} ({snapshot['bytes_nuevos']} bytes nuevos)"
+        )
+
+    def sync_derived_stores(self, store, changed=()):
+        """
+        Lleva la base de datos, la tabla de métricas, los almacenes derivados
+        y los snapshots al contenido del almacén. Los registros pendientes son
+        los que tienen en el índice del almacén un hash distinto del guardado
+        en data/processed/sincronizado.json tras la última sincronización, así
+        que una ejecución que falló después de guardar en el almacén se
+        completa en la siguiente
+
+        Args:
+            store (PartitionedStore): Almacén con los registros procesados
+            changed (list): Registros que esta ejecución guardó en el almacén;
+                si hay otros pendientes, los agregados se recalculan completos
+
+        Returns:
+            int: Número de registros sincronizados
+        """
+        if not store.exists():
+            return 0
+        state_path = os.path.join(self.data_dir, "processed", "sincronizado.json")
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                synced = json.load(f)
+        except (OSError, ValueError):
+            synced = {}
+
+        index = store.load_index()
+        pending = {enlace for enlace, entry in index.items() if synced.get(enlace) != entry[1]}
+        outputs = [
+            os.path.join(self.data_dir, "processed", nombre)
+            for nombre in (
+                "datos_electricos.db",
+                "metricas.parquet",
+                "metricas_diarias.npy",
+                "rollups.parquet",
+                "intervalos_plantas.npz",
+            )
+        ]
+        if not pending and all(os.path.exists(path) for path in outputs):
+            return 0
+
+        leftover = pending - {record.get("enlace") for record in changed}
+        if leftover:
+            logger.warning(
+                f"{len(leftover)} registros del almacén no constan en los almacenes "
+                "derivados (primera sincronización o ejecución anterior fallida); "
+                "se recalculan los agregados"
+            )
+        partitions = sorted(index[enlace][0] for enlace in pending)
+        records = [
+            record
+            for record in (
+                store.iter_records(partitions[0], partitions[-1]) if partitions else []
+            )
+            if record.get("enlace") in pending
+        ]
+
+        db = self.load_database(store)
+        db_saved = db.upsert(records)
+        logger.info(f"Se guardaron {db_saved} reportes en la base de datos")
+        metrics_table = self.load_metrics_table(store)
+        metrics_saved = metrics_table.upsert(records)
+        logger.info(f"Se guardaron {metrics_saved} filas en la tabla de métricas")
+        self.update_derived_stores(metrics_table, rebuild=bool(leftover))
+        self.create_snapshot(store)
+
+        with atomic_write(state_path, "w", encoding="utf-8") as f:
+            json.dump({enlace: entry[1] for enlace, entry in index.items()}, f)
+        return len(records)
+
+    def update_main_json(self):
+        """
+        Actualiza el almacén particionado con los nuevos datos extraídos del día.
+        Los registros se guardan por enlace: los nuevos se insertan, los que
+        cambiaron se reemplazan y los idénticos se ignoran. Los cambios se
+        escriben en un delta que se compacta con las particiones mensuales
+        cada cierto número de días
+        """
         daily_dir = os.path.join(
             self.data_dir, "daily", self.today.strftime("%Y-%m-%d")
         )
         json_processed = os.path.join(daily_dir, "datos_electricos_organizados.json")
 
-        os.makedirs(os.path.join(self.data_dir, "processed"), exist_ok=True)
-
         if not os.path.exists(json_processed):
             logger.warning(
                 f"No se encontró el archivo JSON procesado en {json_processed}"
@@ -546,69 +810,34 @@ class DailyPipeline:
             json_processed = os.path.join(daily_dir, json_files[0])
             logger.info(f"Se utilizará el archivo: {json_processed}")
 
-        # Cargar datos principales si existen
-        if os.path.exists(main_json_path):
-            try:
-                with open(main_json_path, "r", encoding="utf-8") as f:
-                    main_data = json.load(f)
-                logger.info(f"Cargado archivo JSON principal desde {main_json_path}")
-            except Exception as e:
-                logger.error(f"Error al cargar el archivo principal: {e}")
-                main_data = {}
-        else:
-            main_data = {}
-            logger.warning("No se encontró archivo JSON principal. Creando uno nuevo.")
-
         try:
+            store = self.load_store()
+
             with open(json_processed, "r", encoding="utf-8") as f:
                 new_data = json.load(f)
             logger.info(f"Cargado archivo JSON nuevo desde {json_processed}")
-            existing_df = self.existing_data
-            existing_urls = (
-                set(existing_df["Enlace"].tolist())
-                if not existing_df.empty and "Enlace" in existing_df.columns
-                else set()
-            )
-            items_added = 0
-
-            for year, months in new_data.items():
-                if year not in main_data:
-                    main_data[year] = {}
 
-                for month, items in months.items():
-                    if month not in main_data[year]:
-                        main_data[year][month] = []
-
-                    for item in items:
-                        # Verificar si el enlace ya existe en los datos existentes
+            items = []
+            for months in new_data.values():
+                for month_items in months.values():
+                    for item in month_items:
                         if isinstance(item, dict) and "enlace" in item:
-                            if item["enlace"] not in existing_urls:
-                                main_data[year][month].append(item)
-                                items_added += 1
+                            items.append(item)
                         else:
                             logger.warning(f"Elemento no válido o sin enlace: {item}")
-                            continue
 
+            changed = store.upsert(items)
             logger.info(
-                f"Se agregaron {items_added} elementos nuevos al JSON principal"
+                f"Se guardaron {len(changed)} registros nuevos o actualizados "
+                f"({len(items) - len(changed)} sin cambios) en el almacén {store.root}"
             )
-
-            try:
-                with open(main_json_path, "w", encoding="utf-8") as f:
-                    json.dump(main_data, f, ensure_ascii=False, indent=2)
-                logger.info(f"Archivo JSON principal actualizado en {main_json_path}")
-
-                processed_path = os.path.join(
-                    self.data_dir, "processed", "datos_electricos_organizados.json"
-                )
-                with open(processed_path, "w", encoding="utf-8") as f:
-                    json.dump(main_data, f, ensure_ascii=False, indent=2)
-                logger.info(f"Copia del JSON guardada en {processed_path}")
-                return True
-            except Exception as e:
-                logger.error(f"Error al guardar el archivo JSON principal: {e}")
+            if len(store.delta_files()) >= DELTAS_ANTES_DE_COMPACTAR:
+                compacted = store.compact()
+                logger.info(f"Compactados {compacted} registros de los deltas del almacén")
+            self.sync_derived_stores(store, changed)
+            return True
         except Exception as e:
-            logger.error(f"Error al procesar el archivo JSON nuevo: {e}")
+            logger.error(f"Error al actualizar el almacén de datos procesados: {e}")
 
         return False
 
@@ -639,17 +868,15 @@ class DailyPipeline:
             )
             os.makedirs(daily_output_dir, exist_ok=True)
 
-            temp_csv_path = os.path.join(
-                daily_output_dir, f"temp_articulos_{str(self.today)}.csv"
-            )
-            df.to_csv(temp_csv_path, index=False)
-
             extractor = CreateJson(
-                path_df=temp_csv_path,
+                path_df=df.to_dict("records"),
                 path_template=self.template_path,
                 url_llm="https://api.fireworks.ai/inference/v1/chat/completions",
                 apikey=self.api_key,
                 model=self.model,
+                stream=self.stream,
+                ledger_path=self.ledger_path,
+                escalation_model=self.escalation_model,
                 a=2022,  # Año de inicio
                 b=2025,  # Año final
             )
@@ -658,9 +885,6 @@ class DailyPipeline:
                 delay=2, output_dir=daily_output_dir, save_individual=False
             )
 
-            if os.path.exists(temp_csv_path):
-                os.remove(temp_csv_path)
-
             if result == 0:
                 logger.info(f"Extracción JSON completada con éxito para {self.today}")
                 return True
@@ -672,10 +896,190 @@ class DailyPipeline:
             logger.error(f"Error en el procesamiento de artículos de {self.today}: {e}")
             return False
 
-    def run(self, analize_all=False):
+    def compact_daily_outputs(self, workers=8):
+        """
+        Incorpora al almacén las salidas de días anteriores (data/daily/<fecha>)
+        que falten, lo verifica y archiva los directorios diarios en
+        data/daily/archivo/<año-mes>.tar.xz. Todos los registros se guardan en
+        un único delta y se compactan de una vez, de modo que cada partición
+        mensual se reescribe una sola vez. Sólo se archivan los meses ya
+        terminados, todos sus días a la vez: el archivo de cada mes se escribe
+        una sola vez en lugar de reescribirse con cada día nuevo
+
+        Args:
+            workers (int): Número de hilos para leer los directorios diarios
+
+        Returns:
+            bool: True si el proceso fue exitoso, False en caso contrario
+        """
+        daily_root = os.path.join(self.data_dir, "daily")
+        fechas = sorted(
+            nombre
+            for nombre in os.listdir(daily_root)
+            if os.path.isdir(os.path.join(daily_root, nombre))
+            and len(nombre) == 10
+            and nombre < self.date_str  # El día actual puede estar escribiéndose
+        )
+        if not fechas:
+            logger.info("No hay salidas diarias anteriores que compactar")
+            return True
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            salidas = list(
+                executor.map(read_daily_output, [os.path.join(daily_root, f) for f in fechas])
+            )
+        records = [r for salida in salidas for r in salida["records"]]
+        articles = [a for salida in salidas for a in salida["articles"]]
+        logger.info(
+            f"Leídos {len(records)} registros y {len(articles)} artículos de {len(fechas)} días"
+        )
+
+        try:
+            store = self.load_store()
+            added = store.upsert(records, reemplazar=False)
+            compacted = store.compact()
+            logger.info(
+                f"Se agregaron {len(added)} registros que faltaban al almacén "
+                f"(compactados {compacted})"
+            )
+            existing_articles = self.articles.enlaces()
+            new_articles = {}
+            for article in articles:
+                if article.get("Enlace") not in existing_articles:
+                    new_articles.setdefault(article.get("Enlace"), article)
+            if new_articles:
+                self.articles.append(new_articles.values())
+                logger.info(f"Se agregaron {len(new_articles)} artículos que faltaban")
+
+            self.sync_derived_stores(store, added)
+        except Exception as e:
+            logger.error(f"Error al compactar las salidas diarias: {e}")
+            return False
+
+        # Sólo se archivan los días sin errores cuyos registros y artículos están
+        # guardados, y sólo de los meses terminados
+        index = store.load_index()
+        stored_articles = self.articles.enlaces()
+        por_mes = {}
+        for salida in salidas:
+            if salida["fecha"][:7] >= self.date_str[:7]:
+                continue
+            problemas = salida["errors"]
+            problemas += [
+                f"falta el registro {r['enlace']}" for r in salida["records"] if r["enlace"] not in index
+            ]
+            problemas += [
+                f"falta el artículo {a.get('Enlace')}"
+                for a in salida["articles"]
+                if a.get("Enlace") not in stored_articles
+            ]
+            if problemas:
+                logger.warning(
+                    f"No se archiva {salida['fecha']}: {len(problemas)} problemas ({problemas[0]})"
+                )
+                continue
+            por_mes.setdefault(salida["fecha"][:7], []).append(salida["fecha"])
+
+        for mes, dias in por_mes.items():
+            self._archive_daily(daily_root, mes, dias)
+            logger.info(f"Archivados {len(dias)} días de {mes}")
+        return True
+
+    def _archive_daily(self, daily_root, mes, dias):
+        """
+        Añade los directorios y CSV de los días indicados al archivo del mes y los elimina
+        """
+        archive_dir = os.path.join(daily_root, "archivo")
+        os.makedirs(archive_dir, exist_ok=True)
+        archive_path = os.path.join(archive_dir, f"{mes}.tar.xz")
+        tmp_path = archive_path + ".tmp"
+
+        paths = []
+        for dia in dias:
+            paths.append(os.path.join(daily_root, dia))
+            csv_path = os.path.join(daily_root, f"articulos_{dia}.csv")
+            if os.path.exists(csv_path):
+                paths.append(csv_path)
+
+        # tar.xz no admite añadir miembros: si el mes ya estaba archivado (un día
+        # que llegó tarde) se reescribe con los anteriores y los nuevos
+        with tarfile.open(tmp_path, "w:xz") as tar:
+            if os.path.exists(archive_path):
+                with tarfile.open(archive_path, "r:xz") as previo:
+                    for miembro in previo.getmembers():
+                        tar.addfile(miembro, previo.extractfile(miembro) if miembro.isfile() else None)
+            for path in paths:
+                tar.add(path, arcname=os.path.basename(path))
+        os.replace(tmp_path, archive_path)
+
+        for path in paths:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+    def reextract_sections(self):
+        """
+        Re-extrae únicamente las secciones del template que cambiaron desde que se
+        produjo cada registro del JSON principal y guarda el resultado
+
+        Returns:
+            bool: True si el proceso fue exitoso, False en caso contrario
+        """
+        store = self.load_store()
+        if not store.exists():
+            logger.error(f"No se encontraron datos procesados en {store.root}")
+            return False
+
+        main_data = store.load()
+
+        extractor = CreateJson(
+            path_df=self.articles.iter_rows(),
+            path_template=self.template_path,
+            url_llm="https://api.fireworks.ai/inference/v1/chat/completions",
+            apikey=self.api_key,
+            model=self.model,
+            stream=self.stream,
+            ledger_path=self.ledger_path,
+            escalation_model=self.escalation_model,
+            a=2021,
+            b=2025,
+        )
+
+        try:
+            actualizados = extractor.reextract_changed_sections(main_data, delay=2)
+        except Exception as e:
+            logger.error(f"Error durante la re-extracción por secciones: {e}")
+            return False
+
+        logger.info(f"Se re-extrajeron secciones de {actualizados} registros")
+
+        changed = []
+        if actualizados:
+            changed = store.upsert(
+                record for months in main_data.values()
+                for records in months.values() for record in records
+            )
+            logger.info(f"Se actualizaron {len(changed)} registros en {store.root}")
+        try:
+            self.sync_derived_stores(store, changed)
+        except Exception as e:
+            logger.error(f"Error al actualizar los almacenes derivados: {e}")
+            return False
+        return True
+
+    def run(self, analize_all=False, reextract_sections=False, compact_daily=False):
         """
         Ejecuta el pipeline completo
         """
+        if compact_daily:
+            logger.info("Iniciando compactación de las salidas diarias anteriores")
+            return self.compact_daily_outputs()
+
+        if reextract_sections:
+            logger.info("Iniciando re-extracción de secciones modificadas del template")
+            return self.reextract_sections()
+
         if not analize_all:
             logger.info(f"Iniciando pipeline con lookback de {self.days_lookback} días")
 
@@ -688,6 +1092,12 @@ class DailyPipeline:
                 result = self.process_new_articles(articles)
                 if isinstance(result, int) and result == 2:
                     logger.info("No hay artículos previos pendientes de procesar")
+                    # Completa los almacenes derivados si una ejecución anterior falló
+                    try:
+                        self.sync_derived_stores(self.load_store())
+                    except Exception as e:
+                        logger.error(f"Error al actualizar los almacenes derivados: {e}")
+                        return False
                     return 2
 
                 logger.info("Se procesaron artículos de días previos")
@@ -697,22 +1107,24 @@ class DailyPipeline:
                 f"Se encontraron {len(articles)} artículos nuevos para procesar"
             )
 
-            self.process_new_articles(articles)
+            if not self.process_new_articles(articles):
+                return False
 
             logger.info("Pipeline completado exitosamente")
             return True
         logger.info(
             "iniciando la Creación de los JSON para todos los articulos filtrados"
         )
-        path = os.path.join(
-            self.data_dir, "raw", "afectaciones_electricas_cubadebate_filter_2025.csv"
-        )
+        path = self.articles.path
         extractor = CreateJson(
-            path_df=path,
+            path_df=self.articles.iter_rows(),
             path_template=self.template_path,
             url_llm="https://api.fireworks.ai/inference/v1/chat/completions",
             apikey=self.api_key,
             model=self.model,
+            stream=self.stream,
+            ledger_path=self.ledger_path,
+            escalation_model=self.escalation_model,
             a=2021,
             b=2025,
         )
@@ -722,6 +1134,17 @@ class DailyPipeline:
 
         if result == 0:
             logger.info(f"Creación JSON completada con éxito para {path}")
+            store = PartitionedStore(os.path.join(self.data_dir, "processed", "store"))
+            changed = store.upsert(
+                record for months in extractor.organized_data.values()
+                for records in months.values() for record in records
+            )
+            logger.info(f"Se guardaron {len(changed)} registros nuevos o actualizados en el almacén")
+            try:
+                self.sync_derived_stores(store, changed)
+            except Exception as e:
+                logger.error(f"Error al actualizar los almacenes derivados: {e}")
+                return False
             return True
 
         logger.error(f"Error durante la creación JSON para {path}")
@@ -736,6 +1159,34 @@ if __name__ == "__main__":
     parser.add_argument(
         "--analize_all", type=bool, default=False, help="Analyze all articles if True"
     )
+    parser.add_argument(
+        "--reextract_sections",
+        action="store_true",
+        help="Re-extract only the template sections that changed since each record was produced",
+    )
+    parser.add_argument(
+        "--compact_daily",
+        action="store_true",
+        help="Fold previous data/daily/<date> outputs into the store and archive them",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream LLM responses and abort as soon as the JSON object is complete",
+    )
+    parser.add_argument(
+        "--model",
+        default=None,
+        help=(
+            "Model tried first for every article "
+            f"(default: {MODELO_PEQUEÑO} with escalation, {MODELO_GRANDE} without)"
+        ),
+    )
+    parser.add_argument(
+        "--escalation_model",
+        default=MODELO_GRANDE,
+        help="Model used when the first extraction fails validation (empty to disable)",
+    )
     parser.add_argument("--a", type=int, default=1, help="range a")
     parser.add_argument("--b", type=int, default=2, help="range b")
 
@@ -744,7 +1195,7 @@ if __name__ == "__main__":
 
     api_key = os.getenv("FIREWORKS_API_KEY")
 
-    if not api_key:
+    if not api_key and not args.compact_daily:
         logger.error(
             "No se encontró la clave API en las variables de entorno (FIREWORKS_API_KEY)"
         )
@@ -754,13 +1205,19 @@ if __name__ == "__main__":
         api_key=api_key,
         a=args.a,
         b=args.b,
-        model="accounts/fireworks/models/llama-v3p3-70b-instruct",
+        model=args.model or (MODELO_PEQUEÑO if args.escalation_model else MODELO_GRANDE),
+        escalation_model=args.escalation_model or None,
         template_path="template.json",
         data_dir="data",
         days_lookback=args.pages_lookback,
+        stream=args.stream,
     )
 
-    success = pipeline.run(analize_all=args.analize_all)
+    success = pipeline.run(
+        analize_all=args.analize_all,
+        reextract_sections=args.reextract_sections,
+        compact_daily=args.compact_daily,
+    )
     if isinstance(success, int) and success == 2:
         logger.info("No hay archivos nuevos para procesar.")
     elif success:
@@ -768,4 +1225,7 @@ if __name__ == "__main__":
         sys.exit(0)
     else:
         logger.error("Pipeline diario falló")
+        # El workflow diario comprueba este archivo antes de publicar los datos
+        with open(os.path.join(log_dir, "pipeline_error.log"), "a", encoding="utf-8") as f:
+            f.write(f"{datetime.now().isoformat(timespec='seconds')} Pipeline diario falló\n")
         sys.exit(1)
@@ -0,0 +1,39 @@
+"""
+Módulo de almacenamiento de los datos eléctricos procesados.
+"""
+
+from storage.articles import ArticleArchive
+from storage.atomic import atomic_write
+from storage.daily_metrics import DailyMetricsFile
+from storage.metrics_table import MetricsTable, flatten_metrics
+from storage.outage_index import OutageIndex
+from storage.partitioned import (
+    PartitionedStore,
+    content_hash,
+    partition_key,
+    partition_of,
+)
+from storage.plant_status import PlantStatusMatrix
+from storage.range_aggregates import RangeAggregates
+from storage.rollups import RollupTables
+from storage.snapshots import SnapshotStore, SnapshotView
+from storage.sqlite_store import SQLiteStore
+
+__all__ = [
+    'ArticleArchive',
+    'DailyMetricsFile',
+    'MetricsTable',
+    'OutageIndex',
+    'PartitionedStore',
+    'PlantStatusMatrix',
+    'RangeAggregates',
+    'RollupTables',
+    'SQLiteStore',
+    'SnapshotStore',
+    'SnapshotView',
+    'atomic_write',
+    'content_hash',
+    'flatten_metrics',
+    'partition_key',
+    'partition_of',
+]
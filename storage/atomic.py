@@ -0,0 +1,56 @@
+"""
+Escritura atómica de los archivos del almacenamiento.
+
+El contenido se escribe en un archivo temporal del mismo directorio y se mueve
+sobre el destino con os.replace, de modo que los lectores nunca ven un archivo
+a medio escribir. tempfile.mkstemp crea el temporal con permisos 0600, que
+os.replace conserva; antes del reemplazo se le dan los permisos de un archivo
+nuevo según la umask del proceso, para que la visualización pueda leerlo
+aunque se ejecute con un usuario distinto del pipeline.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+
+
+def _umask() -> int:
+    # os.umask sólo se puede leer cambiándola; se lee una vez al importar
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Permisos de un archivo creado con open() por este proceso
+PERMISOS = 0o666 & ~_umask()
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "wb", encoding: Optional[str] = None) -> Iterator[IO]:
+    """
+    Abre un archivo temporal que reemplaza a `path` al salir del bloque sin
+    errores; si hay un error, el temporal se elimina y el destino no cambia.
+
+    Args:
+        path: Ruta del archivo destino
+        mode: Modo de escritura ("wb" o "w")
+        encoding: Codificación en modo texto
+
+    Yields:
+        IO: Archivo temporal abierto
+    """
+    directorio = os.path.dirname(path)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directorio or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, PERMISOS)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,149 @@
+"""
+Archivo binario de ancho fijo con las métricas diarias, para abrir con np.memmap.
+
+Es un archivo .npy (una cabecera pequeña seguida de un array estructurado de
+NumPy) con una fila por día ordenada por fecha. Los lectores lo abren con
+np.load(mmap_mode="r"), que devuelve un np.memmap: las columnas son vistas
+sobre el archivo, sin parsear JSON, y varios procesos de Streamlit comparten
+las mismas páginas de la caché del sistema operativo.
+"""
+import os
+import argparse
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from storage.atomic import atomic_write
+from storage.metrics_table import COLUMNAS_METRICAS
+
+
+DTYPE = np.dtype(
+    [("fecha", "<M8[s]")]
+    + [(columna, "<f8") for columna in COLUMNAS_METRICAS]
+    + [("porcentaje_deficit", "<f8")]
+)
+
+COLUMNAS = list(DTYPE.names[1:])
+
+
+def _limite(fecha: str, final: bool) -> np.datetime64:
+    periodo = pd.Period(fecha)
+    return np.datetime64(periodo.end_time if final else periodo.start_time, "s")
+
+
+class DailyMetricsFile:
+    """
+    Serie diaria de métricas en un archivo .npy con dtype estructurado.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path: Ruta al archivo .npy
+        """
+        self.path = path
+
+    def exists(self) -> bool:
+        """Indica si el archivo ya fue creado."""
+        return os.path.exists(self.path)
+
+    def write(self, df: pd.DataFrame) -> int:
+        """
+        Reemplaza atómicamente el archivo con una fila por día.
+
+        Args:
+            df: Métricas indexadas por fecha (p. ej. MetricsTable.read()),
+                con un único reporte por día
+
+        Returns:
+            int: Número de filas escritas
+        """
+        df = df.sort_index()
+        datos = np.zeros(len(df), dtype=DTYPE)
+        datos["fecha"] = df.index.values.astype("datetime64[s]")
+        for columna in COLUMNAS_METRICAS:
+            datos[columna] = df[columna].to_numpy(dtype="f8", na_value=np.nan) if columna in df else np.nan
+        with np.errstate(divide="ignore", invalid="ignore"):
+            datos["porcentaje_deficit"] = np.where(
+                datos["demanda"] > 0, datos["deficit"] / datos["demanda"] * 100, np.nan
+            )
+
+        # Los lectores que ya tienen el archivo mapeado conservan la versión anterior
+        with atomic_write(self.path) as f:
+            np.save(f, datos, allow_pickle=False)
+        return len(datos)
+
+    def open(self) -> np.memmap:
+        """
+        Abre el archivo en modo sólo lectura sin copiar los datos.
+
+        Returns:
+            np.memmap: Array estructurado con el dtype DTYPE
+        """
+        datos = np.load(self.path, mmap_mode="r", allow_pickle=False)
+        if datos.dtype != DTYPE:
+            raise ValueError(f"Formato inesperado en {self.path}: {datos.dtype}")
+        return datos
+
+    def slice(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> np.memmap:
+        """
+        Filas de un rango de fechas por búsqueda binaria; el resultado sigue
+        siendo una vista sobre el archivo.
+
+        Args:
+            desde: Fecha mínima YYYY[-MM[-DD]] (inclusive)
+            hasta: Fecha máxima YYYY[-MM[-DD]] (inclusive)
+
+        Returns:
+            np.memmap: Filas del rango
+        """
+        datos = self.open()
+        inicio = np.searchsorted(datos["fecha"], _limite(desde, False)) if desde else 0
+        fin = np.searchsorted(datos["fecha"], _limite(hasta, True), side="right") if hasta else len(datos)
+        return datos[inicio:fin]
+
+    def read(
+        self,
+        columnas: Optional[List[str]] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Lee las columnas y el rango de fechas solicitados como DataFrame.
+
+        Args:
+            columnas: Columnas a leer (todas si es None)
+            desde: Fecha mínima YYYY[-MM[-DD]] (inclusive)
+            hasta: Fecha máxima YYYY[-MM[-DD]] (inclusive)
+
+        Returns:
+            pd.DataFrame: Métricas indexadas por fecha
+        """
+        datos = self.slice(desde, hasta)
+        return pd.DataFrame(
+            {columna: np.asarray(datos[columna]) for columna in columnas or COLUMNAS},
+            index=pd.DatetimeIndex(np.asarray(datos["fecha"]).astype("datetime64[ns]"), name="fecha"),
+        )
+
+
+if __name__ == "__main__":
+    from storage.metrics_table import MetricsTable
+
+    parser = argparse.ArgumentParser(
+        description="Rebuild the memory-mapped daily metrics file from the Parquet metrics table."
+    )
+    parser.add_argument(
+        "--metrics",
+        default=os.path.join("data", "processed", "metricas.parquet"),
+        help="Parquet metrics table",
+    )
+    parser.add_argument(
+        "--output",
+        default=os.path.join("data", "processed", "metricas_diarias.npy"),
+        help="Binary file to write",
+    )
+    args = parser.parse_args()
+
+    total = DailyMetricsFile(args.output).write(MetricsTable(args.metrics).read())
+    print(f"Escritas {total} filas en {args.output}")
@@ -0,0 +1,210 @@
+"""
+Tabla columnar (Parquet) con las métricas diarias aplanadas.
+
+La visualización sólo necesita unas pocas columnas numéricas por reporte
+(afectación, disponibilidad, demanda, déficit, respaldo y producción solar).
+Esta tabla las guarda con tipos explícitos junto al JSON, de modo que se
+puedan leer sólo las columnas y el rango de fechas necesarios.
+"""
+import os
+import argparse
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from storage.atomic import atomic_write
+
+
+# Columna de la tabla -> (sección del JSON, campo)
+CAMPOS = {
+    "afectacion": ("prediccion", "afectacion"),
+    "disponibilidad": ("prediccion", "disponibilidad"),
+    "demanda": ("prediccion", "demanda_maxima"),
+    "deficit": ("prediccion", "deficit"),
+    "respaldo": ("prediccion", "respaldo"),
+    "produccion_mwh": ("paneles_solares", "produccion_mwh"),
+    "parques": ("paneles_solares", "cantidad_parques"),
+    "capacidad_instalada": ("paneles_solares", "capacidad_instalada"),
+}
+
+COLUMNAS_METRICAS = list(CAMPOS)
+
+
+def flatten_metrics(registros: Iterable[Dict]) -> pd.DataFrame:
+    """
+    Aplana los registros del almacén en una fila de métricas por reporte.
+    Los valores no numéricos (p. ej. un respaldo descrito en texto) quedan como NaN.
+
+    Args:
+        registros: Registros con las claves "enlace", "fecha" y "datos"
+
+    Returns:
+        pd.DataFrame: Columnas fecha, enlace y métricas en float64
+    """
+    filas = []
+    for registro in registros:
+        if not isinstance(registro, dict) or not registro.get("enlace") or not registro.get("fecha"):
+            continue
+        datos = registro.get("datos") or {}
+        fila = {"fecha": registro["fecha"], "enlace": registro["enlace"]}
+        for columna, (seccion, campo) in CAMPOS.items():
+            valores = datos.get(seccion)
+            fila[columna] = valores.get(campo) if isinstance(valores, dict) else None
+        filas.append(fila)
+
+    df = pd.DataFrame(filas, columns=["fecha", "enlace"] + COLUMNAS_METRICAS)
+    df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
+    df["enlace"] = df["enlace"].astype(str)
+    for columna in COLUMNAS_METRICAS:
+        df[columna] = pd.to_numeric(df[columna], errors="coerce").astype("float64")
+    return df.dropna(subset=["fecha"]).reset_index(drop=True)
+
+
+class MetricsTable:
+    """
+    Tabla Parquet de métricas con lectura por columnas y rango de fechas.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path: Ruta al archivo Parquet
+        """
+        self.path = path
+
+    def exists(self) -> bool:
+        """Indica si la tabla ya fue creada."""
+        return os.path.exists(self.path)
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Reemplaza atómicamente la tabla completa.
+
+        Args:
+            df: Métricas con las columnas de flatten_metrics
+        """
+        with atomic_write(self.path) as f:
+            df.to_parquet(f, engine="pyarrow", index=False, row_group_size=256)
+
+    def append(self, registros: Iterable[Dict]) -> int:
+        """
+        Añade las métricas de los reportes cuyo enlace aún no está en la tabla.
+
+        Args:
+            registros: Registros con las claves "enlace", "fecha" y "datos"
+
+        Returns:
+            int: Número de filas añadidas
+        """
+        nuevas = flatten_metrics(registros).drop_duplicates("enlace")
+        tabla = nuevas
+        if self.exists():
+            actual = pd.read_parquet(self.path, engine="pyarrow")
+            nuevas = nuevas[~nuevas["enlace"].isin(actual["enlace"])]
+            tabla = pd.concat([actual, nuevas], ignore_index=True)
+        if nuevas.empty:
+            return 0
+        self.write(tabla)
+        return len(nuevas)
+
+    def upsert(self, registros: Iterable[Dict]) -> int:
+        """
+        Añade las métricas de los reportes nuevos y reemplaza en su misma
+        posición las filas de los reportes que ya están en la tabla.
+
+        Args:
+            registros: Registros con las claves "enlace", "fecha" y "datos"
+
+        Returns:
+            int: Número de filas añadidas o reemplazadas
+        """
+        nuevas = flatten_metrics(registros).drop_duplicates("enlace", keep="last")
+        if nuevas.empty:
+            return 0
+        if not self.exists():
+            self.write(nuevas)
+            return len(nuevas)
+
+        actual = pd.read_parquet(self.path, engine="pyarrow")
+        existentes = actual["enlace"].isin(nuevas["enlace"])
+        reemplazos = nuevas.set_index("enlace").loc[actual.loc[existentes, "enlace"]]
+        for columna in ["fecha"] + COLUMNAS_METRICAS:
+            actual.loc[existentes, columna] = reemplazos[columna].to_numpy()
+        tabla = pd.concat(
+            [actual, nuevas[~nuevas["enlace"].isin(actual["enlace"])]], ignore_index=True
+        )
+        self.write(tabla)
+        return len(nuevas)
+
+    def rebuild(self, registros: Iterable[Dict]) -> int:
+        """
+        Reconstruye la tabla completa a partir de los registros.
+
+        Args:
+            registros: Registros con las claves "enlace", "fecha" y "datos"
+
+        Returns:
+            int: Número de filas escritas
+        """
+        df = flatten_metrics(registros).drop_duplicates("enlace")
+        self.write(df)
+        return len(df)
+
+    def read(
+        self,
+        columnas: Optional[List[str]] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        un_reporte_por_dia: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Lee sólo las columnas y el rango de fechas solicitados.
+
+        Args:
+            columnas: Métricas a leer (todas si es None)
+            desde: Fecha mínima YYYY[-MM[-DD]] (inclusive)
+            hasta: Fecha máxima YYYY[-MM[-DD]] (inclusive)
+            un_reporte_por_dia: Conservar sólo el primer reporte almacenado de
+                cada día, como hace cargar_datos
+
+        Returns:
+            pd.DataFrame: Métricas indexadas por fecha
+        """
+        columnas = list(columnas or COLUMNAS_METRICAS)
+        filtros = []
+        if desde:
+            filtros.append(("fecha", ">=", pd.Period(desde).start_time))
+        if hasta:
+            filtros.append(("fecha", "<=", pd.Period(hasta).end_time))
+
+        df = pd.read_parquet(
+            self.path,
+            engine="pyarrow",
+            columns=["fecha"] + [c for c in columnas if c != "fecha"],
+            filters=filtros or None,
+        )
+        if un_reporte_por_dia:
+            df = df[~df["fecha"].dt.normalize().duplicated()]
+        return df.set_index("fecha").sort_index()
+
+
+if __name__ == "__main__":
+    from storage.partitioned import PartitionedStore
+
+    parser = argparse.ArgumentParser(
+        description="Rebuild the Parquet metrics table from the partitioned store."
+    )
+    parser.add_argument(
+        "--store",
+        default=os.path.join("data", "processed", "store"),
+        help="Partitioned store directory",
+    )
+    parser.add_argument(
+        "--output",
+        default=os.path.join("data", "processed", "metricas.parquet"),
+        help="Parquet file to write",
+    )
+    args = parser.parse_args()
+
+    total = MetricsTable(args.output).rebuild(PartitionedStore(args.store).iter_records())
+    print(f"Escritas {total} filas en {args.output}")
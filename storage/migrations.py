@@ -0,0 +1,242 @@
+"""
+Versiones del esquema de los registros y migraciones entre ellas.
+
+Cada registro guarda la versión del esquema de sus datos en "schema_version"
+(los registros sin esa clave son de la versión 0). Las migraciones se
+registran con el decorador `migracion(version)` y transforman la sección
+"datos" de una versión a la siguiente; `migrate_record` aplica en orden las que
+falten hasta llegar a SCHEMA_VERSION.
+
+Los lectores del almacén migran en memoria los registros antiguos, de modo que
+la visualización puede acceder a los campos directamente
+(`datos["prediccion"]["deficit"]`) sobre una forma uniforme. El pipeline guarda
+los registros migrados al cargar el almacén; también se puede migrar todo de
+una vez:
+
+    python -m storage.migrations
+"""
+import os
+import argparse
+from typing import Any, Callable, Dict
+
+
+# Migración de la versión N a la N + 1, por N
+MIGRACIONES: Dict[int, Callable[[Dict], Dict]] = {}
+
+
+def migracion(version: int) -> Callable:
+    """
+    Registra una migración de los datos de la versión `version` a la siguiente.
+
+    Args:
+        version: Versión de origen
+
+    Returns:
+        Callable: Decorador que registra la función
+    """
+    def registrar(funcion: Callable[[Dict], Dict]) -> Callable[[Dict], Dict]:
+        if version in MIGRACIONES:
+            raise ValueError(f"Ya existe una migración desde la versión {version}")
+        MIGRACIONES[version] = funcion
+        return funcion
+
+    return registrar
+
+
+def _completar(forma: Any, valor: Any) -> Any:
+    """
+    Devuelve una copia de valor en la que los objetos tienen todas las claves
+    de la forma (null si faltan), las listas nunca son null y los objetos de
+    una lista de objetos están completos. Sólo se añade lo que falta: los
+    valores de otro tipo que el esperado se conservan tal cual.
+    """
+    if isinstance(forma, dict):
+        if valor is None:
+            valor = {}
+        elif not isinstance(valor, dict):
+            return valor
+        completado = dict(valor)
+        for clave, sub in forma.items():
+            completado[clave] = _completar(sub, valor.get(clave))
+        return completado
+    if isinstance(forma, list):
+        if valor is None:
+            return []
+        if not isinstance(valor, list):
+            return valor
+        if forma and isinstance(forma[0], dict):
+            return [_completar(forma[0], v) if isinstance(v, dict) else v for v in valor]
+        return list(valor)
+    return valor
+
+
+@migracion(0)
+def _renombrar_deficit(datos: Dict) -> Dict:
+    """Las primeras plantillas usaban la clave "déficit" (con tilde)."""
+    datos = dict(datos)
+    for seccion in ("prediccion", "info_matutina"):
+        valores = datos.get(seccion)
+        if isinstance(valores, dict) and "déficit" in valores:
+            valores = dict(valores)
+            deficit = valores.pop("déficit")
+            valores.setdefault("deficit", deficit)
+            datos[seccion] = valores
+    return datos
+
+
+# Forma de los datos en la versión 2 del esquema (template.json en ese
+# momento). Está fijada aquí para que la migración no cambie si la plantilla
+# cambia después: los campos nuevos necesitan su propia migración.
+_FORMA_VERSION_2 = {
+    "zonas_con_problemas": [],
+    "fecha_reporte": None,
+    "prediccion": {
+        "disponibilidad": None,
+        "demanda_maxima": None,
+        "afectacion": None,
+        "deficit": None,
+        "respaldo": None,
+        "horario_pico": None,
+    },
+    "info_matutina": {
+        "hora": None,
+        "disponibilidad": None,
+        "demanda": None,
+        "deficit": None,
+        "proyeccion_mediodia": {
+            "afectacion_estimada": None,
+            "hora_estimada": None,
+        },
+    },
+    "plantas": {
+        "averia": [{"planta": None, "unidad": None, "unidades": [], "tipo": None}],
+        "mantenimiento": [{"planta": None, "unidad": None, "unidades": [], "tipo": None}],
+        "limitacion_termica": {"mw_afectados": None, "tipo": None},
+    },
+    "distribuida": {
+        "motores_con_problemas": {"total": None, "impacto_mw": None, "causa": None},
+        "problemas_lubricantes": {"mw_afectados": None, "unidades_afectadas": None},
+        "patanas_con_problemas": [
+            {
+                "patana_nombre": None,
+                "motores_afectados": None,
+                "mw_afectados": None,
+                "recuperacion_estimada": {
+                    "motores": None,
+                    "mw": None,
+                    "horario": None,
+                    "estado": None,
+                },
+            }
+        ],
+    },
+    "paneles_solares": {
+        "cantidad_parques": None,
+        "produccion_mwh": None,
+        "nuevos_parques": None,
+        "capacidad_instalada": None,
+        "periodo_produccion": None,
+    },
+    "impacto": {
+        "horas_totales": None,
+        "continuidad_afectacion": None,
+        "maximo": {"mw": None, "hora": None, "fecha": None, "nota": None},
+        "tendencia": None,
+    },
+}
+
+
+@migracion(1)
+def _completar_forma(datos: Dict) -> Dict:
+    """Completa las secciones y campos de la versión 2 que falten o sean null."""
+    return _completar(_FORMA_VERSION_2, datos)
+
+
+SCHEMA_VERSION = max(MIGRACIONES) + 1
+
+
+def migrate_datos(datos: Any, version: int) -> Dict:
+    """
+    Aplica a los datos de un registro las migraciones desde su versión.
+
+    Args:
+        datos: Sección "datos" del registro
+        version: Versión del esquema de los datos
+
+    Returns:
+        Dict: Datos en la versión SCHEMA_VERSION (nunca modifica los originales)
+    """
+    datos = datos if isinstance(datos, dict) else {}
+    for v in range(version, SCHEMA_VERSION):
+        datos = MIGRACIONES[v](datos)
+    return datos
+
+
+def needs_migration(registro: Dict) -> bool:
+    """Indica si el registro es de una versión anterior del esquema."""
+    return registro.get("schema_version", 0) < SCHEMA_VERSION
+
+
+def migrate_record(registro: Dict) -> bool:
+    """
+    Lleva un registro a la versión actual del esquema, modificándolo in situ.
+
+    Args:
+        registro: Registro con las claves "datos" y opcionalmente "schema_version"
+
+    Returns:
+        bool: True si el registro cambió de versión
+    """
+    if not needs_migration(registro):
+        return False
+    registro["datos"] = migrate_datos(registro.get("datos"), registro.get("schema_version", 0))
+    registro["schema_version"] = SCHEMA_VERSION
+    return True
+
+
+if __name__ == "__main__":
+    from storage.daily_metrics import DailyMetricsFile
+    from storage.metrics_table import MetricsTable
+    from storage.partitioned import PartitionedStore
+    from storage.sqlite_store import SQLiteStore
+
+    parser = argparse.ArgumentParser(
+        description="Migrate every record of the partitioned store to the current schema version "
+        "and refresh the derived database and metrics files."
+    )
+    parser.add_argument(
+        "--store",
+        default=os.path.join("data", "processed", "store"),
+        help="Partitioned store directory",
+    )
+    parser.add_argument(
+        "--db",
+        default=os.path.join("data", "processed", "datos_electricos.db"),
+        help="SQLite database to refresh",
+    )
+    parser.add_argument(
+        "--metrics",
+        default=os.path.join("data", "processed", "metricas.parquet"),
+        help="Parquet metrics table to refresh",
+    )
+    parser.add_argument(
+        "--daily",
+        default=os.path.join("data", "processed", "metricas_diarias.npy"),
+        help="Memory-mapped daily metrics file to refresh",
+    )
+    args = parser.parse_args()
+
+    store = PartitionedStore(args.store)
+    migrados = store.migrate()
+    print(f"Migrados {len(migrados)} registros a la versión {SCHEMA_VERSION} del esquema")
+    db = SQLiteStore(args.db)
+    if db.exists():
+        db.initialize()
+    tabla = MetricsTable(args.metrics)
+    if tabla.exists():
+        # La tabla puede ser anterior a la última migración, así que se
+        # reconstruye siempre
+        print(f"Escritas {tabla.rebuild(store.iter_records())} filas en {args.metrics}")
+        diario = DailyMetricsFile(args.daily)
+        if diario.exists():
+            print(f"Escritas {diario.write(tabla.read())} filas en {args.daily}")
@@ -0,0 +1,215 @@
+"""
+Índice de intervalos de los periodos de avería y mantenimiento de las plantas.
+
+Los periodos salen de PlantStatusMatrix.intervalos() (días con reporte
+consecutivos en el mismo estado). Un hueco de más de HUECO_MAXIMO_DIAS días
+sin reportes cierra el periodo: si no, una planta en avería antes y después de
+semanas sin datos sumaría todo ese tiempo como un único periodo. Los periodos de una misma planta y estado no
+se solapan, así que, ordenados por inicio, también quedan ordenados por fin.
+El índice los guarda agrupados por (planta, estado) en arrays ordenados con
+una clave `grupo * DESPLAZAMIENTO + día`. Así, una sola búsqueda binaria
+vectorizada encuentra en todos los grupos el primer periodo que termina después
+del inicio de la consulta y el último que empieza antes de su fin. Una
+consulta puntual o de rango cuesta O(log n + k) por planta y estado, donde k es
+el número de periodos devueltos.
+
+El índice se guarda como un archivo .npz junto a las métricas diarias:
+
+    python -m storage.outage_index
+"""
+import os
+import argparse
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from storage.atomic import atomic_write
+from storage.plant_status import COLUMNAS_INTERVALOS, PlantStatusMatrix
+
+
+# Días naturales máximos entre dos reportes de un mismo periodo
+HUECO_MAXIMO_DIAS = 7
+
+# Separación entre las claves de dos grupos (mayor que cualquier día desde 1970)
+DESPLAZAMIENTO = 1 << 32
+
+
+def _dia(fecha) -> int:
+    return int(np.datetime64(pd.Timestamp(fecha), "D").astype(np.int64))
+
+
+class OutageIndex:
+    """
+    Periodos de avería y mantenimiento con consultas puntuales y de rango.
+    """
+
+    def __init__(self, intervalos: pd.DataFrame) -> None:
+        """
+        Args:
+            intervalos: Columnas planta, estado, inicio, fin, dias y duracion
+                (PlantStatusMatrix.intervalos)
+        """
+        intervalos = intervalos.sort_values(["planta", "estado", "inicio"], kind="stable")
+        grupos = intervalos[["planta", "estado"]].drop_duplicates()
+        self.plantas = grupos["planta"].to_numpy(dtype=str)
+        self.estados = grupos["estado"].to_numpy(dtype=str)
+        self.grupo = (
+            pd.MultiIndex.from_frame(grupos)
+            .get_indexer(pd.MultiIndex.from_frame(intervalos[["planta", "estado"]]))
+            .astype(np.int64)
+        )
+        self.inicio = intervalos["inicio"].to_numpy().astype("datetime64[D]").astype(np.int64)
+        self.fin = intervalos["fin"].to_numpy().astype("datetime64[D]").astype(np.int64)
+        self.dias = intervalos["dias"].to_numpy(dtype=np.int64)
+        self._indexar()
+
+    def _indexar(self) -> None:
+        self._claves_inicio = self.grupo * DESPLAZAMIENTO + self.inicio
+        self._claves_fin = self.grupo * DESPLAZAMIENTO + self.fin
+        self._bases = np.arange(len(self.plantas), dtype=np.int64) * DESPLAZAMIENTO
+
+    @classmethod
+    def from_states(
+        cls, df: pd.DataFrame, fechas=None, max_hueco: Optional[int] = HUECO_MAXIMO_DIAS
+    ) -> "OutageIndex":
+        """
+        Construye el índice a partir de las filas de estado de las plantas.
+
+        Args:
+            df: Columnas fecha, planta y estado (SQLiteStore.estado_plantas)
+            fechas: Días con reporte (ver PlantStatusMatrix.from_states)
+            max_hueco: Días máximos entre dos reportes de un mismo periodo
+
+        Returns:
+            OutageIndex: Índice de los periodos
+        """
+        matriz = PlantStatusMatrix.from_states(df, fechas=fechas)
+        return cls(matriz.intervalos(max_hueco=max_hueco))
+
+    def __len__(self) -> int:
+        return len(self.inicio)
+
+    def _filas(self, posiciones: np.ndarray) -> pd.DataFrame:
+        inicio = self.inicio[posiciones].astype("datetime64[D]").astype("datetime64[ns]")
+        fin = self.fin[posiciones].astype("datetime64[D]").astype("datetime64[ns]")
+        return pd.DataFrame(
+            {
+                "planta": self.plantas[self.grupo[posiciones]].astype(object),
+                "estado": self.estados[self.grupo[posiciones]].astype(object),
+                "inicio": inicio,
+                "fin": fin,
+                "dias": self.dias[posiciones],
+                "duracion": (self.fin[posiciones] - self.inicio[posiciones]) + 1,
+            },
+            columns=COLUMNAS_INTERVALOS,
+        )
+
+    def overlapping(
+        self, desde, hasta, planta: Optional[str] = None, estado: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        Periodos que se solapan con un rango de días.
+
+        Args:
+            desde: Primer día del rango (inclusive)
+            hasta: Último día del rango (inclusive)
+            planta: Sólo los periodos de esta planta (todas si es None)
+            estado: Sólo los periodos en este estado (todos si es None)
+
+        Returns:
+            pd.DataFrame: Periodos con las columnas de PlantStatusMatrix.intervalos,
+            ordenados por planta, estado e inicio
+        """
+        bases = self._bases
+        if planta is not None or estado is not None:
+            seleccion = np.ones(len(bases), dtype=bool)
+            if planta is not None:
+                seleccion &= self.plantas == planta
+            if estado is not None:
+                seleccion &= self.estados == estado
+            bases = bases[seleccion]
+        # En cada grupo: primer periodo con fin >= desde y siguiente al último con inicio <= hasta
+        primeros = np.searchsorted(self._claves_fin, bases + _dia(desde))
+        ultimos = np.searchsorted(self._claves_inicio, bases + _dia(hasta), side="right")
+        cantidades = np.maximum(ultimos - primeros, 0)
+        desplazamientos = np.cumsum(cantidades) - cantidades
+        posiciones = np.repeat(primeros - desplazamientos, cantidades) + np.arange(cantidades.sum())
+        return self._filas(posiciones)
+
+    def at(self, fecha, planta: Optional[str] = None, estado: Optional[str] = None) -> pd.DataFrame:
+        """
+        Periodos en curso en un día (p. ej. las plantas en avería en esa fecha).
+
+        Args:
+            fecha: Día a consultar
+            planta: Sólo los periodos de esta planta (todas si es None)
+            estado: Sólo los periodos en este estado (todos si es None)
+
+        Returns:
+            pd.DataFrame: Periodos que contienen el día
+        """
+        return self.overlapping(fecha, fecha, planta, estado)
+
+    def write(self, path: str) -> int:
+        """
+        Guarda atómicamente el índice en un archivo .npz.
+
+        Args:
+            path: Ruta del archivo
+
+        Returns:
+            int: Número de periodos guardados
+        """
+        with atomic_write(path) as f:
+            np.savez(
+                f,
+                plantas=self.plantas,
+                estados=self.estados,
+                grupo=self.grupo,
+                inicio=self.inicio,
+                fin=self.fin,
+                dias=self.dias,
+            )
+        return len(self)
+
+    @classmethod
+    def open(cls, path: str) -> "OutageIndex":
+        """
+        Carga un índice guardado con write().
+
+        Args:
+            path: Ruta del archivo .npz
+
+        Returns:
+            OutageIndex: Índice de los periodos
+        """
+        indice = cls.__new__(cls)
+        with np.load(path, allow_pickle=False) as datos:
+            for nombre in ("plantas", "estados", "grupo", "inicio", "fin", "dias"):
+                setattr(indice, nombre, datos[nombre])
+        indice._indexar()
+        return indice
+
+
+if __name__ == "__main__":
+    from storage.sqlite_store import SQLiteStore
+
+    parser = argparse.ArgumentParser(
+        description="Rebuild the plant outage interval index from the SQLite database."
+    )
+    parser.add_argument(
+        "--db",
+        default=os.path.join("data", "processed", "datos_electricos.db"),
+        help="SQLite database with the plant states",
+    )
+    parser.add_argument(
+        "--output",
+        default=os.path.join("data", "processed", "intervalos_plantas.npz"),
+        help="Index file to write",
+    )
+    args = parser.parse_args()
+
+    db = SQLiteStore(args.db)
+    total = OutageIndex.from_states(db.estado_plantas(), fechas=db.prediccion().index).write(args.output)
+    print(f"Escritos {total} periodos en {args.output}")
@@ -0,0 +1,648 @@
+"""
+Almacén particionado de los datos eléctricos procesados.
+
+Los registros se guardan en un archivo JSON compacto por mes
+(`<root>/<año>/<año>-<mm>.json`) junto a un manifiesto que describe las
+particiones existentes. Cada escritura reemplaza la partición de forma atómica,
+de modo que los lectores nunca ven un archivo a medio escribir.
+
+Los registros nuevos no reescriben las particiones: se añaden como archivos de
+delta (`<root>/deltas/*.json`) que los lectores combinan con la base. La
+compactación incorpora los deltas a las particiones y después los elimina.
+
+Cada registro se identifica por su enlace. El índice `<root>/enlaces.json`
+guarda, por enlace, su partición, el hash de su contenido y la versión de
+extracción que lo produjo, de modo que un upsert decide qué registros son
+nuevos, cuáles cambiaron y cuáles no sin recorrer las particiones.
+
+Los registros de versiones anteriores del esquema (ver storage.migrations) se
+migran en memoria al leerlos; los lectores nunca escriben en el almacén.
+`migrate()`, que ejecuta el pipeline, guarda las particiones y deltas migrados.
+"""
+import os
+import json
+import hashlib
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from storage.atomic import atomic_write
+from storage.migrations import SCHEMA_VERSION, migrate_record
+from storage.records import decode_records, loads
+
+
+MESES = {
+    1: "enero",
+    2: "febrero",
+    3: "marzo",
+    4: "abril",
+    5: "mayo",
+    6: "junio",
+    7: "julio",
+    8: "agosto",
+    9: "septiembre",
+    10: "octubre",
+    11: "noviembre",
+    12: "diciembre",
+}
+NUMERO_MES = {nombre: numero for numero, nombre in MESES.items()}
+
+MANIFEST = "manifest.json"
+DELTAS = "deltas"
+INDEX = "enlaces.json"
+
+# Número de deltas pendientes a partir del cual conviene compactar
+DELTAS_ANTES_DE_COMPACTAR = 30
+
+
+def partition_key(año: str, mes: str) -> str:
+    """
+    Clave de una partición a partir del año y el nombre del mes.
+
+    Args:
+        año: Año (ej. "2025")
+        mes: Nombre del mes en español (ej. "mayo")
+
+    Returns:
+        str: Clave con formato YYYY-MM
+    """
+    return f"{año}-{NUMERO_MES[mes]:02d}"
+
+
+def partition_of(registro: Dict) -> Optional[Tuple[str, str]]:
+    """
+    Determina la partición (año, mes) de un registro a partir de su fecha.
+
+    Args:
+        registro: Registro con la clave "fecha" (YYYY-MM-DD...)
+
+    Returns:
+        Optional[Tuple[str, str]]: Año y nombre del mes, o None si la fecha no es válida
+    """
+    partes = str(registro.get("fecha") or "").split("-")
+    try:
+        return partes[0], MESES[int(partes[1])]
+    except (IndexError, KeyError, ValueError):
+        return None
+
+
+def content_hash(datos: Any) -> str:
+    """
+    Calcula un hash estable de un valor JSON. Se usa para el contenido
+    extraído de los registros y para las secciones del template.
+
+    Args:
+        datos: Sección "datos" del registro o sección del template
+
+    Returns:
+        str: Hash hexadecimal corto del contenido
+    """
+    serializado = json.dumps(datos, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(serializado.encode("utf-8")).hexdigest()[:16]
+
+
+def _write_json_atomic(path: str, data) -> int:
+    """
+    Escribe un JSON compacto en un archivo temporal y lo mueve sobre el destino.
+
+    Args:
+        path: Ruta del archivo destino
+        data: Datos a serializar
+
+    Returns:
+        int: Tamaño en bytes del archivo escrito
+    """
+    with atomic_write(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    return os.path.getsize(path)
+
+
+class PartitionedStore:
+    """
+    Almacén de registros con una partición JSON por mes y un manifiesto.
+    """
+
+    def __init__(self, root: str) -> None:
+        """
+        Args:
+            root: Directorio raíz del almacén
+        """
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST)
+        self.deltas_dir = os.path.join(root, DELTAS)
+        self.index_path = os.path.join(root, INDEX)
+
+    def exists(self) -> bool:
+        """Indica si el almacén ya fue inicializado."""
+        return os.path.exists(self.manifest_path) or bool(self.delta_files())
+
+    def load_manifest(self) -> Dict:
+        """
+        Carga el manifiesto del almacén.
+
+        Returns:
+            Dict: Manifiesto con la clave "particiones" (vacío si no existe,
+            p. ej. si el almacén sólo tiene deltas sin compactar)
+        """
+        if not os.path.exists(self.manifest_path):
+            return {"particiones": {}}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _partition_path(self, año: str, mes: str) -> str:
+        return os.path.join(self.root, año, f"{partition_key(año, mes)}.json")
+
+    def partitions(
+        self, desde: Optional[str] = None, hasta: Optional[str] = None
+    ) -> List[Tuple[str, str]]:
+        """
+        Lista las particiones existentes (en la base o en los deltas) en orden cronológico.
+
+        Args:
+            desde: Clave mínima YYYY-MM (inclusive)
+            hasta: Clave máxima YYYY-MM (inclusive)
+
+        Returns:
+            List[Tuple[str, str]]: Pares (año, mes)
+        """
+        return self._partitions(self._read_deltas(), desde, hasta)
+
+    def _partitions(
+        self,
+        deltas: Dict[Tuple[str, str], List[Dict]],
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+    ) -> List[Tuple[str, str]]:
+        particiones = {
+            clave: (info["año"], info["mes"])
+            for clave, info in self.load_manifest()["particiones"].items()
+        }
+        for año, mes in deltas:
+            particiones.setdefault(partition_key(año, mes), (año, mes))
+        return [
+            particion
+            for clave, particion in sorted(particiones.items())
+            if (desde is None or clave >= desde) and (hasta is None or clave <= hasta)
+        ]
+
+    def delta_files(self) -> List[str]:
+        """
+        Lista los archivos de delta pendientes de compactar, del más antiguo al más reciente.
+
+        Returns:
+            List[str]: Rutas de los deltas
+        """
+        if not os.path.isdir(self.deltas_dir):
+            return []
+        return [
+            os.path.join(self.deltas_dir, nombre)
+            for nombre in sorted(os.listdir(self.deltas_dir))
+            if nombre.endswith(".json")
+        ]
+
+    def version(self) -> str:
+        """
+        Identificador de la versión actual de los datos, sin leer las particiones.
+        Cambia con cada delta nuevo (que modifica el directorio de deltas) y con
+        cada escritura de particiones (que reemplaza el manifiesto).
+
+        Returns:
+            str: Versión del almacén ("" si no existe)
+        """
+        marcas = []
+        for path in (self.manifest_path, self.deltas_dir):
+            try:
+                marcas.append(str(os.stat(path).st_mtime_ns))
+            except OSError:
+                marcas.append("0")
+        return "" if marcas == ["0", "0"] else "-".join(marcas)
+
+    def _read_deltas(
+        self, archivos: Optional[List[str]] = None
+    ) -> Dict[Tuple[str, str], List[Dict]]:
+        """Lee los deltas (migrados) y agrupa sus registros por partición."""
+        por_particion: Dict[Tuple[str, str], List[Dict]] = {}
+        for path in self.delta_files() if archivos is None else archivos:
+            try:
+                with open(path, "rb") as f:
+                    registros = loads(f.read())
+            except FileNotFoundError:
+                # Un compactador concurrente ya lo incorporó a la base
+                continue
+            self._migrate(registros)
+            for registro in registros:
+                particion = partition_of(registro)
+                if particion is not None:
+                    por_particion.setdefault(particion, []).append(registro)
+        return por_particion
+
+    def _read_base(self, año: str, mes: str) -> List[Dict]:
+        path = self._partition_path(año, mes)
+        if not os.path.exists(path):
+            return []
+        with open(path, "rb") as f:
+            registros = loads(f.read())
+        self._migrate(registros)
+        return registros
+
+    @staticmethod
+    def _migrate(registros: List[Dict]) -> List[Dict]:
+        """
+        Migra in situ, sólo en memoria, los registros de versiones anteriores
+        del esquema y actualiza su hash de contenido.
+
+        Returns:
+            List[Dict]: Registros migrados
+        """
+        migrados = [r for r in registros if isinstance(r, dict) and migrate_record(r)]
+        for registro in migrados:
+            registro["content_hash"] = content_hash(registro["datos"])
+        return migrados
+
+    @staticmethod
+    def _merge(base: List[Any], nuevos: List[Any]) -> List[Any]:
+        """
+        Combina la base con registros más recientes: un registro con un enlace
+        ya presente reemplaza al anterior en su misma posición y los demás se
+        añaden al final.
+        """
+        if not nuevos:
+            return base
+
+        def _enlace(registro):
+            return registro.get("enlace") if isinstance(registro, dict) else registro.enlace
+
+        posiciones: Dict[str, List[int]] = {}
+        for i, registro in enumerate(base):
+            posiciones.setdefault(_enlace(registro), []).append(i)
+        combinados = list(base)
+        for registro in nuevos:
+            enlace = _enlace(registro)
+            if enlace in posiciones:
+                for i in posiciones[enlace]:
+                    combinados[i] = registro
+            else:
+                posiciones[enlace] = [len(combinados)]
+                combinados.append(registro)
+        return combinados
+
+    def read_partition(self, año: str, mes: str) -> List[Dict]:
+        """
+        Lee los registros de una partición, incluidos sus deltas pendientes.
+
+        Args:
+            año: Año de la partición
+            mes: Nombre del mes de la partición
+
+        Returns:
+            List[Dict]: Registros de la partición (vacía si no existe)
+        """
+        return self._merge(self._read_base(año, mes), self._read_deltas().get((año, mes), []))
+
+    def write_partition(self, año: str, mes: str, registros: List[Dict]) -> None:
+        """
+        Reemplaza atómicamente una partición y actualiza el manifiesto.
+
+        Args:
+            año: Año de la partición
+            mes: Nombre del mes de la partición
+            registros: Registros completos de la partición
+        """
+        self.write_partitions({(año, mes): registros})
+
+    def write_partitions(self, particiones: Dict[Tuple[str, str], List[Dict]]) -> None:
+        """
+        Reemplaza atómicamente varias particiones y actualiza el manifiesto una sola vez.
+
+        Args:
+            particiones: Registros completos por (año, mes)
+        """
+        if not particiones:
+            return
+
+        manifest = self.load_manifest()
+        ahora = datetime.now().isoformat(timespec="seconds")
+        for (año, mes), registros in particiones.items():
+            tamaño = _write_json_atomic(self._partition_path(año, mes), registros)
+            manifest["particiones"][partition_key(año, mes)] = {
+                "año": año,
+                "mes": mes,
+                "archivo": os.path.relpath(self._partition_path(año, mes), self.root),
+                "registros": len(registros),
+                "bytes": tamaño,
+                "actualizado": ahora,
+            }
+        _write_json_atomic(self.manifest_path, manifest)
+
+    def iter_records(
+        self, desde: Optional[str] = None, hasta: Optional[str] = None
+    ) -> Iterator[Dict]:
+        """
+        Recorre los registros de las particiones solicitadas, una partición a la vez.
+
+        Args:
+            desde: Clave mínima YYYY-MM (inclusive)
+            hasta: Clave máxima YYYY-MM (inclusive)
+
+        Yields:
+            Dict: Registro almacenado
+        """
+        deltas = self._read_deltas()
+        for año, mes in self._partitions(deltas, desde, hasta):
+            yield from self._merge(self._read_base(año, mes), deltas.get((año, mes), []))
+
+    def iter_typed(
+        self,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        solo_prediccion: bool = False,
+    ) -> Iterator[Any]:
+        """
+        Recorre los registros como structs tipados generados de template.json
+        (requiere msgspec). La fecha ya viene convertida a datetime.
+
+        Args:
+            desde: Clave mínima YYYY-MM (inclusive)
+            hasta: Clave máxima YYYY-MM (inclusive)
+            solo_prediccion: Decodificar sólo la sección prediccion de cada registro
+
+        Yields:
+            Registro o RegistroPrediccion: Registro almacenado
+        """
+        deltas: Dict[Tuple[str, str], List[Any]] = {}
+        for path in self.delta_files():
+            try:
+                with open(path, "rb") as f:
+                    registros = decode_records(f.read(), solo_prediccion)
+            except FileNotFoundError:
+                continue
+            if any(r.schema_version < SCHEMA_VERSION for r in registros):
+                # Se migra el delta con los lectores de diccionarios
+                registros = decode_records(
+                    json.dumps(
+                        [r for rs in self._read_deltas([path]).values() for r in rs],
+                        ensure_ascii=False,
+                    ).encode("utf-8"),
+                    solo_prediccion,
+                )
+            for registro in registros:
+                particion = (str(registro.fecha.year), MESES[registro.fecha.month])
+                deltas.setdefault(particion, []).append(registro)
+
+        for año, mes in self._partitions(deltas, desde, hasta):
+            path = self._partition_path(año, mes)
+            base = []
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    base = decode_records(f.read(), solo_prediccion)
+                if any(r.schema_version < SCHEMA_VERSION for r in base):
+                    # Se migra la partición con los lectores de diccionarios
+                    base = decode_records(
+                        json.dumps(self._read_base(año, mes), ensure_ascii=False).encode("utf-8"),
+                        solo_prediccion,
+                    )
+            yield from self._merge(base, deltas.get((año, mes), []))
+
+    def load(
+        self, desde: Optional[str] = None, hasta: Optional[str] = None
+    ) -> Dict[str, Dict[str, List[Dict]]]:
+        """
+        Carga las particiones solicitadas con la estructura anidada {año: {mes: [...]}}.
+
+        Args:
+            desde: Clave mínima YYYY-MM (inclusive)
+            hasta: Clave máxima YYYY-MM (inclusive)
+
+        Returns:
+            Dict: Registros organizados por año y mes
+        """
+        deltas = self._read_deltas()
+        data: Dict[str, Dict[str, List[Dict]]] = {}
+        for año, mes in self._partitions(deltas, desde, hasta):
+            data.setdefault(año, {})[mes] = self._merge(
+                self._read_base(año, mes), deltas.get((año, mes), [])
+            )
+        return data
+
+    def load_index(self) -> Dict[str, List[Any]]:
+        """
+        Carga el índice de enlaces, construyéndolo a partir de los registros si
+        todavía no existe.
+
+        Returns:
+            Dict[str, List[Any]]: [clave de partición, hash del contenido,
+            versión de extracción] por enlace
+        """
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                return loads(f.read())
+
+        indice = {}
+        for registro in self.iter_records():
+            particion = partition_of(registro)
+            if particion is None or not registro.get("enlace"):
+                continue
+            indice[registro["enlace"]] = [
+                partition_key(*particion),
+                registro.get("content_hash") or content_hash(registro.get("datos")),
+                registro.get("extraction_version", 0),
+            ]
+        if indice:
+            _write_json_atomic(self.index_path, indice)
+        return indice
+
+    def upsert(
+        self,
+        registros: Iterable[Dict],
+        excluir_enlaces: Optional[set] = None,
+        reemplazar: bool = True,
+    ) -> List[Dict]:
+        """
+        Inserta o actualiza registros por enlace escribiendo un único archivo de
+        delta, sin reescribir las particiones. Un registro cuyo contenido no
+        cambió se ignora, por lo que repetir una extracción es idempotente. Un
+        registro existente sólo se reemplaza si su versión de extracción no es
+        anterior a la almacenada.
+
+        Se asume que la fecha de un artículo no cambia al volver a extraerlo:
+        el registro actualizado queda en la misma partición que el original.
+
+        Args:
+            registros: Registros con las claves "enlace", "fecha" y "datos" y
+                opcionalmente "extraction_version"
+            excluir_enlaces: Enlaces que no deben guardarse
+            reemplazar: Si es False, los enlaces existentes se ignoran
+
+        Returns:
+            List[Dict]: Registros insertados o actualizados, con su "content_hash"
+        """
+        excluir_enlaces = excluir_enlaces or set()
+        candidatos: Dict[str, Dict] = {}
+        for registro in registros:
+            if not isinstance(registro, dict) or not registro.get("enlace"):
+                continue
+            if partition_of(registro) is None or registro["enlace"] in excluir_enlaces:
+                continue
+            registro = dict(registro)
+            migrate_record(registro)
+            candidatos[registro["enlace"]] = registro
+
+        indice = self.load_index()
+        cambios = []
+        for enlace, registro in candidatos.items():
+            hash_nuevo = content_hash(registro.get("datos"))
+            version = registro.get("extraction_version", 0)
+            actual = indice.get(enlace)
+            if actual is not None:
+                if not reemplazar or actual[1] == hash_nuevo or version < actual[2]:
+                    continue
+            cambios.append({**registro, "content_hash": hash_nuevo})
+            indice[enlace] = [partition_key(*partition_of(registro)), hash_nuevo, version]
+
+        if cambios:
+            nombre = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}.json"
+            _write_json_atomic(os.path.join(self.deltas_dir, nombre), cambios)
+            # Si el proceso se interrumpe aquí, el siguiente upsert repite el
+            # delta y la combinación por enlace lo deja sin efecto
+            _write_json_atomic(self.index_path, indice)
+        return cambios
+
+    def append(
+        self, registros: Iterable[Dict], excluir_enlaces: Optional[set] = None
+    ) -> int:
+        """
+        Añade sólo los registros cuyo enlace aún no está en el almacén.
+
+        Args:
+            registros: Registros con las claves "enlace", "fecha" y "datos"
+            excluir_enlaces: Enlaces que no deben añadirse
+
+        Returns:
+            int: Número de registros añadidos
+        """
+        return len(self.upsert(registros, excluir_enlaces, reemplazar=False))
+
+    def compact(self) -> int:
+        """
+        Incorpora los deltas pendientes a las particiones base y los elimina.
+        Cada partición se reemplaza de forma atómica y los lectores combinan
+        base y deltas por enlace, así que nunca ven registros duplicados ni
+        perdidos aunque la compactación se interrumpa.
+
+        Returns:
+            int: Número de registros insertados o actualizados en la base
+        """
+        archivos = self.delta_files()
+        if not archivos:
+            return 0
+
+        cambios = {}
+        incorporados = 0
+        for (año, mes), nuevos in self._read_deltas(archivos).items():
+            cambios[(año, mes)] = self._merge(self._read_base(año, mes), nuevos)
+            incorporados += len(nuevos)
+
+        self.write_partitions(cambios)
+        for path in archivos:
+            if os.path.exists(path):
+                os.remove(path)
+        return incorporados
+
+    def migrate(self) -> List[Dict]:
+        """
+        Migra a la versión actual del esquema todas las particiones y deltas
+        que aún no lo estén, y actualiza sus hashes en el índice. Debe
+        ejecutarlo el proceso que escribe en el almacén.
+
+        Returns:
+            List[Dict]: Registros migrados
+        """
+        migrados = []
+        for path in self.delta_files():
+            try:
+                with open(path, "rb") as f:
+                    registros = loads(f.read())
+            except FileNotFoundError:
+                continue
+            cambios = self._migrate(registros)
+            if cambios:
+                _write_json_atomic(path, registros)
+                migrados.extend(cambios)
+        for año, mes in self._partitions({}):
+            path = self._partition_path(año, mes)
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                registros = loads(f.read())
+            cambios = self._migrate(registros)
+            if cambios:
+                self.write_partitions({(año, mes): registros})
+                migrados.extend(cambios)
+        if migrados and os.path.exists(self.index_path):
+            indice = self.load_index()
+            for registro in migrados:
+                if registro.get("enlace") in indice:
+                    indice[registro["enlace"]][1] = registro["content_hash"]
+            _write_json_atomic(self.index_path, indice)
+        return migrados
+
+    def import_nested(self, data: Dict[str, Dict[str, List[Dict]]]) -> int:
+        """
+        Importa datos con la estructura anidada {año: {mes: [...]}} reemplazando
+        las particiones correspondientes.
+
+        Args:
+            data: Registros organizados por año y mes
+
+        Returns:
+            int: Número de registros importados
+        """
+        particiones = {
+            (año, mes): registros
+            for año, meses in data.items()
+            for mes, registros in meses.items()
+            if registros and mes in NUMERO_MES
+        }
+        for registros in particiones.values():
+            for registro in registros:
+                if isinstance(registro, dict):
+                    migrate_record(registro)
+        self.write_partitions(particiones)
+        # El índice se reconstruye en el próximo upsert
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        return sum(len(r) for r in particiones.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Import a nested {year: {month: [...]}} JSON file into the partitioned store, "
+        "or compact its pending deltas."
+    )
+    parser.add_argument(
+        "--source",
+        default=os.path.join("data", "processed", "datos_electricos_organizados.json"),
+        help="Monolithic JSON file to import",
+    )
+    parser.add_argument(
+        "--store",
+        default=os.path.join("data", "processed", "store"),
+        help="Partitioned store directory",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Fold pending deltas into the monthly partitions instead of importing",
+    )
+    args = parser.parse_args()
+
+    store = PartitionedStore(args.store)
+    if args.compact:
+        pendientes = len(store.delta_files())
+        total = store.compact()
+        print(f"Compactados {pendientes} deltas ({total} registros) en {args.store}")
+    else:
+        with open(args.source, "r", encoding="utf-8") as f:
+            nested = json.load(f)
+        total = store.import_nested(nested)
+        print(f"Importados {total} registros en {args.store}")
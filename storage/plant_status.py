@@ -0,0 +1,328 @@
+"""
+Matriz de estado de las plantas termoeléctricas.
+
+Una fila por planta (nombre canónico) y una columna por día con reporte; cada
+celda es un int8 con el estado de la planta ese día. Los estados son banderas
+de bits, porque una planta puede tener a la vez unidades en avería y en
+mantenimiento:
+
+    0  operativa (la planta no aparece en el reporte del día)
+    1  avería
+    2  mantenimiento
+    3  avería y mantenimiento
+
+Las consultas de las páginas (días operativos por planta, proporción de días
+en cada estado, plantas afectadas en una fecha) son reducciones de NumPy sobre
+una porción de la matriz, sin recorrer los reportes. Los periodos continuos en
+avería o mantenimiento de todas las plantas se obtienen de una sola pasada con
+una codificación por longitud de series (run-length) sobre la matriz.
+"""
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+OPERATIVA = 0
+AVERIA = 1
+MANTENIMIENTO = 2
+
+# Estado de SQLiteStore.estado_plantas -> bandera
+CODIGOS = {"Avería": AVERIA, "Mantenimiento": MANTENIMIENTO}
+
+COLUMNAS_INTERVALOS = ["planta", "estado", "inicio", "fin", "dias", "duracion"]
+
+
+def _dia(fecha, final: bool = False) -> np.datetime64:
+    periodo = pd.Period(fecha, freq="D") if not isinstance(fecha, str) else pd.Period(fecha)
+    return np.datetime64(periodo.end_time if final else periodo.start_time, "D")
+
+
+class PlantStatusMatrix:
+    """
+    Estados de las plantas por día en una matriz int8 (plantas × fechas).
+    """
+
+    def __init__(self, plantas: List[str], fechas: np.ndarray, estados: np.ndarray) -> None:
+        """
+        Args:
+            plantas: Nombres de las filas (canónicos, salvo que se construya
+                con los nombres tal como aparecen en los reportes)
+            fechas: Días de las columnas, ordenados (datetime64[D])
+            estados: Matriz int8 de banderas de estado
+        """
+        self.plantas = list(plantas)
+        self.fechas = np.asarray(fechas, dtype="datetime64[D]")
+        self.estados = estados
+        self._filas = {planta: i for i, planta in enumerate(self.plantas)}
+
+    @classmethod
+    def from_states(
+        cls,
+        df: pd.DataFrame,
+        fechas: Optional[Iterable] = None,
+        plantas: Optional[Iterable[str]] = None,
+    ) -> "PlantStatusMatrix":
+        """
+        Construye la matriz a partir de las filas de estado de las plantas.
+
+        Args:
+            df: Columnas fecha, planta y estado (SQLiteStore.estado_plantas)
+            fechas: Días con reporte (por defecto, los de df); en los días sin
+                ninguna planta afectada todas quedan operativas
+            plantas: Nombres de las filas (por defecto, los de df)
+
+        Returns:
+            PlantStatusMatrix: Matriz de sólo lectura
+        """
+        vacio = df.empty or "fecha" not in df
+        dias = (
+            np.array([], dtype="datetime64[D]")
+            if vacio
+            else pd.to_datetime(df["fecha"]).to_numpy().astype("datetime64[D]")
+        )
+        if fechas is not None:
+            dias_reporte = pd.to_datetime(pd.Index(fechas)).to_numpy().astype("datetime64[D]")
+            columnas = np.unique(np.concatenate([dias, dias_reporte]))
+        else:
+            columnas = np.unique(dias)
+        nombres = sorted(set(plantas or []) | (set() if vacio else set(df["planta"])))
+
+        estados = np.zeros((len(nombres), len(columnas)), dtype=np.int8)
+        if not vacio:
+            filas = pd.Index(nombres).get_indexer(df["planta"])
+            codigos = df["estado"].map(CODIGOS).fillna(OPERATIVA).to_numpy(dtype=np.int8)
+            np.bitwise_or.at(estados, (filas, np.searchsorted(columnas, dias)), codigos)
+        # La matriz se comparte entre sesiones a través de la caché
+        estados.flags.writeable = False
+        return cls(nombres, columnas, estados)
+
+    def _columnas(self, columnas: Optional[Union[np.ndarray, slice]]) -> np.ndarray:
+        return self.estados if columnas is None else self.estados[:, columnas]
+
+    def fila(self, planta: str) -> np.ndarray:
+        """
+        Serie de estados de una planta.
+
+        Args:
+            planta: Nombre canónico
+
+        Returns:
+            np.ndarray: Estados por fecha (vacía si la planta no existe)
+        """
+        i = self._filas.get(planta)
+        return self.estados[i] if i is not None else np.zeros(len(self.fechas), dtype=np.int8)
+
+    def rango(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> slice:
+        """
+        Columnas de un rango de fechas por búsqueda binaria.
+
+        Args:
+            desde: Fecha mínima YYYY[-MM[-DD]] (inclusive)
+            hasta: Fecha máxima YYYY[-MM[-DD]] (inclusive)
+
+        Returns:
+            slice: Columnas del rango
+        """
+        inicio = np.searchsorted(self.fechas, _dia(desde)) if desde else 0
+        fin = np.searchsorted(self.fechas, _dia(hasta, True), side="right") if hasta else len(self.fechas)
+        return slice(inicio, fin)
+
+    def slice(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> "PlantStatusMatrix":
+        """
+        Matriz de un rango de fechas; comparte los datos con la original.
+
+        Args:
+            desde: Fecha mínima YYYY[-MM[-DD]] (inclusive)
+            hasta: Fecha máxima YYYY[-MM[-DD]] (inclusive)
+
+        Returns:
+            PlantStatusMatrix: Vista del rango
+        """
+        columnas = self.rango(desde, hasta)
+        return PlantStatusMatrix(self.plantas, self.fechas[columnas], self.estados[:, columnas])
+
+    def periodo(self, años: Iterable[int], inicio, fin) -> np.ndarray:
+        """
+        Columnas de los días entre dos fechas del año (mes y día) de los años indicados.
+
+        Args:
+            años: Años a incluir
+            inicio: Fecha con el mes y día iniciales (inclusive)
+            fin: Fecha con el mes y día finales (inclusive)
+
+        Returns:
+            np.ndarray: Máscara booleana de columnas
+        """
+        fechas = pd.DatetimeIndex(self.fechas)
+        mes_dia = fechas.month * 100 + fechas.day
+        return (
+            np.isin(fechas.year, list(años))
+            & (mes_dia >= inicio.month * 100 + inicio.day)
+            & (mes_dia <= fin.month * 100 + fin.day)
+        )
+
+    def dias_operativos(self, columnas: Optional[Union[np.ndarray, slice]] = None) -> pd.Series:
+        """
+        Días en que cada planta estuvo operativa.
+
+        Args:
+            columnas: Máscara o slice de columnas (todas si es None)
+
+        Returns:
+            pd.Series: Días por planta
+        """
+        return pd.Series(
+            (self._columnas(columnas) == OPERATIVA).sum(axis=1), index=self.plantas, name="dias_operativos"
+        )
+
+    def dias_en_estado(self, columnas: Optional[Union[np.ndarray, slice]] = None) -> pd.DataFrame:
+        """
+        Días de cada planta en avería, en mantenimiento y operativa. Un día con
+        unidades en avería y en mantenimiento cuenta en ambos estados.
+
+        Args:
+            columnas: Máscara o slice de columnas (todas si es None)
+
+        Returns:
+            pd.DataFrame: Columnas Avería, Mantenimiento y Operativa indexadas por planta
+        """
+        estados = self._columnas(columnas)
+        return pd.DataFrame(
+            {
+                "Avería": (estados & AVERIA).astype(bool).sum(axis=1),
+                "Mantenimiento": (estados & MANTENIMIENTO).astype(bool).sum(axis=1),
+                "Operativa": (estados == OPERATIVA).sum(axis=1),
+            },
+            index=pd.Index(self.plantas, name="planta"),
+        )
+
+    def dias_afectados(
+        self, plantas: Iterable[str], columnas: Optional[Union[np.ndarray, slice]] = None
+    ) -> int:
+        """
+        Días en que al menos una de las plantas estuvo en avería o en mantenimiento.
+
+        Args:
+            plantas: Nombres de las filas a considerar
+            columnas: Máscara o slice de columnas (todas si es None)
+
+        Returns:
+            int: Número de días
+        """
+        filas = [self._filas[planta] for planta in plantas if planta in self._filas]
+        return int((self._columnas(columnas)[filas] != OPERATIVA).any(axis=0).sum())
+
+    def proporciones(self, columnas: Optional[Union[np.ndarray, slice]] = None) -> pd.DataFrame:
+        """
+        Fracción de los días con reporte que cada planta pasó en cada estado.
+
+        Args:
+            columnas: Máscara o slice de columnas (todas si es None)
+
+        Returns:
+            pd.DataFrame: Las columnas de dias_en_estado divididas por el número de días
+        """
+        dias = self._columnas(columnas).shape[1]
+        return self.dias_en_estado(columnas) / dias if dias else self.dias_en_estado(columnas) * np.nan
+
+    def estados_en(self, fecha) -> Dict[str, int]:
+        """
+        Plantas afectadas en una fecha.
+
+        Args:
+            fecha: Día a consultar
+
+        Returns:
+            Dict[str, int]: Bandera de estado por planta (vacío si no hay reporte ese día)
+        """
+        dia = _dia(fecha)
+        j = np.searchsorted(self.fechas, dia)
+        if j >= len(self.fechas) or self.fechas[j] != dia:
+            return {}
+        columna = self.estados[:, j]
+        return {self.plantas[i]: int(columna[i]) for i in np.flatnonzero(columna)}
+
+    def intervalos(
+        self,
+        estados: Iterable[str] = ("Avería", "Mantenimiento"),
+        max_hueco: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Periodos continuos de cada planta en cada estado. Un periodo abarca los
+        días con reporte consecutivos en los que la planta tuvo la bandera del
+        estado; los días sin reporte no lo interrumpen, salvo que entre dos
+        reportes pasen más de max_hueco días.
+
+        Args:
+            estados: Estados a considerar (claves de CODIGOS)
+            max_hueco: Días naturales máximos entre dos reportes de un mismo
+                periodo (sin límite si es None)
+
+        Returns:
+            pd.DataFrame: Columnas planta, estado, inicio y fin (días con
+            reporte, inclusive), dias (días con reporte en el periodo) y
+            duracion (días naturales de inicio a fin)
+        """
+        # Una columna operativa entre dos reportes demasiado separados cierra
+        # los periodos; columnas[k] es la columna original de la posición k
+        columnas = np.arange(len(self.fechas))
+        if max_hueco is not None and len(self.fechas) > 1:
+            cortes = np.flatnonzero(np.diff(self.fechas).astype(np.int64) > max_hueco) + 1
+            columnas = np.insert(columnas, cortes, -1)
+        partes = []
+        for estado in estados:
+            activo = (self.estados & CODIGOS[estado]).astype(bool).astype(np.int8)
+            if len(columnas) > len(self.fechas):
+                activo = np.where(columnas >= 0, activo[:, columnas], 0).astype(np.int8)
+            # Los cambios de 0 a 1 abren un periodo y los de 1 a 0 lo cierran;
+            # np.nonzero recorre por filas, así que aperturas y cierres quedan emparejados
+            bordes = np.diff(np.pad(activo, ((0, 0), (1, 1))), axis=1)
+            filas, inicios = np.nonzero(bordes == 1)
+            _, fines = np.nonzero(bordes == -1)
+            partes.append(pd.DataFrame({
+                "planta": np.asarray(self.plantas, dtype=object)[filas],
+                "estado": estado,
+                "inicio": self.fechas[columnas[inicios]],
+                "fin": self.fechas[columnas[fines - 1]],
+                "dias": fines - inicios,
+            }))
+        if not partes:
+            return pd.DataFrame(columns=COLUMNAS_INTERVALOS)
+        intervalos = pd.concat(partes, ignore_index=True)
+        intervalos["inicio"] = intervalos["inicio"].astype("datetime64[ns]")
+        intervalos["fin"] = intervalos["fin"].astype("datetime64[ns]")
+        intervalos["duracion"] = (intervalos["fin"] - intervalos["inicio"]).dt.days + 1
+        return intervalos[COLUMNAS_INTERVALOS]
+
+    def rachas(
+        self,
+        intervalos: Optional[pd.DataFrame] = None,
+        estados: Iterable[str] = ("Avería", "Mantenimiento"),
+    ) -> pd.DataFrame:
+        """
+        Resumen de los periodos de cada planta por estado.
+
+        Args:
+            intervalos: Resultado de intervalos() (se calcula si es None)
+            estados: Estados a incluir en el resumen
+
+        Returns:
+            pd.DataFrame: Por planta (índice) y estado (segundo nivel de las
+            columnas), el número de periodos, la duración del más largo y el
+            total de días con reporte en ese estado
+        """
+        estados = list(estados)
+        if intervalos is None:
+            intervalos = self.intervalos(estados)
+        resumen = intervalos.groupby(["planta", "estado"]).agg(
+            periodos=("dias", "size"),
+            racha_maxima=("duracion", "max"),
+            dias_totales=("dias", "sum"),
+        )
+        columnas = pd.MultiIndex.from_product([resumen.columns, estados], names=[None, "estado"])
+        return (
+            resumen.unstack("estado", fill_value=0)
+            .reindex(index=self.plantas, columns=columnas, fill_value=0)
+            .astype("int64")
+        )
@@ -0,0 +1,223 @@
+"""
+Agregados de cualquier rango de fechas sobre la serie diaria de métricas.
+
+Para cada columna se precalculan:
+
+    - sumas prefijas del número de valores, de la suma y de la suma y la suma
+      de cuadrados de los valores centrados en la media de la serie (para no
+      perder precisión en la varianza), con las que count, sum, mean y std de
+      un rango cuestan O(1);
+    - una tabla dispersa (sparse table) con la posición del máximo y otra con
+      la del mínimo de cada bloque de 2^k días, con las que el máximo y el
+      mínimo de un rango, y la fecha en que se registraron, cuestan O(1).
+
+Localizar las filas del rango es una búsqueda binaria sobre las fechas, así
+que cada consulta cuesta O(log n) en total y no depende del tamaño del rango.
+La mediana es la excepción: no se descompone en prefijos, así que median()
+selecciona sobre los valores del rango y cuesta O(k) para un rango de k días.
+Construir la estructura cuesta O(n log n) y se hace una vez por versión de los
+datos. Los valores NaN no cuentan en ningún agregado.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _limite(fecha, final: bool) -> np.datetime64:
+    if isinstance(fecha, str):
+        periodo = pd.Period(fecha)
+        return np.datetime64(periodo.end_time if final else periodo.start_time, "ns")
+    return np.datetime64(pd.Timestamp(fecha), "ns")
+
+
+def _tabla_dispersa(valores: np.ndarray) -> List[np.ndarray]:
+    """Posición del máximo (la primera, si se repite) de cada bloque de 2^k filas."""
+    niveles = [np.arange(len(valores), dtype=np.int64)]
+    k = 1
+    while (1 << k) <= len(valores):
+        anterior = niveles[-1]
+        mitad = 1 << (k - 1)
+        izquierda = anterior[:-mitad]
+        derecha = anterior[mitad:]
+        niveles.append(np.where(valores[derecha] > valores[izquierda], derecha, izquierda))
+        k += 1
+    return niveles
+
+
+class _Columna:
+    def __init__(self, valores: np.ndarray) -> None:
+        valores = np.asarray(valores, dtype="float64")
+        presentes = ~np.isnan(valores)
+        self.valores = valores
+        self.centro = float(valores[presentes].mean()) if presentes.any() else 0.0
+        centrados = np.where(presentes, valores - self.centro, 0.0)
+        self.count = np.concatenate([[0], np.cumsum(presentes, dtype=np.int64)])
+        self.sum = np.concatenate([[0.0], np.cumsum(np.where(presentes, valores, 0.0))])
+        self.sum_centrados = np.concatenate([[0.0], np.cumsum(centrados)])
+        self.sumsq_centrados = np.concatenate([[0.0], np.cumsum(centrados ** 2)])
+        # Los NaN se comparan como -inf para que nunca sean el máximo ni el mínimo
+        self._claves_maximo = np.where(presentes, valores, -np.inf)
+        self._claves_minimo = np.where(presentes, -valores, -np.inf)
+        self.maximos = _tabla_dispersa(self._claves_maximo)
+        self.minimos = _tabla_dispersa(self._claves_minimo)
+
+    def _posicion(self, niveles: List[np.ndarray], claves: np.ndarray, i: int, j: int) -> int:
+        k = (j - i).bit_length() - 1
+        a = niveles[k][i]
+        b = niveles[k][j - (1 << k)]
+        return int(b if claves[b] > claves[a] else a)
+
+    def posicion_maximo(self, i: int, j: int) -> Optional[int]:
+        if self.count[j] - self.count[i] == 0:
+            return None
+        return self._posicion(self.maximos, self._claves_maximo, i, j)
+
+    def posicion_minimo(self, i: int, j: int) -> Optional[int]:
+        if self.count[j] - self.count[i] == 0:
+            return None
+        return self._posicion(self.minimos, self._claves_minimo, i, j)
+
+
+class RangeAggregates:
+    """
+    Sumas prefijas y tablas dispersas de las métricas diarias para consultar
+    count, sum, mean, std, min y max de cualquier rango de fechas.
+    """
+
+    def __init__(self, fechas: Iterable, columnas: Dict[str, np.ndarray]) -> None:
+        """
+        Args:
+            fechas: Fechas de las filas, en orden ascendente
+            columnas: Valores de cada métrica, alineados con las fechas
+        """
+        self.fechas = pd.DatetimeIndex(fechas).to_numpy().astype("datetime64[ns]")
+        if len(self.fechas) > 1 and (np.diff(self.fechas) < np.timedelta64(0, "ns")).any():
+            raise ValueError("Las fechas deben estar ordenadas")
+        self._columnas = {nombre: _Columna(valores) for nombre, valores in columnas.items()}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columnas: Optional[List[str]] = None) -> "RangeAggregates":
+        """
+        Construye los agregados a partir de un DataFrame indexado por fecha.
+
+        Args:
+            df: Métricas indexadas por fecha
+            columnas: Columnas numéricas a indexar (todas las numéricas si es None)
+
+        Returns:
+            RangeAggregates: Agregados de las columnas
+        """
+        df = df.sort_index()
+        columnas = columnas or list(df.select_dtypes("number").columns)
+        return cls(
+            df.index,
+            {columna: df[columna].to_numpy(dtype="float64", na_value=np.nan) for columna in columnas},
+        )
+
+    def __len__(self) -> int:
+        return len(self.fechas)
+
+    @property
+    def columnas(self) -> List[str]:
+        return list(self._columnas)
+
+    def posiciones(self, desde=None, hasta=None) -> Tuple[int, int]:
+        """
+        Filas de un rango de fechas por búsqueda binaria.
+
+        Args:
+            desde: Fecha mínima (inclusive); YYYY[-MM[-DD]] abarca el periodo completo
+            hasta: Fecha máxima (inclusive); YYYY[-MM[-DD]] abarca el periodo completo
+
+        Returns:
+            Tuple[int, int]: Primera fila y siguiente a la última
+        """
+        i = 0 if desde is None else int(np.searchsorted(self.fechas, _limite(desde, False)))
+        j = (
+            len(self.fechas)
+            if hasta is None
+            else int(np.searchsorted(self.fechas, _limite(hasta, True), side="right"))
+        )
+        return i, max(i, j)
+
+    def count(self, columna: str, desde=None, hasta=None) -> int:
+        """Número de valores de la columna en el rango."""
+        i, j = self.posiciones(desde, hasta)
+        c = self._columnas[columna]
+        return int(c.count[j] - c.count[i])
+
+    def sum(self, columna: str, desde=None, hasta=None) -> float:
+        """Suma de los valores de la columna en el rango (0 si no hay ninguno)."""
+        i, j = self.posiciones(desde, hasta)
+        c = self._columnas[columna]
+        return float(c.sum[j] - c.sum[i])
+
+    def mean(self, columna: str, desde=None, hasta=None) -> float:
+        """Media de los valores de la columna en el rango (NaN si no hay ninguno)."""
+        i, j = self.posiciones(desde, hasta)
+        c = self._columnas[columna]
+        n = c.count[j] - c.count[i]
+        return float((c.sum[j] - c.sum[i]) / n) if n else np.nan
+
+    def std(self, columna: str, desde=None, hasta=None) -> float:
+        """Desviación estándar muestral (ddof=1) de la columna en el rango."""
+        i, j = self.posiciones(desde, hasta)
+        c = self._columnas[columna]
+        n = c.count[j] - c.count[i]
+        if n < 2:
+            return np.nan
+        suma = c.sum_centrados[j] - c.sum_centrados[i]
+        cuadrados = c.sumsq_centrados[j] - c.sumsq_centrados[i]
+        return float(np.sqrt(max(cuadrados - suma * suma / n, 0.0) / (n - 1)))
+
+    def max(self, columna: str, desde=None, hasta=None) -> float:
+        """Máximo de la columna en el rango (NaN si no hay valores)."""
+        fila = self._columnas[columna].posicion_maximo(*self.posiciones(desde, hasta))
+        return np.nan if fila is None else float(self._columnas[columna].valores[fila])
+
+    def min(self, columna: str, desde=None, hasta=None) -> float:
+        """Mínimo de la columna en el rango (NaN si no hay valores)."""
+        fila = self._columnas[columna].posicion_minimo(*self.posiciones(desde, hasta))
+        return np.nan if fila is None else float(self._columnas[columna].valores[fila])
+
+    def median(self, columna: str, desde=None, hasta=None) -> float:
+        """Mediana de la columna en el rango (NaN si no hay valores); cuesta O(k)."""
+        i, j = self.posiciones(desde, hasta)
+        c = self._columnas[columna]
+        if c.count[j] - c.count[i] == 0:
+            return np.nan
+        return float(np.nanmedian(c.valores[i:j]))
+
+    def idxmax(self, columna: str, desde=None, hasta=None) -> Optional[pd.Timestamp]:
+        """Primera fecha del rango con el máximo de la columna (None si no hay valores)."""
+        fila = self._columnas[columna].posicion_maximo(*self.posiciones(desde, hasta))
+        return None if fila is None else pd.Timestamp(self.fechas[fila])
+
+    def idxmin(self, columna: str, desde=None, hasta=None) -> Optional[pd.Timestamp]:
+        """Primera fecha del rango con el mínimo de la columna (None si no hay valores)."""
+        fila = self._columnas[columna].posicion_minimo(*self.posiciones(desde, hasta))
+        return None if fila is None else pd.Timestamp(self.fechas[fila])
+
+    def resumen(self, columna: str, desde=None, hasta=None) -> Dict:
+        """
+        Todos los agregados de una columna en un rango.
+
+        Args:
+            columna: Columna indexada
+            desde: Fecha mínima (inclusive)
+            hasta: Fecha máxima (inclusive)
+
+        Returns:
+            Dict: count, sum, mean, std, min, max, fecha_min y fecha_max
+        """
+        return {
+            "count": self.count(columna, desde, hasta),
+            "sum": self.sum(columna, desde, hasta),
+            "mean": self.mean(columna, desde, hasta),
+            "std": self.std(columna, desde, hasta),
+            "min": self.min(columna, desde, hasta),
+            "max": self.max(columna, desde, hasta),
+            "fecha_min": self.idxmin(columna, desde, hasta),
+            "fecha_max": self.idxmax(columna, desde, hasta),
+        }
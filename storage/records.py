@@ -0,0 +1,167 @@
+"""
+Structs tipados de los registros y decodificación rápida del almacén.
+
+Los structs se generan a partir de `template.json`: cada objeto de la
+plantilla es un struct de msgspec, cada lista una lista de su primer elemento
+y cada campo numérico (null en la plantilla) admite número, texto, booleano,
+lista o null, porque el LLM no siempre respeta el tipo de esos campos. msgspec es opcional:
+si no está instalado, la decodificación devuelve diccionarios usando orjson o,
+en su defecto, el módulo json estándar.
+"""
+import os
+import json
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - dependencia opcional
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "template.json")
+
+# Tipo de los campos que en la plantilla son null (valores numéricos)
+Numero = Union[bool, int, float, str, List[Any], None]
+
+
+def loads(raw: bytes) -> Any:
+    """
+    Decodifica JSON sin tipo con la librería más rápida disponible.
+
+    Args:
+        raw: Contenido JSON
+
+    Returns:
+        Any: Objetos de Python (dict, list, ...)
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    if msgspec is not None:
+        return msgspec.json.decode(raw)
+    return json.loads(raw)
+
+
+def _nombre_struct(ruta: List[str]) -> str:
+    return "".join(parte.title().replace("_", "") for parte in ruta) or "Datos"
+
+
+def _tipo_campo(valor: Any, ruta: List[str]) -> Any:
+    """Traduce un valor de la plantilla al tipo del campo correspondiente."""
+    if isinstance(valor, dict):
+        return Optional[_struct_de(valor, ruta)]
+    if isinstance(valor, list):
+        if valor:
+            return Optional[List[_tipo_campo(valor[0], ruta)]]
+        return Optional[List[Any]]
+    if isinstance(valor, str):
+        return Optional[str]
+    return Numero
+
+
+def _struct_de(plantilla: Dict, ruta: List[str]) -> type:
+    """Genera un struct de msgspec con un campo opcional por clave de la plantilla."""
+    campos = [
+        (clave, _tipo_campo(valor, ruta + [clave]), None)
+        for clave, valor in plantilla.items()
+    ]
+    return msgspec.defstruct(_nombre_struct(ruta), campos, kw_only=True)
+
+
+@lru_cache(maxsize=None)
+def record_types(template_path: str = TEMPLATE_PATH) -> Dict[str, type]:
+    """
+    Genera los structs de los registros a partir de la plantilla.
+
+    Args:
+        template_path: Ruta a template.json
+
+    Returns:
+        Dict[str, type]: "Datos" y "Registro" (registro completo), y
+        "Prediccion", "DatosPrediccion" y "RegistroPrediccion" (sólo la
+        sección prediccion)
+    """
+    if msgspec is None:
+        raise ImportError("msgspec es necesario para decodificar registros tipados")
+
+    with open(template_path, "r", encoding="utf-8") as f:
+        template = json.load(f)
+    # La plantilla es {año: {mes: [registro]}}; se toma el primer registro de ejemplo
+    ejemplo = next(
+        registros[0]
+        for meses in template.values()
+        for registros in meses.values()
+        if registros
+    )
+
+    datos = _struct_de(ejemplo["datos"], [])
+    prediccion = _struct_de(ejemplo["datos"]["prediccion"], ["prediccion"])
+    datos_prediccion = msgspec.defstruct(
+        "DatosPrediccion", [("prediccion", Optional[prediccion], None)], kw_only=True
+    )
+
+    def _registro(nombre: str, tipo_datos: type) -> type:
+        return msgspec.defstruct(
+            nombre,
+            [
+                ("enlace", str, ""),
+                ("fecha", datetime),
+                ("datos", tipo_datos),
+                ("template_hashes", Optional[Dict[str, str]], None),
+                ("content_hash", Optional[str], None),
+                ("extraction_version", int, 0),
+                ("schema_version", int, 0),
+                ("validation_errors", Optional[List[str]], None),
+            ],
+            kw_only=True,
+        )
+
+    return {
+        "Datos": datos,
+        "Registro": _registro("Registro", datos),
+        "Prediccion": prediccion,
+        "DatosPrediccion": datos_prediccion,
+        "RegistroPrediccion": _registro("RegistroPrediccion", datos_prediccion),
+    }
+
+
+@lru_cache(maxsize=None)
+def decoder(solo_prediccion: bool = False):
+    """
+    Decoder de msgspec para una lista de registros (una partición o un delta).
+
+    Args:
+        solo_prediccion: Decodificar sólo la sección prediccion; el resto de
+            secciones se salta sin construir objetos
+
+    Returns:
+        msgspec.json.Decoder: Decoder reutilizable
+    """
+    tipos = record_types()
+    tipo = tipos["RegistroPrediccion"] if solo_prediccion else tipos["Registro"]
+    return msgspec.json.Decoder(List[tipo])
+
+
+def decode_records(raw: bytes, solo_prediccion: bool = False) -> List[Any]:
+    """
+    Decodifica una lista de registros en structs tipados.
+
+    Args:
+        raw: Contenido JSON de una partición o un delta
+        solo_prediccion: Decodificar sólo la sección prediccion
+
+    Returns:
+        List[Any]: Structs Registro o RegistroPrediccion, con fecha ya convertida a datetime
+    """
+    return decoder(solo_prediccion).decode(raw)
+
+
+def typed_available() -> bool:
+    """Indica si msgspec está instalado y se pueden usar los structs tipados."""
+    return msgspec is not None
@@ -0,0 +1,349 @@
+"""
+Agregados materializados de las métricas diarias.
+
+Para cada métrica se guardan, por semana, por mes, por día de la semana y por
+mes del año, los acumulados count, mean, m2 (suma de los cuadrados de las
+desviaciones respecto de la media), min y max de los días con valor. Son
+combinables: los de un grupo con días nuevos se obtienen de los acumulados
+anteriores y los de esos días con la fórmula de Chan et al. para la media y
+m2 (y tomando el mínimo y el máximo), sin releer la serie. A diferencia de la
+suma de cuadrados, m2 no pierde precisión cuando la varianza es pequeña frente
+a la media. La suma y la desviación estándar (ddof=1, como en pandas) se
+derivan de ellos al leer.
+
+Las claves de los grupos son texto:
+
+    semana        lunes de la semana (YYYY-MM-DD)
+    mes           YYYY-MM
+    dia_semana    0 (lunes) a 6 (domingo)
+    mes_del_año   1 a 12
+
+La tabla se guarda en un archivo Parquet junto a las métricas diarias:
+
+    python -m storage.rollups
+"""
+import os
+import argparse
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from storage.atomic import atomic_write
+from storage.daily_metrics import COLUMNAS
+
+
+NIVELES = ["semana", "mes", "dia_semana", "mes_del_año"]
+
+ACUMULADOS = ["count", "mean", "m2", "min", "max"]
+
+ESTADISTICOS = ["count", "sum", "mean", "min", "max", "std"]
+
+
+def claves(fechas: pd.DatetimeIndex, nivel: str) -> pd.Index:
+    """
+    Clave del grupo de cada fecha en un nivel.
+
+    Args:
+        fechas: Fechas de los días
+        nivel: Uno de NIVELES
+
+    Returns:
+        pd.Index: Claves de texto
+    """
+    fechas = pd.DatetimeIndex(fechas)
+    if nivel == "semana":
+        lunes = fechas.normalize() - pd.to_timedelta(fechas.dayofweek, unit="D")
+        return pd.Index(lunes.strftime("%Y-%m-%d"))
+    if nivel == "mes":
+        return pd.Index(fechas.strftime("%Y-%m"))
+    if nivel == "dia_semana":
+        return pd.Index(fechas.dayofweek.astype(str))
+    if nivel == "mes_del_año":
+        return pd.Index(fechas.month.astype(str))
+    raise ValueError(f"Nivel desconocido: {nivel}")
+
+
+def compute_rollups(daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcula los acumulados de todos los niveles.
+
+    Args:
+        daily: Métricas indexadas por fecha, un día por fila
+            (DailyMetricsFile.read)
+
+    Returns:
+        pd.DataFrame: Índice (nivel, clave) y columnas "<métrica>_<acumulado>"
+    """
+    metricas = [columna for columna in COLUMNAS if columna in daily]
+    valores = daily[metricas].astype("float64")
+    partes = []
+    for nivel in NIVELES:
+        grupos = claves(valores.index, nivel)
+        agrupados = valores.groupby(grupos)
+        # Desviaciones respecto de la media de su grupo (dos pasadas, sin cancelación)
+        desviaciones = valores - agrupados.transform("mean")
+        acumulados = pd.concat(
+            {
+                "count": agrupados.count().astype("float64"),
+                "mean": agrupados.mean(),
+                "m2": (desviaciones ** 2).groupby(grupos).sum(),
+                "min": agrupados.min(),
+                "max": agrupados.max(),
+            },
+            axis=1,
+        )
+        acumulados.columns = [f"{metrica}_{acumulado}" for acumulado, metrica in acumulados.columns]
+        acumulados.index = pd.MultiIndex.from_product(
+            [[nivel], acumulados.index.astype(str)], names=["nivel", "clave"]
+        )
+        partes.append(acumulados)
+    columnas = [f"{metrica}_{acumulado}" for metrica in metricas for acumulado in ACUMULADOS]
+    return pd.concat(partes).reindex(columns=columnas)
+
+
+def combine_rollups(anterior: pd.DataFrame, nuevos: pd.DataFrame) -> pd.DataFrame:
+    """
+    Combina los acumulados de dos conjuntos de días disjuntos.
+
+    Args:
+        anterior: Acumulados de compute_rollups
+        nuevos: Acumulados de otros días
+
+    Returns:
+        pd.DataFrame: Acumulados de la unión
+    """
+    indice = anterior.index.union(nuevos.index)
+    a = anterior.reindex(indice)
+    b = nuevos.reindex(index=indice, columns=anterior.columns)
+    combinados = a.copy()
+    metricas = [columna[: -len("_count")] for columna in anterior.columns if columna.endswith("_count")]
+    for metrica in metricas:
+        n_a = a[f"{metrica}_count"].fillna(0)
+        n_b = b[f"{metrica}_count"].fillna(0)
+        n = n_a + n_b
+        # Media y m2 de la unión (Chan et al.): los grupos vacíos tienen media NaN
+        media_a = a[f"{metrica}_mean"].where(n_a > 0, 0.0)
+        delta = b[f"{metrica}_mean"].where(n_b > 0, 0.0) - media_a
+        with np.errstate(divide="ignore", invalid="ignore"):
+            peso = (n_b / n).where(n > 0, 0.0)
+        combinados[f"{metrica}_count"] = n
+        combinados[f"{metrica}_mean"] = (media_a + delta * peso).where(n > 0)
+        combinados[f"{metrica}_m2"] = (
+            a[f"{metrica}_m2"].fillna(0) + b[f"{metrica}_m2"].fillna(0) + delta ** 2 * n_a * peso
+        )
+        combinados[f"{metrica}_min"] = np.fmin(a[f"{metrica}_min"], b[f"{metrica}_min"])
+        combinados[f"{metrica}_max"] = np.fmax(a[f"{metrica}_max"], b[f"{metrica}_max"])
+    return combinados
+
+
+class RollupTables:
+    """
+    Agregados por semana, mes, día de la semana y mes del año en un archivo Parquet.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        """
+        Args:
+            path: Ruta al archivo Parquet (None para una tabla sólo en memoria)
+        """
+        self.path = path
+        self._tabla = None
+
+    @classmethod
+    def from_daily(cls, daily: pd.DataFrame) -> "RollupTables":
+        """
+        Calcula los agregados de una serie diaria sin guardarlos.
+
+        Args:
+            daily: Métricas indexadas por fecha, un día por fila
+
+        Returns:
+            RollupTables: Tabla en memoria
+        """
+        tabla = cls()
+        tabla._tabla = compute_rollups(daily)
+        return tabla
+
+    def exists(self) -> bool:
+        """Indica si la tabla ya fue creada."""
+        return self.path is not None and os.path.exists(self.path)
+
+    def vigente(self) -> bool:
+        """Indica si la tabla existe y guarda los acumulados de ACUMULADOS."""
+        if self._tabla is None and not self.exists():
+            return False
+        columnas = self._leer().columns
+        return all(
+            f"{columna[: -len('_count')]}_{acumulado}" in columnas
+            for columna in columnas
+            if columna.endswith("_count")
+            for acumulado in ACUMULADOS
+        )
+
+    def _leer(self) -> pd.DataFrame:
+        if self._tabla is None:
+            self._tabla = pd.read_parquet(self.path, engine="pyarrow").set_index(["nivel", "clave"])
+        return self._tabla
+
+    def write(self, acumulados: pd.DataFrame) -> int:
+        """
+        Reemplaza atómicamente la tabla completa.
+
+        Args:
+            acumulados: Resultado de compute_rollups
+
+        Returns:
+            int: Número de grupos escritos
+        """
+        with atomic_write(self.path) as f:
+            acumulados.reset_index().to_parquet(f, engine="pyarrow", index=False)
+        self._tabla = acumulados
+        return len(acumulados)
+
+    def rebuild(self, daily: pd.DataFrame) -> int:
+        """
+        Recalcula todos los agregados a partir de la serie diaria.
+
+        Args:
+            daily: Métricas indexadas por fecha, un día por fila
+
+        Returns:
+            int: Número de grupos escritos
+        """
+        return self.write(compute_rollups(daily))
+
+    def update(self, anterior: Optional[pd.DataFrame], actual: pd.DataFrame) -> int:
+        """
+        Actualiza los agregados tras un cambio en la serie diaria. Los días
+        nuevos se combinan con los acumulados guardados; sólo los grupos con
+        días modificados o eliminados se recalculan desde la serie actual.
+
+        Args:
+            anterior: Serie con la que se calcularon los agregados guardados
+                (None si no se conoce)
+            actual: Serie diaria actual
+
+        Returns:
+            int: Número de grupos actualizados
+        """
+        if anterior is None or not self.exists() or not self.vigente():
+            return self.rebuild(actual)
+
+        metricas = [columna for columna in COLUMNAS if columna in actual]
+        comunes = anterior.index.intersection(actual.index)
+        añadidos = actual.index.difference(anterior.index)
+        eliminados = anterior.index.difference(actual.index)
+        antes = anterior.loc[comunes, metricas]
+        despues = actual.loc[comunes, metricas]
+        iguales = ((antes == despues) | (antes.isna() & despues.isna())).all(axis=1)
+        afectados = comunes[~iguales.to_numpy()].union(eliminados)
+        if añadidos.empty and afectados.empty:
+            return 0
+
+        tabla = self._leer()
+        nuevos = compute_rollups(actual.loc[añadidos]) if not añadidos.empty else tabla.iloc[:0]
+        recalculados = tabla.iloc[:0]
+        if not afectados.empty:
+            # Los grupos con días cambiados o eliminados no se pueden restar: se recalculan
+            recalcular = pd.MultiIndex.from_tuples(
+                [(nivel, clave) for nivel in NIVELES for clave in claves(afectados, nivel).unique()],
+                names=["nivel", "clave"],
+            )
+            dias = np.zeros(len(actual), dtype=bool)
+            for nivel in NIVELES:
+                seleccion = recalcular[recalcular.get_level_values("nivel") == nivel]
+                dias |= claves(actual.index, nivel).isin(seleccion.get_level_values("clave"))
+            tabla = tabla.drop(recalcular, errors="ignore")
+            recalculados = compute_rollups(actual[dias]).reindex(columns=tabla.columns)
+            recalculados = recalculados[recalculados.index.isin(recalcular)]
+            nuevos = nuevos[~nuevos.index.isin(recalcular)]
+            tabla = pd.concat([tabla, recalculados])
+        self.write(combine_rollups(tabla, nuevos).sort_index())
+        return len(nuevos) + len(recalculados)
+
+    def niveles(self) -> List[str]:
+        """Niveles disponibles en la tabla."""
+        return list(self._leer().index.unique("nivel"))
+
+    def read(
+        self, nivel: str, estadistico: str = "mean", metricas: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Un estadístico de varias métricas en un nivel.
+
+        Args:
+            nivel: Uno de NIVELES
+            estadistico: Uno de ESTADISTICOS
+            metricas: Métricas a leer (todas si es None)
+
+        Returns:
+            pd.DataFrame: Una columna por métrica. El índice es la fecha de
+            inicio del grupo para semana y mes, y el número del día (0-6) o
+            del mes (1-12) para los niveles cíclicos
+        """
+        metricas = list(metricas or [c for c in COLUMNAS if f"{c}_count" in self._leer()])
+        return pd.DataFrame({metrica: self.stats(nivel, metrica)[estadistico] for metrica in metricas})
+
+    def stats(self, nivel: str, metrica: str) -> pd.DataFrame:
+        """
+        Todos los estadísticos de una métrica en un nivel.
+
+        Args:
+            nivel: Uno de NIVELES
+            metrica: Columna de la serie diaria
+
+        Returns:
+            pd.DataFrame: Columnas de ESTADISTICOS, con el índice de read().
+            Los grupos sin ningún valor de la métrica tienen count y sum 0 y
+            el resto de estadísticos NaN
+        """
+        tabla = self._leer()
+        if nivel not in tabla.index.unique("nivel"):
+            grupos = tabla.iloc[:0]
+        else:
+            grupos = tabla.xs(nivel, level="nivel")
+        n = grupos[f"{metrica}_count"].to_numpy(dtype="float64")
+        media = np.where(n > 0, grupos[f"{metrica}_mean"].to_numpy(dtype="float64"), np.nan)
+        suma = np.where(n > 0, media * n, 0.0)
+        m2 = grupos[f"{metrica}_m2"].to_numpy(dtype="float64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            varianza = np.where(n > 1, m2 / (n - 1), np.nan)
+        if nivel in ("semana", "mes"):
+            indice = pd.DatetimeIndex(pd.to_datetime(grupos.index).astype("datetime64[ns]"), name="fecha")
+        else:
+            indice = pd.Index(grupos.index.astype(int), name=nivel)
+        resultado = pd.DataFrame(
+            {
+                "count": n.astype("int64"),
+                "sum": suma,
+                "mean": media,
+                "min": grupos[f"{metrica}_min"].to_numpy(dtype="float64"),
+                "max": grupos[f"{metrica}_max"].to_numpy(dtype="float64"),
+                "std": np.sqrt(varianza),
+            },
+            index=indice,
+        )
+        return resultado.sort_index()
+
+
+if __name__ == "__main__":
+    from storage.daily_metrics import DailyMetricsFile
+
+    parser = argparse.ArgumentParser(
+        description="Rebuild the weekly, monthly, weekday and month-of-year rollups from the daily metrics file."
+    )
+    parser.add_argument(
+        "--daily",
+        default=os.path.join("data", "processed", "metricas_diarias.npy"),
+        help="Memory-mapped daily metrics file",
+    )
+    parser.add_argument(
+        "--output",
+        default=os.path.join("data", "processed", "rollups.parquet"),
+        help="Rollup table to write",
+    )
+    args = parser.parse_args()
+
+    total = RollupTables(args.output).rebuild(DailyMetricsFile(args.daily).read())
+    print(f"Escritos {total} grupos en {args.output}")
@@ -0,0 +1,339 @@
+"""
+Versiones (snapshots) del almacén particionado con copia en escritura.
+
+Cada snapshot es un manifiesto (`<root>/snapshots/<id>.json`) que apunta a los
+archivos de partición y de delta que tenía el almacén en ese momento. Los
+archivos se guardan una sola vez, direccionados por su hash, en
+`<root>/snapshots/objects/`; como el almacén nunca modifica un archivo sino que
+lo reemplaza por otro, los objetos se crean como enlaces duros (sin copiar
+datos) y los snapshots sucesivos comparten las particiones que no cambiaron.
+Un snapshot diario sólo añade el delta del día y las particiones compactadas.
+
+La visualización puede fijar un snapshot (ver SnapshotView) mientras el
+pipeline escribe la siguiente versión.
+"""
+import os
+import json
+import shutil
+import hashlib
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from storage.partitioned import PartitionedStore, _write_json_atomic
+from storage.records import loads
+
+SNAPSHOTS = "snapshots"
+OBJECTS = "objects"
+
+
+def _hash_archivo(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+class SnapshotView(PartitionedStore):
+    """
+    Vista de sólo lectura de un snapshot con la misma API de lectura que
+    PartitionedStore (iter_records, iter_typed, load...).
+    """
+
+    def __init__(self, root: str, snapshot: Dict) -> None:
+        """
+        Args:
+            root: Directorio raíz del almacén
+            snapshot: Manifiesto del snapshot (SnapshotStore.get)
+        """
+        super().__init__(root)
+        self.snapshot = snapshot
+        self._objetos = os.path.join(root, SNAPSHOTS, OBJECTS)
+
+    def _objeto(self, nombre: str) -> str:
+        return os.path.join(self._objetos, nombre[:2], f"{nombre}.json")
+
+    def exists(self) -> bool:
+        return True
+
+    def load_manifest(self) -> Dict:
+        return {"particiones": self.snapshot["particiones"]}
+
+    def _partition_path(self, año: str, mes: str) -> str:
+        for info in self.snapshot["particiones"].values():
+            if info["año"] == año and info["mes"] == mes:
+                return self._objeto(info["objeto"])
+        return os.path.join(self._objetos, "inexistente")
+
+    def delta_files(self) -> List[str]:
+        return [self._objeto(nombre) for nombre in self.snapshot["deltas"]]
+
+    def version(self) -> str:
+        # Un snapshot no cambia nunca
+        return self.snapshot["id"]
+
+    def write_partitions(self, particiones: Dict[Tuple[str, str], List[Dict]]) -> None:
+        raise PermissionError(f"El snapshot {self.snapshot['id']} es de sólo lectura")
+
+    def upsert(self, *args: Any, **kwargs: Any) -> List[Dict]:
+        raise PermissionError(f"El snapshot {self.snapshot['id']} es de sólo lectura")
+
+    def migrate(self) -> List[Dict]:
+        raise PermissionError(f"El snapshot {self.snapshot['id']} es de sólo lectura")
+
+
+class SnapshotStore:
+    """
+    Crea, lista, restaura y elimina snapshots de un almacén particionado.
+    """
+
+    def __init__(self, store: PartitionedStore) -> None:
+        """
+        Args:
+            store: Almacén del que se toman los snapshots
+        """
+        self.store = store
+        self.dir = os.path.join(store.root, SNAPSHOTS)
+        self.objects_dir = os.path.join(self.dir, OBJECTS)
+
+    def _objeto(self, nombre: str) -> str:
+        return os.path.join(self.objects_dir, nombre[:2], f"{nombre}.json")
+
+    def _manifest_path(self, snapshot_id: str) -> str:
+        return os.path.join(self.dir, f"{snapshot_id}.json")
+
+    def _guardar_objeto(self, path: str) -> Tuple[str, int]:
+        """Guarda un archivo del almacén como objeto; devuelve su nombre y los bytes nuevos."""
+        nombre = _hash_archivo(path)
+        destino = self._objeto(nombre)
+        if os.path.exists(destino):
+            return nombre, 0
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        tmp_path = f"{destino}.{os.getpid()}.tmp"
+        try:
+            os.link(path, tmp_path)
+        except OSError:
+            # Sistemas de archivos sin enlaces duros
+            shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, destino)
+        return nombre, os.path.getsize(destino)
+
+    def create(self, etiqueta: Optional[str] = None) -> Dict:
+        """
+        Crea un snapshot con las particiones y deltas actuales del almacén. Si
+        nada cambió desde el último snapshot, se devuelve ese mismo.
+
+        Args:
+            etiqueta: Descripción opcional (p. ej. la fecha del pipeline)
+
+        Returns:
+            Dict: Manifiesto del snapshot, con "bytes_nuevos" (tamaño de los
+            objetos que no compartía con snapshots anteriores)
+        """
+        ahora = datetime.now()
+        snapshot_id = ahora.strftime("%Y%m%dT%H%M%S%f")
+        particiones = {}
+        nuevos = 0
+        for clave, info in self.store.load_manifest()["particiones"].items():
+            nombre, tamaño = self._guardar_objeto(self.store._partition_path(info["año"], info["mes"]))
+            particiones[clave] = {"año": info["año"], "mes": info["mes"], "objeto": nombre}
+            nuevos += tamaño
+        deltas = []
+        for path in self.store.delta_files():
+            nombre, tamaño = self._guardar_objeto(path)
+            deltas.append(nombre)
+            nuevos += tamaño
+
+        anteriores = self.list()
+        if anteriores and (anteriores[-1]["particiones"], anteriores[-1]["deltas"]) == (particiones, deltas):
+            # El almacén no cambió desde el último snapshot
+            return {**anteriores[-1], "bytes_nuevos": 0}
+
+        snapshot = {
+            "id": snapshot_id,
+            "creado": ahora.isoformat(timespec="seconds"),
+            "etiqueta": etiqueta,
+            "particiones": particiones,
+            "deltas": deltas,
+            "bytes_nuevos": nuevos,
+        }
+        _write_json_atomic(self._manifest_path(snapshot_id), snapshot)
+        return snapshot
+
+    def list(self) -> List[Dict]:
+        """
+        Lista los snapshots del más antiguo al más reciente.
+
+        Returns:
+            List[Dict]: Manifiestos de los snapshots
+        """
+        if not os.path.isdir(self.dir):
+            return []
+        return [
+            self.get(nombre[: -len(".json")])
+            for nombre in sorted(os.listdir(self.dir))
+            if nombre.endswith(".json")
+        ]
+
+    def get(self, snapshot_id: str) -> Dict:
+        """
+        Carga el manifiesto de un snapshot.
+
+        Args:
+            snapshot_id: Id del snapshot, o "latest" para el más reciente
+
+        Returns:
+            Dict: Manifiesto del snapshot
+
+        Raises:
+            FileNotFoundError: Si el snapshot no existe
+        """
+        if snapshot_id == "latest":
+            snapshots = self.list()
+            if not snapshots:
+                raise FileNotFoundError(f"No hay snapshots en {self.dir}")
+            return snapshots[-1]
+        with open(self._manifest_path(snapshot_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def view(self, snapshot_id: str) -> SnapshotView:
+        """
+        Abre un snapshot en modo sólo lectura; sigue siendo válido aunque el
+        almacén se modifique o se creen snapshots nuevos.
+
+        Args:
+            snapshot_id: Id del snapshot, o "latest"
+
+        Returns:
+            SnapshotView: Vista del snapshot
+        """
+        return SnapshotView(self.store.root, self.get(snapshot_id))
+
+    def restore(self, snapshot_id: str) -> Dict:
+        """
+        Devuelve el almacén al estado de un snapshot. Cada archivo se reemplaza
+        de forma atómica con un enlace al objeto, sin copiar datos.
+
+        Args:
+            snapshot_id: Id del snapshot, o "latest"
+
+        Returns:
+            Dict: Manifiesto del snapshot restaurado
+        """
+        snapshot = self.get(snapshot_id)
+        store = self.store
+        manifest = store.load_manifest()
+        for clave, info in snapshot["particiones"].items():
+            self._enlazar(info["objeto"], store._partition_path(info["año"], info["mes"]))
+        for clave, info in list(manifest["particiones"].items()):
+            if clave not in snapshot["particiones"]:
+                path = store._partition_path(info["año"], info["mes"])
+                if os.path.exists(path):
+                    os.remove(path)
+
+        for path in store.delta_files():
+            os.remove(path)
+        for i, nombre in enumerate(snapshot["deltas"]):
+            self._enlazar(nombre, os.path.join(store.deltas_dir, f"{snapshot['id']}-{i:04d}.json"))
+
+        ahora = datetime.now().isoformat(timespec="seconds")
+        manifest["particiones"] = {
+            clave: {
+                "año": info["año"],
+                "mes": info["mes"],
+                "archivo": os.path.relpath(store._partition_path(info["año"], info["mes"]), store.root),
+                "registros": self._registros(info["objeto"]),
+                "bytes": os.path.getsize(self._objeto(info["objeto"])),
+                "actualizado": ahora,
+            }
+            for clave, info in snapshot["particiones"].items()
+        }
+        _write_json_atomic(store.manifest_path, manifest)
+        # El índice de enlaces se reconstruye en el próximo upsert
+        if os.path.exists(store.index_path):
+            os.remove(store.index_path)
+        return snapshot
+
+    def _registros(self, nombre: str) -> int:
+        with open(self._objeto(nombre), "rb") as f:
+            return len(loads(f.read()))
+
+    def _enlazar(self, nombre: str, destino: str) -> None:
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        tmp_path = f"{destino}.{os.getpid()}.tmp"
+        try:
+            os.link(self._objeto(nombre), tmp_path)
+        except OSError:
+            shutil.copyfile(self._objeto(nombre), tmp_path)
+        os.replace(tmp_path, destino)
+
+    def delete(self, snapshot_id: str) -> int:
+        """
+        Elimina un snapshot y los objetos que ningún otro snapshot usa.
+
+        Args:
+            snapshot_id: Id del snapshot
+
+        Returns:
+            int: Bytes liberados
+        """
+        os.remove(self._manifest_path(snapshot_id))
+        en_uso = set()
+        for snapshot in self.list():
+            en_uso.update(info["objeto"] for info in snapshot["particiones"].values())
+            en_uso.update(snapshot["deltas"])
+
+        liberados = 0
+        if not os.path.isdir(self.objects_dir):
+            return 0
+        for subdirectorio in os.listdir(self.objects_dir):
+            for archivo in os.listdir(os.path.join(self.objects_dir, subdirectorio)):
+                if archivo[: -len(".json")] not in en_uso:
+                    path = os.path.join(self.objects_dir, subdirectorio, archivo)
+                    liberados += os.path.getsize(path)
+                    os.remove(path)
+        return liberados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create, list, restore or delete store snapshots.")
+    parser.add_argument(
+        "--store",
+        default=os.path.join("data", "processed", "store"),
+        help="Partitioned store directory",
+    )
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--list", action="store_true", help="List snapshots")
+    grupo.add_argument("--create", action="store_true", help="Create a snapshot of the current store")
+    grupo.add_argument("--restore", metavar="ID", help="Restore a snapshot ('latest' for the newest)")
+    grupo.add_argument("--delete", metavar="ID", help="Delete a snapshot and its unused objects")
+    parser.add_argument("--label", help="Label for --create")
+    args = parser.parse_args()
+
+    snapshots = SnapshotStore(PartitionedStore(args.store))
+    if args.list:
+        for s in snapshots.list():
+            print(f"{s['id']}  {s['creado']}  {s.get('etiqueta') or '':<12} {s['bytes_nuevos']:>10} bytes nuevos")
+    elif args.create:
+        s = snapshots.create(args.label)
+        print(f"Creado el snapshot {s['id']} ({s['bytes_nuevos']} bytes nuevos)")
+    elif args.restore:
+        s = snapshots.restore(args.restore)
+        print(f"Restaurado el snapshot {s['id']}")
+        # La base de datos y las métricas derivadas ya no corresponden al almacén;
+        # el pipeline las vuelve a crear a partir de él
+        procesados = os.path.dirname(os.path.abspath(args.store))
+        for nombre in (
+            "datos_electricos.db",
+            "metricas.parquet",
+            "metricas_diarias.npy",
+            "intervalos_plantas.npz",
+            "rollups.parquet",
+        ):
+            path = os.path.join(procesados, nombre)
+            if os.path.exists(path):
+                os.remove(path)
+                print(f"Eliminado {path}")
+    else:
+        print(f"Liberados {snapshots.delete(args.delete)} bytes")
@@ -0,0 +1,539 @@
+"""
+Base de datos SQLite con los datos eléctricos procesados normalizados.
+
+Cada registro del almacén se descompone en tablas (reportes, prediccion,
+plantas, patanas, zonas y solar) indexadas por día, enlace y nombre canónico
+de planta, de modo que la visualización y los análisis puedan hacer consultas
+por rango de fechas sin recorrer el JSON anidado.
+
+Los datos se guardan en la versión actual del esquema (storage.migrations); la
+versión de la base de datos se guarda en PRAGMA user_version. El proceso que
+escribe (el pipeline) llama a initialize(), que crea el esquema y migra los
+reportes de una versión anterior; las consultas sólo abren una conexión.
+"""
+import os
+import json
+import sqlite3
+import argparse
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from storage.migrations import SCHEMA_VERSION, migrate_datos
+from storage.plant_names import get_canonical_plant_name
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS reportes (
+    id INTEGER PRIMARY KEY,
+    enlace TEXT NOT NULL UNIQUE,
+    fecha TEXT NOT NULL,
+    dia TEXT NOT NULL,
+    fecha_reporte TEXT,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reportes_dia ON reportes (dia);
+
+CREATE TABLE IF NOT EXISTS prediccion (
+    reporte_id INTEGER PRIMARY KEY REFERENCES reportes (id) ON DELETE CASCADE,
+    dia TEXT NOT NULL,
+    disponibilidad REAL,
+    demanda_maxima REAL,
+    afectacion REAL,
+    deficit REAL,
+    respaldo,  -- sin tipo: puede ser un número o un texto descriptivo
+    horario_pico TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_prediccion_dia ON prediccion (dia);
+
+CREATE TABLE IF NOT EXISTS plantas (
+    reporte_id INTEGER NOT NULL REFERENCES reportes (id) ON DELETE CASCADE,
+    dia TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    planta TEXT NOT NULL,
+    planta_canonica TEXT,
+    unidad INTEGER,
+    unidades TEXT,
+    tipo TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_plantas_reporte ON plantas (reporte_id);
+CREATE INDEX IF NOT EXISTS idx_plantas_dia ON plantas (dia);
+CREATE INDEX IF NOT EXISTS idx_plantas_canonica ON plantas (planta_canonica, dia);
+
+CREATE TABLE IF NOT EXISTS patanas (
+    reporte_id INTEGER NOT NULL REFERENCES reportes (id) ON DELETE CASCADE,
+    dia TEXT NOT NULL,
+    patana_nombre TEXT,
+    motores_afectados REAL,
+    mw_afectados REAL,
+    recuperacion_motores REAL,
+    recuperacion_mw REAL
+);
+CREATE INDEX IF NOT EXISTS idx_patanas_reporte ON patanas (reporte_id);
+CREATE INDEX IF NOT EXISTS idx_patanas_dia ON patanas (dia);
+
+CREATE TABLE IF NOT EXISTS zonas (
+    reporte_id INTEGER NOT NULL REFERENCES reportes (id) ON DELETE CASCADE,
+    dia TEXT NOT NULL,
+    zona TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_zonas_reporte ON zonas (reporte_id);
+CREATE INDEX IF NOT EXISTS idx_zonas_dia ON zonas (dia);
+
+CREATE TABLE IF NOT EXISTS solar (
+    reporte_id INTEGER PRIMARY KEY REFERENCES reportes (id) ON DELETE CASCADE,
+    dia TEXT NOT NULL,
+    cantidad_parques REAL,
+    produccion_mwh REAL,
+    nuevos_parques,  -- sin tipo: puede ser un número o un texto descriptivo
+    capacidad_instalada REAL,
+    periodo_produccion TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_solar_dia ON solar (dia);
+
+-- Un único reporte por día: el primero que se almacenó (igual que cargar_datos)
+CREATE VIEW IF NOT EXISTS reportes_diarios AS
+SELECT r.* FROM reportes r
+WHERE r.id = (SELECT MIN(id) FROM reportes WHERE dia = r.dia);
+"""
+
+TABLAS_DETALLE = ("prediccion", "plantas", "patanas", "zonas", "solar")
+
+ESTADOS_PLANTA = {"averia": "Avería", "mantenimiento": "Mantenimiento"}
+
+
+def _numero(valor) -> Optional[float]:
+    """Convierte un valor del JSON a número, o None si no es numérico."""
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        return valor
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _escalar(valor):
+    """Conserva números y textos no vacíos; descarta el resto."""
+    if isinstance(valor, str):
+        return valor or None
+    return _numero(valor)
+
+
+def _dict(valor) -> Dict:
+    return valor if isinstance(valor, dict) else {}
+
+
+def _lista(valor) -> List:
+    return valor if isinstance(valor, list) else []
+
+
+def _limites(desde: Optional[str], hasta: Optional[str]) -> Tuple[str, str]:
+    """
+    Convierte un rango de fechas parciales (YYYY, YYYY-MM o YYYY-MM-DD) en
+    límites de día inclusivos comparables con la columna "dia".
+    """
+    inicio = desde or "0000-00-00"
+    fin = hasta or "9999-99-99"
+    if hasta and len(hasta) < 10:
+        fin = hasta + "-99-99"[len(hasta) - 4:]
+    return inicio, fin
+
+
+class SQLiteStore:
+    """
+    Base de datos SQLite normalizada con una API de consultas por rango de fechas.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path: Ruta al archivo de la base de datos
+        """
+        self.path = path
+        self._inicializada = False
+
+    def exists(self) -> bool:
+        """Indica si la base de datos ya fue creada."""
+        return os.path.exists(self.path)
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Abre una conexión con las claves foráneas activadas. El llamador debe
+        cerrarla.
+
+        Returns:
+            sqlite3.Connection: Conexión a la base de datos
+        """
+        directorio = os.path.dirname(self.path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    @contextmanager
+    def _abrir(self) -> Iterator[sqlite3.Connection]:
+        """Conexión que confirma la transacción si no hay errores y se cierra siempre."""
+        conn = self.connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def initialize(self) -> None:
+        """
+        Crea el esquema y migra los reportes guardados con una versión anterior
+        del esquema. Sólo se ejecuta una vez por instancia.
+        """
+        if self._inicializada:
+            return
+        with self._abrir() as conn:
+            conn.executescript(ESQUEMA)
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                self._migrar(conn, version)
+        self._inicializada = True
+
+    def _migrar(self, conn: sqlite3.Connection, version: int) -> None:
+        """Migra los datos de todos los reportes y regenera sus tablas de detalle."""
+        for reporte_id, dia, datos in conn.execute("SELECT id, dia, datos FROM reportes").fetchall():
+            datos = migrate_datos(json.loads(datos), version)
+            conn.execute(
+                "UPDATE reportes SET datos = ? WHERE id = ?",
+                (json.dumps(datos, ensure_ascii=False, separators=(",", ":")), reporte_id),
+            )
+            for tabla in TABLAS_DETALLE:
+                conn.execute(f"DELETE FROM {tabla} WHERE reporte_id = ?", (reporte_id,))
+            self._insertar_detalle(conn, reporte_id, dia, datos)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _insertar_detalle(self, conn: sqlite3.Connection, reporte_id: int, dia: str, datos: Dict) -> None:
+        pred = _dict(datos.get("prediccion"))
+        conn.execute(
+            "INSERT INTO prediccion VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                reporte_id,
+                dia,
+                _numero(pred.get("disponibilidad")),
+                _numero(pred.get("demanda_maxima")),
+                _numero(pred.get("afectacion")),
+                _numero(pred.get("deficit")),
+                _escalar(pred.get("respaldo")),
+                pred.get("horario_pico") or None,
+            ),
+        )
+
+        plantas = _dict(datos.get("plantas"))
+        filas = []
+        for clave, estado in ESTADOS_PLANTA.items():
+            for p in _lista(plantas.get(clave)):
+                nombre = _dict(p).get("planta")
+                if not nombre:
+                    continue
+                filas.append(
+                    (
+                        reporte_id,
+                        dia,
+                        estado,
+                        nombre,
+                        get_canonical_plant_name(nombre),
+                        _numero(p.get("unidad")),
+                        json.dumps(_lista(p.get("unidades"))),
+                        p.get("tipo") or None,
+                    )
+                )
+        conn.executemany("INSERT INTO plantas VALUES (?, ?, ?, ?, ?, ?, ?, ?)", filas)
+
+        filas = []
+        for p in _lista(_dict(datos.get("distribuida")).get("patanas_con_problemas")):
+            p = _dict(p)
+            recuperacion = _dict(p.get("recuperacion_estimada"))
+            if not p or all(v is None for v in p.values()):
+                continue
+            filas.append(
+                (
+                    reporte_id,
+                    dia,
+                    p.get("patana_nombre"),
+                    _numero(p.get("motores_afectados")),
+                    _numero(p.get("mw_afectados")),
+                    _numero(recuperacion.get("motores")),
+                    _numero(recuperacion.get("mw")),
+                )
+            )
+        conn.executemany("INSERT INTO patanas VALUES (?, ?, ?, ?, ?, ?, ?)", filas)
+
+        conn.executemany(
+            "INSERT INTO zonas VALUES (?, ?, ?)",
+            [
+                (reporte_id, dia, zona)
+                for zona in _lista(datos.get("zonas_con_problemas"))
+                if isinstance(zona, str) and zona
+            ],
+        )
+
+        sol = _dict(datos.get("paneles_solares"))
+        conn.execute(
+            "INSERT INTO solar VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                reporte_id,
+                dia,
+                _numero(sol.get("cantidad_parques")),
+                _numero(sol.get("produccion_mwh")),
+                _escalar(sol.get("nuevos_parques")),
+                _numero(sol.get("capacidad_instalada")),
+                sol.get("periodo_produccion") or None,
+            ),
+        )
+
+    def _guardar(self, registros: Iterable[Dict], reemplazar: bool) -> int:
+        self.initialize()
+        guardados = 0
+        with self._abrir() as conn:
+            for registro in registros:
+                if not isinstance(registro, dict) or not registro.get("enlace"):
+                    continue
+                fecha = str(registro.get("fecha") or "")
+                if len(fecha) < 10:
+                    continue
+                datos = migrate_datos(registro.get("datos"), registro.get("schema_version", 0))
+
+                fila = conn.execute(
+                    "SELECT id FROM reportes WHERE enlace = ?", (registro["enlace"],)
+                ).fetchone()
+                if fila and not reemplazar:
+                    continue
+
+                valores = (
+                    fecha,
+                    fecha[:10],
+                    datos.get("fecha_reporte") or None,
+                    json.dumps(datos, ensure_ascii=False, separators=(",", ":")),
+                )
+                if fila:
+                    # Se conserva el id para no alterar el orden de los reportes del día
+                    reporte_id = fila[0]
+                    conn.execute(
+                        "UPDATE reportes SET fecha = ?, dia = ?, fecha_reporte = ?, datos = ? WHERE id = ?",
+                        valores + (reporte_id,),
+                    )
+                    for tabla in TABLAS_DETALLE:
+                        conn.execute(f"DELETE FROM {tabla} WHERE reporte_id = ?", (reporte_id,))
+                else:
+                    reporte_id = conn.execute(
+                        "INSERT INTO reportes (enlace, fecha, dia, fecha_reporte, datos) VALUES (?, ?, ?, ?, ?)",
+                        (registro["enlace"],) + valores,
+                    ).lastrowid
+
+                self._insertar_detalle(conn, reporte_id, fecha[:10], datos)
+                guardados += 1
+        return guardados
+
+    def append(self, registros: Iterable[Dict]) -> int:
+        """
+        Añade registros nuevos; los que ya existen (mismo enlace) se ignoran.
+
+        Args:
+            registros: Registros con las claves "enlace", "fecha" y "datos"
+
+        Returns:
+            int: Número de registros añadidos
+        """
+        return self._guardar(registros, reemplazar=False)
+
+    def upsert(self, registros: Iterable[Dict]) -> int:
+        """
+        Añade registros o reemplaza los existentes con el mismo enlace.
+
+        Args:
+            registros: Registros con las claves "enlace", "fecha" y "datos"
+
+        Returns:
+            int: Número de registros guardados
+        """
+        return self._guardar(registros, reemplazar=True)
+
+    def _consultar(self, sql: str, parametros: Tuple = ()) -> pd.DataFrame:
+        with self._abrir() as conn:
+            return pd.read_sql_query(sql, conn, params=parametros)
+
+    def reportes(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> List[Dict]:
+        """
+        Reportes de un rango de fechas, uno por día, con la forma que usa la
+        visualización ({"fecha": datetime, "datos": dict, "enlace": str}).
+
+        Args:
+            desde: Fecha mínima YYYY[-MM[-DD]] (inclusive)
+            hasta: Fecha máxima YYYY[-MM[-DD]] (inclusive)
+
+        Returns:
+            List[Dict]: Reportes en el orden en que se almacenaron
+        """
+        with self._abrir() as conn:
+            filas = conn.execute(
+                "SELECT fecha, datos, enlace FROM reportes_diarios "
+                "WHERE dia BETWEEN ? AND ? ORDER BY id",
+                _limites(desde, hasta),
+            ).fetchall()
+        return [
+            {"fecha": datetime.fromisoformat(fecha), "datos": json.loads(datos), "enlace": enlace}
+            for fecha, datos, enlace in filas
+        ]
+
+    def prediccion(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> pd.DataFrame:
+        """
+        Métricas de predicción por día.
+
+        Args:
+            desde: Fecha mínima YYYY[-MM[-DD]] (inclusive)
+            hasta: Fecha máxima YYYY[-MM[-DD]] (inclusive)
+
+        Returns:
+            pd.DataFrame: Columnas afectacion, disponibilidad, demanda, deficit,
+            respaldo y enlace indexadas por fecha
+        """
+        df = self._consultar(
+            "SELECT r.fecha, p.afectacion, p.disponibilidad, p.demanda_maxima AS demanda, "
+            "p.deficit, p.respaldo, r.enlace "
+            "FROM reportes_diarios r JOIN prediccion p ON p.reporte_id = r.id "
+            "WHERE r.dia BETWEEN ? AND ?",
+            _limites(desde, hasta),
+        )
+        df["fecha"] = pd.to_datetime(df["fecha"])
+        return df.set_index("fecha").sort_index()
+
+    def solar(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> pd.DataFrame:
+        """
+        Producción y parques solares por día.
+
+        Args:
+            desde: Fecha mínima YYYY[-MM[-DD]] (inclusive)
+            hasta: Fecha máxima YYYY[-MM[-DD]] (inclusive)
+
+        Returns:
+            pd.DataFrame: Columnas produccion_mwh, parques y capacidad_instalada
+            indexadas por fecha
+        """
+        df = self._consultar(
+            "SELECT r.fecha, s.produccion_mwh, s.cantidad_parques AS parques, s.capacidad_instalada "
+            "FROM reportes_diarios r JOIN solar s ON s.reporte_id = r.id "
+            "WHERE r.dia BETWEEN ? AND ?",
+            _limites(desde, hasta),
+        )
+        df["fecha"] = pd.to_datetime(df["fecha"])
+        return df.set_index("fecha").sort_index()
+
+    def estado_plantas(
+        self,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        planta: Optional[str] = None,
+        canonica: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Plantas en avería o mantenimiento por día.
+
+        Args:
+            desde: Fecha mínima YYYY[-MM[-DD]] (inclusive)
+            hasta: Fecha máxima YYYY[-MM[-DD]] (inclusive)
+            planta: Nombre de la planta a consultar (todas si es None)
+            canonica: Usar los nombres canónicos (y omitir las plantas sin
+                nombre canónico) o los nombres tal como aparecen en los reportes
+
+        Returns:
+            pd.DataFrame: Columnas fecha, planta y estado
+        """
+        columna = "p.planta_canonica" if canonica else "p.planta"
+        sql = (
+            f"SELECT r.fecha, {columna} AS planta, p.estado "
+            "FROM plantas p JOIN reportes_diarios r ON r.id = p.reporte_id "
+            f"WHERE {columna} IS NOT NULL AND p.dia BETWEEN ? AND ?"
+        )
+        parametros = _limites(desde, hasta)
+        if planta is not None:
+            sql += f" AND {columna} = ?"
+            parametros += (planta,)
+        df = self._consultar(sql + " ORDER BY r.id, p.rowid", parametros)
+        df["fecha"] = pd.to_datetime(df["fecha"])
+        return df
+
+    def plantas(self) -> List[str]:
+        """
+        Nombres canónicos de todas las plantas que aparecen en los reportes.
+
+        Returns:
+            List[str]: Nombres ordenados alfabéticamente
+        """
+        with self._abrir() as conn:
+            filas = conn.execute(
+                "SELECT DISTINCT planta_canonica FROM plantas "
+                "WHERE planta_canonica IS NOT NULL ORDER BY planta_canonica"
+            ).fetchall()
+        return [f[0] for f in filas]
+
+    def patanas(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> pd.DataFrame:
+        """
+        Patanas con problemas por día.
+
+        Args:
+            desde: Fecha mínima YYYY[-MM[-DD]] (inclusive)
+            hasta: Fecha máxima YYYY[-MM[-DD]] (inclusive)
+
+        Returns:
+            pd.DataFrame: Una fila por patana afectada
+        """
+        df = self._consultar(
+            "SELECT r.fecha, p.patana_nombre, p.motores_afectados, p.mw_afectados, "
+            "p.recuperacion_motores, p.recuperacion_mw "
+            "FROM patanas p JOIN reportes_diarios r ON r.id = p.reporte_id "
+            "WHERE p.dia BETWEEN ? AND ? ORDER BY r.id, p.rowid",
+            _limites(desde, hasta),
+        )
+        df["fecha"] = pd.to_datetime(df["fecha"])
+        return df
+
+    def zonas(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> pd.DataFrame:
+        """
+        Zonas con problemas por día.
+
+        Args:
+            desde: Fecha mínima YYYY[-MM[-DD]] (inclusive)
+            hasta: Fecha máxima YYYY[-MM[-DD]] (inclusive)
+
+        Returns:
+            pd.DataFrame: Columnas fecha y zona
+        """
+        df = self._consultar(
+            "SELECT r.fecha, z.zona FROM zonas z JOIN reportes_diarios r ON r.id = z.reporte_id "
+            "WHERE z.dia BETWEEN ? AND ? ORDER BY r.id, z.rowid",
+            _limites(desde, hasta),
+        )
+        df["fecha"] = pd.to_datetime(df["fecha"])
+        return df
+
+
+if __name__ == "__main__":
+    from storage.partitioned import PartitionedStore
+
+    parser = argparse.ArgumentParser(
+        description="Rebuild the SQLite database from the partitioned store."
+    )
+    parser.add_argument(
+        "--store",
+        default=os.path.join("data", "processed", "store"),
+        help="Partitioned store directory",
+    )
+    parser.add_argument(
+        "--db",
+        default=os.path.join("data", "processed", "datos_electricos.db"),
+        help="SQLite database file",
+    )
+    args = parser.parse_args()
+
+    total = SQLiteStore(args.db).upsert(PartitionedStore(args.store).iter_records())
+    print(f"Guardados {total} registros en {args.db}")
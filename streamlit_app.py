@@ -32,10 +32,8 @@ if os.path.exists(vis_dir):
     menu = st.sidebar.radio("Menu:", ["Inicio", "Déficit", "Disponibilidad", "Comparativas"])
     
     try:
-        # Importar dependencias necesarias
-        import pandas as pd
-        import plotly.express as px
-        import plotly.graph_objects as go
+        # Cada página importa sus propias dependencias (plotly, altair) al
+        # seleccionarla, así que el arranque sólo carga la página mostrada
         
         # Configurar paths
         if vis_dir not in sys.path:
@@ -58,6 +56,14 @@ if os.path.exists(vis_dir):
         else:
             st.error(f"No se encontró el módulo para {menu}")
             st.write(f"Archivos disponibles: {files}")
+
+        # Estado de la caché de datos compartida por las sesiones
+        cache = importlib.import_module("Visualizacion.utils").estadisticas_cache()
+        st.sidebar.markdown("---")
+        st.sidebar.caption(
+            f"Caché de datos: {cache['aciertos']} aciertos, {cache['fallos']} fallos "
+            f"({cache['tasa_aciertos']:.0%}), {cache['entradas']} entradas"
+        )
     except Exception as e:
         st.error(f"Error al cargar módulos: {str(e)}")
         st.info("Compruebe que todas las dependencias están instaladas y que la estructura del proyecto es correcta.")
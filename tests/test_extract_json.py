@@ -0,0 +1,79 @@
+import copy
+import json
+import os
+
+import pytest
+
+from extract_json import EXTRACTION_VERSION, CreateJson
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "template.json")
+
+PREDICCION = {
+    "disponibilidad": 1800,
+    "demanda_maxima": 3300,
+    "afectacion": 1570,
+    "deficit": 1500,
+    "respaldo": None,
+    "horario_pico": "8:00 p.m.",
+}
+
+
+@pytest.fixture
+def extractor():
+    articulos = [{"Enlace": "https://a", "Contenido": "Texto del reporte", "Fecha": "2025-01-05"}]
+    return CreateJson(articulos, TEMPLATE, url_llm="", apikey="", model="modelo", a=2025, b=2025)
+
+
+def _registro(extractor, hashes):
+    datos = copy.deepcopy(extractor.template_datos)
+    datos["zonas_con_problemas"] = ["Occidente"]
+    return {"enlace": "https://a", "fecha": "2025-01-05", "datos": datos, "template_hashes": hashes}
+
+
+def test_outdated_sections_compara_los_hashes(extractor):
+    hashes = dict(extractor.template_hashes)
+    assert extractor.outdated_sections({"datos": {}, "template_hashes": hashes}) == []
+
+    hashes["prediccion"] = "0" * 16
+    del hashes["impacto"]
+    assert extractor.outdated_sections({"datos": {}, "template_hashes": hashes}) == ["prediccion", "impacto"]
+
+
+def test_outdated_sections_sin_hashes_compara_la_estructura(extractor):
+    datos = copy.deepcopy(extractor.template_datos)
+    del datos["impacto"]
+    datos["plantas"] = ["Felton"]
+    assert extractor.outdated_sections({"datos": datos}) == ["plantas", "impacto"]
+
+
+def test_reextrae_y_combina_solo_la_seccion_cambiada(extractor, monkeypatch):
+    vigente = _registro(extractor, dict(extractor.template_hashes))
+    vigente["enlace"] = "https://b"
+    cambiado = _registro(extractor, {**extractor.template_hashes, "prediccion": "0" * 16})
+    datos_previos = copy.deepcopy(cambiado["datos"])
+    organizados = {"2025": {"enero": [vigente, cambiado]}}
+
+    peticiones = []
+
+    def responder(payload):
+        peticiones.append(payload)
+        return json.dumps({"prediccion": PREDICCION}), {}
+
+    monkeypatch.setattr(extractor, "_request_completion", responder)
+    assert extractor.reextract_changed_sections(organizados, delay=0) == 1
+
+    # Una sola petición, con el contenido del artículo y sólo la sección cambiada en el prompt
+    assert len(peticiones) == 1
+    prompt = peticiones[0]["messages"][0]["content"]
+    assert peticiones[0]["messages"][1]["content"] == "Texto del reporte"
+    assert '"prediccion"' in prompt
+    assert not any(f'"{s}"' in prompt for s in extractor.template_datos if s != "prediccion")
+
+    assert cambiado["datos"]["prediccion"] == PREDICCION
+    assert {s: v for s, v in cambiado["datos"].items() if s != "prediccion"} == {
+        s: v for s, v in datos_previos.items() if s != "prediccion"
+    }
+    assert cambiado["template_hashes"] == extractor.template_hashes
+    assert cambiado["extraction_version"] == EXTRACTION_VERSION
+    assert "validation_errors" not in cambiado
+    assert "extraction_version" not in vigente
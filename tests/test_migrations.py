@@ -0,0 +1,65 @@
+from storage.migrations import SCHEMA_VERSION, _FORMA_VERSION_2, migrate_datos, migrate_record
+
+
+def _claves(forma, valor, ruta=""):
+    """Rutas de las claves de la forma que faltan en el valor."""
+    faltan = []
+    if isinstance(forma, dict) and isinstance(valor, dict):
+        for clave, sub in forma.items():
+            if clave not in valor:
+                faltan.append(ruta + clave)
+            else:
+                faltan += _claves(sub, valor[clave], f"{ruta}{clave}.")
+    return faltan
+
+
+def test_registro_antiguo_renombra_deficit_y_completa_la_forma():
+    legado = {
+        "prediccion": {"disponibilidad": 1800, "déficit": 1400},
+        "info_matutina": {"déficit": 900, "deficit": 950},
+        "plantas": {"averia": [{"planta": "Felton"}], "mantenimiento": None},
+    }
+    datos = migrate_datos(legado, 0)
+
+    assert datos["prediccion"]["deficit"] == 1400
+    assert "déficit" not in datos["prediccion"]
+    # Si ya existía la clave sin tilde, se conserva
+    assert datos["info_matutina"]["deficit"] == 950
+    assert datos["plantas"]["mantenimiento"] == []
+    assert datos["plantas"]["averia"] == [{"planta": "Felton", "unidad": None, "unidades": [], "tipo": None}]
+    assert datos["zonas_con_problemas"] == []
+    assert datos["paneles_solares"]["produccion_mwh"] is None
+    assert _claves(_FORMA_VERSION_2, datos) == []
+    # Los originales no se modifican
+    assert legado["prediccion"] == {"disponibilidad": 1800, "déficit": 1400}
+
+
+def test_valores_inesperados_se_conservan():
+    legado = {
+        "prediccion": "sin datos",
+        "zonas_con_problemas": "Occidente",
+        "distribuida": {"patanas_con_problemas": ["Patana de Mariel", {"patana_nombre": "Regla"}]},
+        "extra": 1,
+    }
+    datos = migrate_datos(legado, 0)
+
+    assert datos["prediccion"] == "sin datos"
+    assert datos["zonas_con_problemas"] == "Occidente"
+    assert datos["extra"] == 1
+    patanas = datos["distribuida"]["patanas_con_problemas"]
+    assert patanas[0] == "Patana de Mariel"
+    assert patanas[1]["patana_nombre"] == "Regla"
+    assert patanas[1]["recuperacion_estimada"]["mw"] is None
+
+
+def test_datos_nulos():
+    assert _claves(_FORMA_VERSION_2, migrate_datos(None, 0)) == []
+
+
+def test_migrate_record_es_idempotente():
+    registro = {"enlace": "a", "fecha": "2024-01-01", "datos": {"prediccion": {"déficit": 10}}}
+    assert migrate_record(registro)
+    assert registro["schema_version"] == SCHEMA_VERSION
+    migrado = dict(registro)
+    assert not migrate_record(registro)
+    assert registro == migrado
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Visualizacion.muestreo import indices_lttb, indices_min_max, reducir_serie
+
+
+@pytest.mark.parametrize("n, umbral", [(1000, 100), (1000, 3), (101, 100), (10, 7)])
+def test_lttb_conserva_extremos_y_tamaño(n, umbral):
+    x = np.arange(n, dtype="float64")
+    y = np.sin(x / 7) + np.random.default_rng(n).normal(0, 0.1, n)
+    indices = indices_lttb(x, y, umbral)
+
+    assert len(indices) == umbral
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert (np.diff(indices) > 0).all()
+
+
+@pytest.mark.parametrize("umbral", [2, 10, 50])
+def test_lttb_devuelve_la_serie_completa_si_no_hace_falta_reducir(umbral):
+    x = np.arange(10, dtype="float64")
+    indices = indices_lttb(x, x, umbral)
+    np.testing.assert_array_equal(indices, np.arange(10))
+
+
+def test_min_max_conserva_los_picos():
+    y = np.zeros(1000)
+    y[[123, 456]] = [50.0, -50.0]
+    indices = indices_min_max(y, 20)
+    assert {0, 123, 456, 999} <= set(indices)
+    assert len(indices) <= 22
+
+
+def test_reducir_serie():
+    fechas = pd.date_range("2020-01-01", periods=2000, freq="D")
+    df = pd.DataFrame({"deficit": np.arange(2000, dtype="float64")}, index=fechas)
+    df.iloc[::3, 0] = np.nan
+
+    assert len(reducir_serie(df.iloc[:50], max_puntos=100)) == 50
+    reducida = reducir_serie(df, ["deficit"], max_puntos=100)
+    assert len(reducida) == 100
+    assert reducida["deficit"].notna().all()
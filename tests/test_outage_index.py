@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+
+from storage.outage_index import OutageIndex
+from storage.plant_status import PlantStatusMatrix
+
+
+@pytest.fixture
+def intervalos():
+    return pd.DataFrame({
+        "planta": ["Felton", "Felton", "Renté", "Felton"],
+        "estado": ["Avería", "Avería", "Avería", "Mantenimiento"],
+        "inicio": pd.to_datetime(["2024-01-01", "2024-01-10", "2024-01-05", "2024-01-03"]),
+        "fin": pd.to_datetime(["2024-01-04", "2024-01-12", "2024-01-20", "2024-01-03"]),
+        "dias": [4, 3, 16, 1],
+        "duracion": [4, 3, 16, 1],
+    })
+
+
+def _fuerza_bruta(intervalos, desde, hasta, planta=None, estado=None):
+    seleccion = (intervalos["fin"] >= pd.Timestamp(desde)) & (intervalos["inicio"] <= pd.Timestamp(hasta))
+    if planta is not None:
+        seleccion &= intervalos["planta"] == planta
+    if estado is not None:
+        seleccion &= intervalos["estado"] == estado
+    return intervalos[seleccion].sort_values(["planta", "estado", "inicio"], ignore_index=True)
+
+
+@pytest.mark.parametrize(
+    "desde, hasta, planta, estado",
+    [
+        ("2024-01-04", "2024-01-05", None, None),
+        ("2024-01-13", "2024-01-13", None, None),
+        ("2023-12-01", "2024-02-01", None, None),
+        ("2024-01-01", "2024-01-31", "Felton", None),
+        ("2024-01-01", "2024-01-31", None, "Mantenimiento"),
+        ("2024-01-01", "2024-01-31", "Felton", "Avería"),
+        ("2024-02-01", "2024-02-28", None, None),
+        ("2024-01-01", "2024-01-31", "Inexistente", None),
+    ],
+)
+def test_overlapping_coincide_con_fuerza_bruta(intervalos, desde, hasta, planta, estado):
+    indice = OutageIndex(intervalos)
+    resultado = indice.overlapping(desde, hasta, planta, estado)
+    pd.testing.assert_frame_equal(
+        resultado, _fuerza_bruta(intervalos, desde, hasta, planta, estado), check_dtype=False
+    )
+
+
+def test_at_devuelve_los_periodos_en_curso(intervalos):
+    indice = OutageIndex(intervalos)
+    assert set(indice.at("2024-01-03")["planta"] + "/" + indice.at("2024-01-03")["estado"]) == {
+        "Felton/Avería",
+        "Felton/Mantenimiento",
+    }
+    assert list(indice.at("2024-01-11", estado="Avería")["planta"]) == ["Felton", "Renté"]
+    assert indice.at("2024-01-21").empty
+
+
+def test_write_y_open_conservan_el_indice(intervalos, tmp_path):
+    indice = OutageIndex(intervalos)
+    path = str(tmp_path / "intervalos.npz")
+    assert indice.write(path) == len(intervalos)
+    abierto = OutageIndex.open(path)
+    pd.testing.assert_frame_equal(
+        abierto.overlapping("2024-01-01", "2024-01-31"), indice.overlapping("2024-01-01", "2024-01-31")
+    )
+
+
+def test_from_states_usa_los_intervalos_de_la_matriz():
+    df = pd.DataFrame(
+        [("2024-01-01", "Felton", "Avería"), ("2024-01-02", "Felton", "Avería")],
+        columns=["fecha", "planta", "estado"],
+    )
+    indice = OutageIndex.from_states(df)
+    pd.testing.assert_frame_equal(
+        indice.overlapping("2024-01-01", "2024-01-02"),
+        PlantStatusMatrix.from_states(df).intervalos(),
+        check_dtype=False,
+    )
+
+
+def test_from_states_cierra_los_periodos_en_huecos_largos():
+    df = pd.DataFrame(
+        [("2024-01-01", "Felton", "Avería"), ("2024-03-01", "Felton", "Avería")],
+        columns=["fecha", "planta", "estado"],
+    )
+    indice = OutageIndex.from_states(df)
+    assert len(indice) == 2
+    assert list(indice.at("2024-03-01")["duracion"]) == [1]
+    assert indice.at("2024-02-01").empty
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from storage.migrations import SCHEMA_VERSION
+from storage.partitioned import PartitionedStore, content_hash
+
+
+def _registro(enlace, fecha, deficit, **extra):
+    return {"enlace": enlace, "fecha": fecha, "datos": {"prediccion": {"deficit": deficit}}, **extra}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PartitionedStore(str(tmp_path / "store"))
+
+
+def _deficits(store):
+    return {r["enlace"]: r["datos"]["prediccion"]["deficit"] for r in store.iter_records()}
+
+
+def test_upsert_escribe_un_delta_y_es_idempotente(store):
+    cambios = store.upsert([_registro("a", "2024-01-05", 100), _registro("b", "2024-02-01", 200)])
+
+    assert [r["enlace"] for r in cambios] == ["a", "b"]
+    assert all(r["content_hash"] == content_hash(r["datos"]) for r in cambios)
+    assert len(store.delta_files()) == 1
+    assert store.upsert([_registro("a", "2024-01-05", 100)]) == []
+    assert len(store.delta_files()) == 1
+
+
+def test_upsert_respeta_la_version_de_extraccion(store):
+    store.upsert([_registro("a", "2024-01-05", 100, extraction_version=2)])
+
+    assert store.upsert([_registro("a", "2024-01-05", 150, extraction_version=1)]) == []
+    assert store.append([_registro("a", "2024-01-05", 150, extraction_version=3)]) == 0
+    assert len(store.upsert([_registro("a", "2024-01-05", 150, extraction_version=3)])) == 1
+    assert _deficits(store) == {"a": 150}
+
+
+def test_compact_conserva_los_registros(store):
+    store.upsert([_registro("a", "2024-01-05", 100), _registro("b", "2024-02-01", 200)])
+    store.upsert([_registro("a", "2024-01-05", 110), _registro("c", "2024-01-20", 300)])
+    antes = store.load()
+
+    assert store.compact() == 4
+    assert store.delta_files() == []
+    assert store.load() == antes
+    assert _deficits(store) == {"a": 110, "b": 200, "c": 300}
+    # Cada enlace aparece una sola vez en su partición
+    assert [r["enlace"] for r in store.read_partition("2024", "enero")] == ["a", "c"]
+    manifest = store.load_manifest()
+    assert manifest["particiones"]["2024-01"]["registros"] == 2
+
+    # Los cambios posteriores a la compactación se combinan con la base
+    store.upsert([_registro("b", "2024-02-01", 250)])
+    assert _deficits(store) == {"a": 110, "b": 250, "c": 300}
+    assert store.compact() == 1
+    assert _deficits(store) == {"a": 110, "b": 250, "c": 300}
+
+
+def test_lectura_migra_en_memoria_y_migrate_persiste(store):
+    legado = [_registro("a", "2024-01-05", None)]
+    legado[0]["datos"] = {"prediccion": {"déficit": 100}}
+    store.write_partition("2024", "enero", legado)
+    path = os.path.join(store.root, store.load_manifest()["particiones"]["2024-01"]["archivo"])
+    contenido = open(path, "rb").read()
+
+    registro = store.read_partition("2024", "enero")[0]
+    assert registro["schema_version"] == SCHEMA_VERSION
+    assert registro["datos"]["prediccion"]["deficit"] == 100
+    # Leer no reescribe la partición
+    assert open(path, "rb").read() == contenido
+
+    assert [r["enlace"] for r in store.migrate()] == ["a"]
+    assert open(path, "rb").read() != contenido
+    assert store.migrate() == []
+    assert store.load_index()["a"][1] == content_hash(registro["datos"])
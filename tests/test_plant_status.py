@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+from storage.plant_status import AVERIA, MANTENIMIENTO, OPERATIVA, PlantStatusMatrix
+
+
+def _estados(filas):
+    return pd.DataFrame(filas, columns=["fecha", "planta", "estado"])
+
+
+def test_from_states_combina_banderas_y_dias_sin_afectadas():
+    df = _estados([
+        ("2024-01-01", "Felton", "Avería"),
+        ("2024-01-01", "Felton", "Mantenimiento"),
+        ("2024-01-03", "Renté", "Mantenimiento"),
+    ])
+    matriz = PlantStatusMatrix.from_states(df, fechas=["2024-01-02"])
+
+    assert matriz.plantas == ["Felton", "Renté"]
+    assert list(matriz.fechas.astype(str)) == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert list(matriz.fila("Felton")) == [AVERIA | MANTENIMIENTO, OPERATIVA, OPERATIVA]
+    assert list(matriz.fila("Renté")) == [OPERATIVA, OPERATIVA, MANTENIMIENTO]
+
+
+def test_intervalos_no_se_interrumpen_por_dias_sin_reporte():
+    # Felton en avería el 1, 2 y 5 (sin reporte el 3 y 4) y otra vez el 7;
+    # el 6 hay reporte y está operativa
+    df = _estados([
+        ("2024-01-01", "Felton", "Avería"),
+        ("2024-01-02", "Felton", "Avería"),
+        ("2024-01-05", "Felton", "Avería"),
+        ("2024-01-07", "Felton", "Avería"),
+        ("2024-01-02", "Renté", "Mantenimiento"),
+    ])
+    matriz = PlantStatusMatrix.from_states(df, fechas=["2024-01-06"])
+    intervalos = matriz.intervalos().sort_values(["planta", "estado", "inicio"], ignore_index=True)
+
+    esperado = pd.DataFrame({
+        "planta": ["Felton", "Felton", "Renté"],
+        "estado": ["Avería", "Avería", "Mantenimiento"],
+        "inicio": pd.to_datetime(["2024-01-01", "2024-01-07", "2024-01-02"]),
+        "fin": pd.to_datetime(["2024-01-05", "2024-01-07", "2024-01-02"]),
+        "dias": [3, 1, 1],
+        "duracion": [5, 1, 1],
+    })
+    pd.testing.assert_frame_equal(intervalos, esperado, check_dtype=False)
+
+
+def test_intervalos_se_cierran_en_huecos_mayores_que_max_hueco():
+    # Felton en avería el 1 y el 2, sin reportes hasta el 21 y otra vez en avería
+    # el 21 y el 24; el hueco del 21 al 24 (3 días) no corta el periodo
+    df = _estados([
+        ("2024-01-01", "Felton", "Avería"),
+        ("2024-01-02", "Felton", "Avería"),
+        ("2024-01-21", "Felton", "Avería"),
+        ("2024-01-24", "Felton", "Avería"),
+        ("2024-01-21", "Renté", "Mantenimiento"),
+        ("2024-01-24", "Renté", "Mantenimiento"),
+    ])
+    matriz = PlantStatusMatrix.from_states(df)
+
+    sin_limite = matriz.intervalos()
+    assert list(sin_limite.loc[sin_limite["planta"] == "Felton", "duracion"]) == [24]
+
+    intervalos = matriz.intervalos(max_hueco=7).sort_values(["planta", "estado", "inicio"], ignore_index=True)
+    esperado = pd.DataFrame({
+        "planta": ["Felton", "Felton", "Renté"],
+        "estado": ["Avería", "Avería", "Mantenimiento"],
+        "inicio": pd.to_datetime(["2024-01-01", "2024-01-21", "2024-01-21"]),
+        "fin": pd.to_datetime(["2024-01-02", "2024-01-24", "2024-01-24"]),
+        "dias": [2, 2, 2],
+        "duracion": [2, 4, 4],
+    })
+    pd.testing.assert_frame_equal(intervalos, esperado, check_dtype=False)
+
+
+def test_intervalos_sin_periodos():
+    matriz = PlantStatusMatrix.from_states(_estados([]), fechas=["2024-01-01"])
+    assert matriz.intervalos().empty
+
+
+def test_rachas_resume_periodos_por_planta_y_estado():
+    df = _estados([
+        ("2024-01-01", "Felton", "Avería"),
+        ("2024-01-02", "Felton", "Avería"),
+        ("2024-01-04", "Felton", "Avería"),
+        ("2024-01-04", "Felton", "Mantenimiento"),
+    ])
+    matriz = PlantStatusMatrix.from_states(df, fechas=["2024-01-03"], plantas=["Renté"])
+    rachas = matriz.rachas()
+
+    assert list(rachas.index) == ["Felton", "Renté"]
+    assert rachas.loc["Felton", ("periodos", "Avería")] == 2
+    assert rachas.loc["Felton", ("racha_maxima", "Avería")] == 2
+    assert rachas.loc["Felton", ("dias_totales", "Avería")] == 3
+    assert rachas.loc["Felton", ("periodos", "Mantenimiento")] == 1
+    # Las plantas sin periodos aparecen con ceros
+    assert (rachas.loc["Renté"] == 0).all()
+    assert rachas.dtypes.eq(np.int64).all()
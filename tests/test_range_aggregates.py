@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from storage.range_aggregates import RangeAggregates
+
+
+@pytest.fixture
+def serie():
+    rng = np.random.default_rng(0)
+    fechas = pd.date_range("2023-01-01", "2024-12-31", freq="D")
+    # Días sin reporte y valores faltantes, y una media grande frente a la varianza
+    fechas = fechas[rng.random(len(fechas)) > 0.1]
+    df = pd.DataFrame(
+        {
+            "deficit": rng.normal(1000, 300, len(fechas)),
+            "disponibilidad": 1e9 + rng.normal(0, 1, len(fechas)),
+        },
+        index=fechas,
+    )
+    df.iloc[rng.random(len(df)) < 0.2, 0] = np.nan
+    return df
+
+
+RANGOS = [
+    (None, None),
+    ("2023", "2023"),
+    ("2023-02", "2023-02"),
+    ("2023-03-15", "2024-06-10"),
+    ("2024-12-31", "2024-12-31"),
+    ("2025-01-01", "2025-12-31"),
+]
+
+
+@pytest.mark.parametrize("desde, hasta", RANGOS)
+@pytest.mark.parametrize("columna", ["deficit", "disponibilidad"])
+def test_agregados_coinciden_con_pandas(serie, columna, desde, hasta):
+    agregados = RangeAggregates.from_frame(serie)
+    tramo = serie.loc[desde:hasta, columna]
+    resumen = agregados.resumen(columna, desde, hasta)
+
+    assert resumen["count"] == tramo.count()
+    assert resumen["sum"] == pytest.approx(tramo.sum())
+    np.testing.assert_allclose(resumen["mean"], tramo.mean(), rtol=1e-12)
+    np.testing.assert_allclose(resumen["std"], tramo.std(), rtol=1e-6)
+    np.testing.assert_equal(resumen["min"], tramo.min())
+    np.testing.assert_equal(resumen["max"], tramo.max())
+    np.testing.assert_equal(agregados.median(columna, desde, hasta), tramo.median())
+    if tramo.count():
+        assert resumen["fecha_min"] == tramo.idxmin()
+        assert resumen["fecha_max"] == tramo.idxmax()
+    else:
+        assert resumen["fecha_min"] is None and resumen["fecha_max"] is None
+
+
+def test_fechas_desordenadas():
+    with pytest.raises(ValueError):
+        RangeAggregates(pd.to_datetime(["2024-01-02", "2024-01-01"]), {"deficit": np.array([1.0, 2.0])})
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from storage.daily_metrics import COLUMNAS
+from storage.rollups import ESTADISTICOS, NIVELES, RollupTables, combine_rollups, compute_rollups
+
+
+def _serie(desde, hasta, semilla):
+    rng = np.random.default_rng(semilla)
+    fechas = pd.date_range(desde, hasta, freq="D", name="fecha")
+    df = pd.DataFrame(rng.normal(1000, 200, (len(fechas), len(COLUMNAS))), index=fechas, columns=COLUMNAS)
+    return df.mask(rng.random(df.shape) < 0.15)
+
+
+def _estadisticos(tabla):
+    return {
+        (nivel, metrica): tabla.stats(nivel, metrica)[ESTADISTICOS]
+        for nivel in NIVELES
+        for metrica in COLUMNAS
+    }
+
+
+def _comparar(tabla, esperada):
+    obtenidos, esperados = _estadisticos(tabla), _estadisticos(esperada)
+    for clave, esperado in esperados.items():
+        pd.testing.assert_frame_equal(obtenidos[clave], esperado, rtol=1e-9, obj=str(clave))
+
+
+def test_estadisticos_coinciden_con_pandas():
+    daily = _serie("2024-01-01", "2024-03-31", 0)
+    mensual = RollupTables.from_daily(daily).stats("mes", "deficit")
+    agrupado = daily["deficit"].groupby(daily.index.to_period("M"))
+
+    np.testing.assert_array_equal(mensual["count"], agrupado.count())
+    np.testing.assert_allclose(mensual["sum"], agrupado.sum(), rtol=1e-12)
+    np.testing.assert_allclose(mensual["std"], agrupado.std(), rtol=1e-9)
+    np.testing.assert_array_equal(mensual["max"], agrupado.max())
+
+
+def test_combinar_dias_disjuntos_equivale_a_recalcular():
+    daily = _serie("2024-01-01", "2024-06-30", 1)
+    partes = [daily.iloc[:40], daily.iloc[40:41], daily.iloc[41:]]
+
+    combinados = compute_rollups(partes[0])
+    for parte in partes[1:]:
+        combinados = combine_rollups(combinados, compute_rollups(parte))
+    tabla = RollupTables()
+    tabla._tabla = combinados.sort_index()
+
+    _comparar(tabla, RollupTables.from_daily(daily))
+
+
+def test_update_incremental_equivale_a_reconstruir(tmp_path):
+    pytest.importorskip("pyarrow", exc_type=ImportError)
+    anterior = _serie("2024-01-01", "2024-05-31", 2)
+    actual = pd.concat([anterior, _serie("2024-06-01", "2024-07-15", 3)])
+    # Un día modificado, un día con una métrica borrada y un día eliminado
+    actual.loc["2024-02-10", "deficit"] = 5000.0
+    actual.loc["2024-03-03", "disponibilidad"] = np.nan
+    actual = actual.drop(pd.Timestamp("2024-04-20"))
+
+    tabla = RollupTables(str(tmp_path / "rollups.parquet"))
+    tabla.rebuild(anterior)
+    assert tabla.update(anterior, actual) > 0
+    assert tabla.update(actual, actual) == 0
+
+    _comparar(RollupTables(tabla.path), RollupTables.from_daily(actual))